@@ -0,0 +1,1233 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Query MongoDB from asyncio code without blocking the event loop.
+
+:class:`AsyncMongoClient`, :class:`AsyncDatabase`, :class:`AsyncCollection`
+and :class:`AsyncCursor` mirror their blocking counterparts, with methods
+that return awaitables::
+
+    import asyncio
+    from pymongo.asyncio_client import AsyncMongoClient
+
+    async def show_assets(project_name):
+        db = AsyncMongoClient('mongodb://localhost:27017').avalon
+        project = await db.projects.find_one({'name': project_name})
+        async for asset in db.assets.find({'parent': project['_id']}):
+            print(asset['name'])
+
+    asyncio.get_event_loop().run_until_complete(show_assets('hulk'))
+
+Messages are built and replies decoded by the same code as for
+:class:`~pymongo.mongo_client.MongoClient`, and sent on non-blocking
+asyncio connections, pooled per server up to `maxPoolSize`. A
+MongoClient, :attr:`AsyncMongoClient.delegate`, monitors the servers on
+its own threads, selects servers, and closes abandoned cursors.
+
+Requires Python 3.5+, and MongoDB 3.2+ for the find command.
+Authentication isn't supported.
+"""
+
+import collections
+import datetime
+import functools
+import socket
+import struct
+import sys
+import types
+
+if sys.version_info[:2] < (3, 5):
+    raise ImportError("pymongo.asyncio_client requires Python 3.5+")
+
+import asyncio
+
+from bson import BSON
+from bson.codec_options import DEFAULT_CODEC_OPTIONS
+from bson.objectid import ObjectId
+from bson.py3compat import integer_types, string_type
+from bson.raw_bson import RawBSONDocument
+from bson.son import SON
+from pymongo import common, helpers, message
+from pymongo.cursor import _QUERY_OPTIONS
+from pymongo.errors import (ConfigurationError,
+                            ConnectionFailure,
+                            InvalidOperation,
+                            NetworkTimeout,
+                            NotMasterError,
+                            OperationFailure,
+                            ProtocolError,
+                            ServerSelectionTimeoutError)
+from pymongo.mongo_client import MongoClient
+from pymongo.pool import _raise_connection_failure, is_ip_address
+from pymongo.read_preferences import ReadPreference
+from pymongo.results import (DeleteResult,
+                             InsertManyResult,
+                             InsertOneResult,
+                             UpdateResult)
+from pymongo.server_selectors import writable_server_selector
+from pymongo.server_type import SERVER_TYPE
+from pymongo.ssl_match_hostname import match_hostname, CertificateError
+from pymongo.topology_description import TOPOLOGY_TYPE
+
+_HEADER = struct.Struct("<iiii")
+
+
+class _Return(Exception):
+    """Raised by a _coroutine's generator to return a value."""
+
+    def __init__(self, value=None):
+        self.value = value
+
+
+def _outcome(future):
+    """The (result, exception) of a done future."""
+    if future.cancelled():
+        return None, asyncio.CancelledError()
+    exception = future.exception()
+    if exception is not None:
+        return None, exception
+    return future.result(), None
+
+
+class _Task(object):
+    """Step a generator, sending it the results of the awaitables it
+    yields, until it raises _Return or stops.
+
+    A generator it yields runs as part of the task, like with "yield from",
+    and its result is sent back. Some asyncio coroutines are generators
+    too: yield those wrapped in asyncio.ensure_future.
+
+    If the task's future is cancelled, CancelledError is thrown into the
+    generator when what it awaits is done, so connections are returned.
+    """
+    __slots__ = ('gen', 'stack', 'future', 'loop')
+
+    def __init__(self, gen, future, loop):
+        self.gen = gen
+        self.stack = []
+        self.future = future
+        self.loop = loop
+
+    def step(self, value, exception):
+        gen = self.gen
+        while True:
+            try:
+                if exception is None:
+                    awaitable = gen.send(value)
+                else:
+                    awaitable = gen.throw(exception)
+            except _Return as ret:
+                value, exception = ret.value, None
+            except StopIteration:
+                value, exception = None, None
+            except (Exception, asyncio.CancelledError) as exc:
+                value, exception = None, exc
+            else:
+                if isinstance(awaitable, types.GeneratorType):
+                    self.stack.append(gen)
+                    gen = self.gen = awaitable
+                    value, exception = None, None
+                    continue
+                waiting = asyncio.ensure_future(awaitable, loop=self.loop)
+                if not waiting.done():
+                    waiting.add_done_callback(self.wake)
+                    return
+                value, exception = _outcome(waiting)
+                continue
+
+            # The generator finished.
+            if self.stack:
+                gen = self.gen = self.stack.pop()
+                continue
+            future = self.future
+            if future.done():
+                pass
+            elif isinstance(exception, asyncio.CancelledError):
+                future.cancel()
+            elif exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(value)
+            return
+
+    def wake(self, waiting):
+        value, exception = _outcome(waiting)
+        if exception is None and self.future.cancelled():
+            exception = asyncio.CancelledError()
+        self.step(value, exception)
+
+
+def _coroutine(func):
+    """Run a generator method as a task on its object's loop, and return a
+    Future for its result.
+
+    The generator yields awaitables, or other generators, is sent their
+    results, and raises _Return to return a value. Generators, unlike
+    "async def", keep this module parseable by Python 2. Only methods
+    called by applications need a task: internal ones are generators.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        loop = self._loop
+        future = loop.create_future()
+        _Task(func(self, *args, **kwargs), future, loop).step(None, None)
+        return future
+    return wrapper
+
+
+class _Ready(object):
+    """An awaitable that is already done."""
+    __slots__ = ('value', 'exception')
+
+    def __init__(self, value=None, exception=None):
+        self.value = value
+        self.exception = exception
+
+    def __await__(self):
+        return self
+
+    __iter__ = __await__
+
+    def __next__(self):
+        if self.exception is not None:
+            raise self.exception
+        raise StopIteration(self.value)
+
+
+def _connection_failure(address, error):
+    """The ConnectionFailure pool._raise_connection_failure would raise."""
+    try:
+        _raise_connection_failure(address, error)
+    except ConnectionFailure as exc:
+        return exc
+
+
+class _Protocol(asyncio.Protocol):
+    """A connection to a server, with at most one request in progress."""
+
+    def __init__(self, loop, address, socket_timeout):
+        self.address = address
+        self.transport = None
+        self.closed = False
+        self.generation = 0
+        self.__loop = loop
+        self.__timeout = socket_timeout
+        self.__buffer = bytearray()
+        self.__request_id = None
+        self.__waiter = None
+        self.__timer = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def request(self, request_id, data):
+        """Send a message, and return a Future for the body of the reply.
+        """
+        if self.closed:
+            raise _connection_failure(self.address, "connection closed")
+        waiter = self.__loop.create_future()
+        self.__request_id = request_id
+        self.__waiter = waiter
+        self.transport.write(data)
+        if self.__timeout is not None:
+            self.__timer = self.__loop.call_later(
+                self.__timeout, self.__timed_out)
+        return waiter
+
+    def data_received(self, data):
+        buffer = self.__buffer
+        buffer.extend(data)
+        if len(buffer) < 16:
+            return
+        length, _, response_to, op_code = _HEADER.unpack_from(buffer)
+        if length <= 16:
+            self.__fail(ProtocolError(
+                "Message length (%r) not longer than standard "
+                "message header size (16)" % (length,)))
+            return
+        if length > common.MAX_MESSAGE_SIZE:
+            self.__fail(ProtocolError(
+                "Message length (%r) is larger than server max "
+                "message size (%r)" % (length, common.MAX_MESSAGE_SIZE)))
+            return
+        if len(buffer) < length:
+            return
+        body = bytes(buffer[16:length])
+        del buffer[:length]
+        if response_to != self.__request_id:
+            self.__fail(ProtocolError("Got response id %r but expected %r"
+                                      % (response_to, self.__request_id)))
+        elif op_code != 1:
+            self.__fail(ProtocolError("Got opcode %r but expected 1"
+                                      % (op_code,)))
+        else:
+            self.__cancel_timer()
+            waiter, self.__waiter = self.__waiter, None
+            if waiter is not None and not waiter.done():
+                waiter.set_result(body)
+
+    def connection_lost(self, exc):
+        self.closed = True
+        self.__fail(_connection_failure(
+            self.address, exc or "connection closed"))
+
+    def __timed_out(self):
+        self.__timer = None
+        self.__fail(_connection_failure(
+            self.address, socket.timeout("timed out")))
+
+    def __cancel_timer(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+    def __fail(self, error):
+        """Fail the request in progress, and close the connection."""
+        self.__cancel_timer()
+        waiter, self.__waiter = self.__waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(error)
+        self.close()
+
+    def close(self):
+        self.closed = True
+        if self.transport is not None:
+            self.transport.close()
+
+
+class _Pool(object):
+    """Connections to one server, opened as needed up to max_pool_size.
+    """
+    def __init__(self, client, address, options):
+        self._loop = client._loop
+        self.address = address
+        self.__client = client
+        self.__options = options
+        self.__idle = collections.deque()
+        self.__waiters = collections.deque()
+        self.__open = 0
+        self.__generation = 0
+
+    def get(self):
+        """Check out a connection, waiting if max_pool_size are in use."""
+        max_size = self.__options.max_pool_size
+        while True:
+            while self.__idle:
+                protocol = self.__idle.pop()
+                if not protocol.closed:
+                    raise _Return(protocol)
+                self.__open -= 1
+            if max_size is None or self.__open < max_size:
+                self.__open += 1
+                try:
+                    protocol = yield self.__connect()
+                except BaseException:
+                    self.__open -= 1
+                    self.__wake(None)
+                    raise
+                raise _Return(protocol)
+
+            # Wait for a connection to be returned, or closed.
+            waiter = self._loop.create_future()
+            self.__waiters.append(waiter)
+            try:
+                protocol = yield waiter
+            except BaseException:
+                if (waiter.done() and not waiter.cancelled() and
+                        waiter.result() is not None):
+                    self.put(waiter.result())
+                raise
+            if protocol is not None:
+                raise _Return(protocol)
+
+    def put(self, protocol):
+        """Check in a connection, closing it if the pool was cleared."""
+        if protocol.generation != self.__generation:
+            protocol.close()
+        if protocol.closed:
+            self.__open -= 1
+            self.__wake(None)
+        elif not self.__wake(protocol):
+            self.__idle.append(protocol)
+
+    def discard(self, protocol):
+        """Check in a connection in an unknown state."""
+        protocol.close()
+        self.put(protocol)
+
+    def clear(self):
+        """Close the idle connections, and the others when checked in."""
+        self.__generation += 1
+        while self.__idle:
+            self.__idle.pop().close()
+            self.__open -= 1
+
+    def __wake(self, protocol):
+        """Hand a connection, or None to open one, to a waiter."""
+        while self.__waiters:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(protocol)
+                return True
+        return False
+
+    def __connect(self):
+        if self.__client.delegate._credentials():
+            raise ConfigurationError(
+                "AsyncMongoClient doesn't support authentication")
+        loop = self._loop
+        address = self.address
+        options = self.__options
+        host, port = address
+
+        def factory():
+            return _Protocol(loop, address, options.socket_timeout)
+
+        ssl_context = options.ssl_context
+        if host.endswith('.sock'):
+            connect = loop.create_unix_connection(factory, host)
+        elif ssl_context is not None:
+            # According to RFC6066, section 3, IPv4 and IPv6 literals are
+            # not permitted for SNI hostname. Hostnames are matched below.
+            connect = loop.create_connection(
+                factory, host, port, ssl=ssl_context,
+                server_hostname='' if is_ip_address(host) else host)
+        else:
+            connect = loop.create_connection(factory, host, port)
+        try:
+            transport, protocol = yield asyncio.ensure_future(
+                asyncio.wait_for(connect, options.connect_timeout))
+        except asyncio.TimeoutError:
+            raise _connection_failure(address, socket.timeout("timed out"))
+        except OSError as exc:
+            raise _connection_failure(address, exc)
+
+        if (ssl_context is not None and ssl_context.verify_mode and
+                options.ssl_match_hostname):
+            try:
+                match_hostname(transport.get_extra_info('peercert'),
+                               hostname=host)
+            except CertificateError:
+                transport.close()
+                raise
+        protocol.generation = self.__generation
+        raise _Return(protocol)
+
+
+class AsyncMongoClient(object):
+    """An asyncio interface to MongoDB.
+
+    Takes the same arguments as :class:`~pymongo.mongo_client.MongoClient`,
+    plus `loop`, the event loop to run on. Defaults to the current event
+    loop.
+    """
+    def __init__(self, *args, **kwargs):
+        loop = kwargs.pop('loop', None)
+        self._loop = loop or asyncio.get_event_loop()
+        self.__delegate = MongoClient(*args, **kwargs)
+        self.__pools = {}
+        if self.__delegate._credentials():
+            self.__delegate.close()
+            raise ConfigurationError(
+                "AsyncMongoClient doesn't support authentication")
+
+    @property
+    def delegate(self):
+        """The :class:`~pymongo.mongo_client.MongoClient` this client uses
+        to monitor and select servers.
+        """
+        return self.__delegate
+
+    @property
+    def loop(self):
+        """The event loop this client runs on."""
+        return self._loop
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(
+                "AsyncMongoClient has no attribute %r. To access the %s"
+                " database, use client[%r]." % (name, name, name))
+        return self.__getitem__(name)
+
+    def __getitem__(self, name):
+        return AsyncDatabase(self, self.__delegate[name])
+
+    def get_database(self, name, codec_options=None, read_preference=None,
+                     write_concern=None, read_concern=None):
+        """Get an :class:`AsyncDatabase`, like
+        :meth:`~pymongo.mongo_client.MongoClient.get_database`.
+        """
+        return AsyncDatabase(self, self.__delegate.get_database(
+            name, codec_options, read_preference, write_concern,
+            read_concern))
+
+    @_coroutine
+    def server_info(self):
+        """Get information about the MongoDB server."""
+        response, _ = yield self._run(
+            'admin', SON([('buildinfo', 1)]), ReadPreference.PRIMARY)
+        raise _Return(response)
+
+    def close(self):
+        """Close the pooled connections, and the delegate MongoClient.
+
+        Connections in use are closed when they're returned.
+        """
+        for pool in self.__pools.values():
+            pool.clear()
+        self.__pools.clear()
+        self.__delegate.close()
+
+    def _select_server(self, read_preference=None, address=None):
+        """Select a server, blocking a thread, not the loop, if none of
+        the known servers match.
+        """
+        topology = self.__delegate._get_topology()
+        selector = read_preference or writable_server_selector
+        try:
+            if address is None:
+                server = topology.select_server(selector, 0)
+            else:
+                server = topology.select_server_by_address(address, 0)
+        except ServerSelectionTimeoutError:
+            if address is None:
+                select = functools.partial(topology.select_server, selector)
+            else:
+                select = functools.partial(
+                    topology.select_server_by_address, address)
+            server = yield self._loop.run_in_executor(None, select)
+        raise _Return(server)
+
+    def _run(self, dbname, spec, read_preference=None, codec_options=None,
+             address=None, **kwargs):
+        """Select a server and run a command. Returns the response and
+        the server's address.
+
+        A read_preference of None selects a writable server.
+        """
+        server = yield self._select_server(read_preference, address)
+        slave_ok = False
+        if read_preference is not None:
+            single = (self.__delegate._get_topology().description.
+                      topology_type == TOPOLOGY_TYPE.Single)
+            is_mongos = server.description.server_type == SERVER_TYPE.Mongos
+            slave_ok = (single and not is_mongos) or (
+                read_preference != ReadPreference.PRIMARY)
+        response = yield self._command(
+            server, dbname, spec, slave_ok, read_preference,
+            codec_options or DEFAULT_CODEC_OPTIONS, **kwargs)
+        raise _Return((response, server.description.address))
+
+    def _command(self, server, dbname, spec, slave_ok, read_preference,
+                 codec_options, check=True, allowable_errors=None,
+                 parse_write_concern_error=False):
+        """Run a command on `server`, like :func:`pymongo.network.command`.
+        """
+        description = server.description
+        address = description.address
+        name = next(iter(spec))
+        orig = spec
+        if (description.server_type == SERVER_TYPE.Mongos and
+                read_preference is not None):
+            spec = message._maybe_add_read_preference(spec, read_preference)
+
+        listeners = self.__delegate._event_listeners
+        publish = listeners.enabled_for_commands
+        if publish:
+            start = datetime.datetime.now()
+        request_id, msg, size = message.query(
+            4 if slave_ok else 0, dbname + '.$cmd', 0, -1, spec, None,
+            codec_options)
+        max_size = description.max_bson_size + message._COMMAND_OVERHEAD
+        if size > max_size:
+            message._raise_document_too_large(name, size, max_size)
+        if publish:
+            encoding_duration = datetime.datetime.now() - start
+            listeners.publish_command_start(orig, dbname, request_id, address)
+            start = datetime.datetime.now()
+
+        pool = self.__pools.get(address)
+        if pool is None:
+            pool = self.__pools[address] = _Pool(
+                self, address, server.pool.opts)
+        try:
+            protocol = yield pool.get()
+            try:
+                body = yield protocol.request(request_id, msg)
+            except BaseException:
+                pool.discard(protocol)
+                raise
+            pool.put(protocol)
+            response = helpers._unpack_response(
+                body, codec_options=codec_options)['data'][0]
+            if check:
+                helpers._check_command_response(
+                    response, None, allowable_errors,
+                    parse_write_concern_error=parse_write_concern_error)
+        except Exception as exc:
+            if publish:
+                duration = (
+                    datetime.datetime.now() - start) + encoding_duration
+                if isinstance(exc, (NotMasterError, OperationFailure)):
+                    failure = exc.details
+                else:
+                    failure = message._convert_exception(exc)
+                listeners.publish_command_failure(
+                    duration, failure, name, request_id, address)
+            if isinstance(exc, NotMasterError) or (
+                    isinstance(exc, ConnectionFailure) and
+                    not isinstance(exc, NetworkTimeout)):
+                pool.clear()
+                self.__delegate._reset_server_and_request_check(address)
+            raise
+        if publish:
+            duration = (datetime.datetime.now() - start) + encoding_duration
+            listeners.publish_command_success(
+                duration, response, name, request_id, address)
+        raise _Return(response)
+
+
+class AsyncDatabase(object):
+    """An asyncio :class:`~pymongo.database.Database`. Get one from an
+    :class:`AsyncMongoClient`.
+    """
+    def __init__(self, client, delegate):
+        self._loop = client._loop
+        self.__client = client
+        self.__delegate = delegate
+
+    @property
+    def client(self):
+        """The :class:`AsyncMongoClient` of this database."""
+        return self.__client
+
+    @property
+    def delegate(self):
+        """The :class:`~pymongo.database.Database` this one wraps."""
+        return self.__delegate
+
+    @property
+    def name(self):
+        return self.__delegate.name
+
+    @property
+    def codec_options(self):
+        return self.__delegate.codec_options
+
+    @property
+    def read_preference(self):
+        return self.__delegate.read_preference
+
+    @property
+    def write_concern(self):
+        return self.__delegate.write_concern
+
+    @property
+    def read_concern(self):
+        return self.__delegate.read_concern
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(
+                "AsyncDatabase has no attribute %r. To access the %s"
+                " collection, use database[%r]." % (name, name, name))
+        return self.__getitem__(name)
+
+    def __getitem__(self, name):
+        return AsyncCollection(self, self.__delegate[name])
+
+    def get_collection(self, name, codec_options=None, read_preference=None,
+                       write_concern=None, read_concern=None):
+        """Get an :class:`AsyncCollection`, like
+        :meth:`~pymongo.database.Database.get_collection`.
+        """
+        return AsyncCollection(self, self.__delegate.get_collection(
+            name, codec_options, read_preference, write_concern,
+            read_concern))
+
+    @_coroutine
+    def command(self, command, value=1, check=True, allowable_errors=None,
+                read_preference=ReadPreference.PRIMARY,
+                codec_options=DEFAULT_CODEC_OPTIONS, **kwargs):
+        """Run a command, like :meth:`~pymongo.database.Database.command`.
+        """
+        if isinstance(command, string_type):
+            command = SON([(command, value)])
+        command.update(kwargs)
+        response, _ = yield self.__client._run(
+            self.name, command, read_preference, codec_options,
+            check=check, allowable_errors=allowable_errors)
+        raise _Return(response)
+
+
+class AsyncCollection(object):
+    """An asyncio :class:`~pymongo.collection.Collection`. Get one from an
+    :class:`AsyncDatabase`.
+    """
+    def __init__(self, database, delegate):
+        self._loop = database._loop
+        self.__database = database
+        self.__delegate = delegate
+        self.__write_response_codec_options = delegate.codec_options._replace(
+            unicode_decode_error_handler='replace', document_class=dict)
+
+    @property
+    def database(self):
+        """The :class:`AsyncDatabase` of this collection."""
+        return self.__database
+
+    @property
+    def delegate(self):
+        """The :class:`~pymongo.collection.Collection` this one wraps."""
+        return self.__delegate
+
+    @property
+    def name(self):
+        return self.__delegate.name
+
+    @property
+    def full_name(self):
+        return self.__delegate.full_name
+
+    @property
+    def codec_options(self):
+        return self.__delegate.codec_options
+
+    @property
+    def read_preference(self):
+        return self.__delegate.read_preference
+
+    @property
+    def write_concern(self):
+        return self.__delegate.write_concern
+
+    @property
+    def read_concern(self):
+        return self.__delegate.read_concern
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            full_name = "%s.%s" % (self.name, name)
+            raise AttributeError(
+                "AsyncCollection has no attribute %r. To access the %s"
+                " collection, use database['%s']." % (
+                    name, full_name, full_name))
+        return self.__getitem__(name)
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.__database, self.__delegate[name])
+
+    def _run(self, spec, read_preference=None, codec_options=None,
+             address=None, **kwargs):
+        """Run a command on this collection's database."""
+        return self.__database.client._run(
+            self.__database.name, spec, read_preference,
+            codec_options or self.codec_options, address, **kwargs)
+
+    def find(self, *args, **kwargs):
+        """Query the collection. Takes the same arguments as
+        :class:`AsyncCursor`.
+        """
+        return AsyncCursor(self, *args, **kwargs)
+
+    @_coroutine
+    def find_one(self, filter=None, *args, **kwargs):
+        """Get a single document, or None. Takes the same arguments as
+        :meth:`find`, and like
+        :meth:`~pymongo.collection.Collection.find_one`, `filter` may be
+        an ``_id``.
+        """
+        if (filter is not None and not
+                isinstance(filter, collections.Mapping)):
+            filter = {"_id": filter}
+        cursor = self.find(filter, *args, **kwargs).limit(-1)
+        documents = yield cursor._collect(1)
+        raise _Return(documents[0] if documents else None)
+
+    def aggregate(self, pipeline, batch_size=None, **kwargs):
+        """Run an aggregation, and return an :class:`AsyncCommandCursor`
+        over its results.
+
+        :Parameters:
+          - `pipeline`: A list of aggregation pipeline stages.
+          - `batch_size` (optional): Documents per batch.
+          - `**kwargs`: Other options for the aggregate command, like
+            ``allowDiskUse``.
+        """
+        if not isinstance(pipeline, list):
+            raise TypeError("pipeline must be a list")
+        cmd = SON([('aggregate', self.name), ('pipeline', pipeline)])
+        cmd.update(kwargs)
+        cmd['cursor'] = {'batchSize': batch_size} if batch_size else {}
+        read_preference = self.read_preference
+        if any('$out' in stage for stage in pipeline):
+            read_preference = None
+        elif self.read_concern.level:
+            cmd['readConcern'] = self.read_concern.document
+        return AsyncCommandCursor(self, cmd, read_preference, batch_size)
+
+    @_coroutine
+    def count(self, filter=None, **kwargs):
+        """Count the documents matching `filter`, like
+        :meth:`~pymongo.collection.Collection.count`.
+        """
+        cmd = SON([('count', self.name)])
+        if filter is not None:
+            if "query" in kwargs:
+                raise ConfigurationError("can't pass both filter and query")
+            kwargs["query"] = filter
+        cmd.update(kwargs)
+        if self.read_concern.level:
+            cmd['readConcern'] = self.read_concern.document
+        response, _ = yield self._run(
+            cmd, self.read_preference, self.__write_response_codec_options,
+            allowable_errors=["ns missing"])
+        if response.get("errmsg", "") == "ns missing":
+            raise _Return(0)
+        raise _Return(int(response["n"]))
+
+    @_coroutine
+    def distinct(self, key, filter=None, **kwargs):
+        """Get the distinct values of `key` in the documents matching
+        `filter`.
+        """
+        if not isinstance(key, string_type):
+            raise TypeError("key must be an instance of %s" % (
+                string_type.__name__,))
+        cmd = SON([("distinct", self.name), ("key", key)])
+        if filter is not None:
+            cmd["query"] = filter
+        cmd.update(kwargs)
+        if self.read_concern.level:
+            cmd['readConcern'] = self.read_concern.document
+        response, _ = yield self._run(cmd, self.read_preference)
+        raise _Return(response["values"])
+
+    def __write(self, operation, field, items, ordered=True,
+                bypass_document_validation=False, server=None):
+        """Send a write command. Returns its response and whether it was
+        acknowledged.
+        """
+        concern = self.write_concern.document
+        acknowledged = concern.get("w") != 0
+        cmd = SON([(operation, self.name), ('ordered', ordered),
+                   (field, items)])
+        if concern:
+            cmd['writeConcern'] = concern
+        if bypass_document_validation:
+            cmd['bypassDocumentValidation'] = True
+        client = self.__database.client
+        if server is None:
+            server = yield client._select_server()
+        response = yield client._command(
+            server, self.__database.name, cmd, False, None,
+            self.__write_response_codec_options)
+        raise _Return((response, acknowledged))
+
+    @_coroutine
+    def insert_one(self, document, bypass_document_validation=False):
+        """Insert a document, adding an ``_id`` if it has none. Returns an
+        :class:`~pymongo.results.InsertOneResult`.
+        """
+        common.validate_is_document_type("document", document)
+        if not (isinstance(document, RawBSONDocument) or "_id" in document):
+            document["_id"] = ObjectId()
+        response, acknowledged = yield self.__write(
+            'insert', 'documents', [document], True,
+            bypass_document_validation)
+        if acknowledged:
+            helpers._check_write_command_response([(0, response)])
+        raise _Return(InsertOneResult(document.get("_id"), acknowledged))
+
+    @_coroutine
+    def insert_many(self, documents, ordered=True,
+                    bypass_document_validation=False):
+        """Insert documents, adding an ``_id`` to those that have none.
+        Returns an :class:`~pymongo.results.InsertManyResult`.
+
+        Each document is encoded once, and the documents are sent in
+        batches within the server's size and count limits.
+        """
+        if (not isinstance(documents, collections.Iterable) or
+                not documents):
+            raise TypeError("documents must be a non-empty list")
+        server = yield self.__database.client._select_server()
+        max_bson_size = server.description.max_bson_size
+        max_count = server.description.max_write_batch_size
+        inserted_ids = []
+        batches = [[]]
+        batch_size = 0
+        for document in documents:
+            common.validate_is_document_type("document", document)
+            if not isinstance(document, RawBSONDocument):
+                if "_id" not in document:
+                    document["_id"] = ObjectId()
+                document = RawBSONDocument(
+                    BSON.encode(document, True, self.codec_options),
+                    self.codec_options)
+            size = len(document.raw)
+            if size > max_bson_size:
+                message._raise_document_too_large('insert', size,
+                                                  max_bson_size)
+            if batches[-1] and (len(batches[-1]) >= max_count or
+                                batch_size + size > max_bson_size):
+                batches.append([])
+                batch_size = 0
+            batches[-1].append(document)
+            batch_size += size
+            inserted_ids.append(document["_id"])
+
+        results = []
+        offset = 0
+        for batch in batches:
+            response, acknowledged = yield self.__write(
+                'insert', 'documents', batch, ordered,
+                bypass_document_validation, server)
+            results.append((offset, response))
+            offset += len(batch)
+            if ordered and "writeErrors" in response:
+                break
+        if acknowledged:
+            helpers._check_write_command_response(results)
+        raise _Return(InsertManyResult(inserted_ids, acknowledged))
+
+    @_coroutine
+    def __update(self, filter, document, upsert, multi,
+                 bypass_document_validation):
+        common.validate_is_mapping("filter", filter)
+        common.validate_boolean("upsert", upsert)
+        update = SON([('q', filter), ('u', document), ('multi', multi),
+                      ('upsert', upsert)])
+        response, acknowledged = yield self.__write(
+            'update', 'updates', [update], True, bypass_document_validation)
+        if acknowledged:
+            helpers._check_write_command_response([(0, response)])
+            # Shaped like Collection's results, see Collection._update.
+            response = response.copy()
+            if response.get('n') and 'upserted' not in response:
+                response['updatedExisting'] = True
+            else:
+                response['updatedExisting'] = False
+                if 'upserted' in response:
+                    response['upserted'] = response['upserted'][0]['_id']
+        raise _Return(UpdateResult(response, acknowledged))
+
+    def update_one(self, filter, update, upsert=False,
+                   bypass_document_validation=False):
+        """Update a single document. Returns an
+        :class:`~pymongo.results.UpdateResult`.
+        """
+        common.validate_ok_for_update(update)
+        return self.__update(filter, update, upsert, False,
+                             bypass_document_validation)
+
+    def update_many(self, filter, update, upsert=False,
+                    bypass_document_validation=False):
+        """Update all documents matching `filter`. Returns an
+        :class:`~pymongo.results.UpdateResult`.
+        """
+        common.validate_ok_for_update(update)
+        return self.__update(filter, update, upsert, True,
+                             bypass_document_validation)
+
+    def replace_one(self, filter, replacement, upsert=False,
+                    bypass_document_validation=False):
+        """Replace a single document. Returns an
+        :class:`~pymongo.results.UpdateResult`.
+        """
+        common.validate_ok_for_replace(replacement)
+        return self.__update(filter, replacement, upsert, False,
+                             bypass_document_validation)
+
+    @_coroutine
+    def __delete(self, filter, multi):
+        common.validate_is_mapping("filter", filter)
+        delete = SON([('q', filter), ('limit', int(not multi))])
+        response, acknowledged = yield self.__write(
+            'delete', 'deletes', [delete])
+        if acknowledged:
+            helpers._check_write_command_response([(0, response)])
+        raise _Return(DeleteResult(response, acknowledged))
+
+    def delete_one(self, filter):
+        """Delete a single document. Returns a
+        :class:`~pymongo.results.DeleteResult`.
+        """
+        return self.__delete(filter, False)
+
+    def delete_many(self, filter):
+        """Delete all documents matching `filter`. Returns a
+        :class:`~pymongo.results.DeleteResult`.
+        """
+        return self.__delete(filter, True)
+
+
+class _AsyncCursorBase(object):
+    """Iterate over a server cursor with ``async for``."""
+
+    def __init__(self, collection, batch_size):
+        self._loop = collection._loop
+        self._collection = collection
+        self._batch_size = batch_size
+        self.__id = None
+        self.__address = None
+        self.__data = collections.deque()
+        self.__killed = False
+
+    def __del__(self):
+        self.__die()
+
+    def _first_command(self):
+        """The command, read preference and codec options that start the
+        cursor.
+        """
+        raise NotImplementedError
+
+    def _received(self, documents):
+        """Trim a batch, and return True if no more are needed."""
+        return False
+
+    @property
+    def started(self):
+        """True once the first batch is requested."""
+        return self.__id is not None
+
+    @property
+    def alive(self):
+        """False once every document has been returned."""
+        return bool(self.__data) or not (self.__killed or self.__id == 0)
+
+    @property
+    def cursor_id(self):
+        """The server's id for this cursor, or None until it starts."""
+        return self.__id
+
+    @property
+    def address(self):
+        """The (host, port) of the server the cursor is on."""
+        return self.__address
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        if self.__data:
+            return _Ready(self.__data.popleft())
+        if self.__killed or self.__id == 0:
+            return _Ready(exception=StopAsyncIteration())
+        return self.__fetch_next()
+
+    @_coroutine
+    def __fetch_next(self):
+        while not self.__data:
+            if self.__killed or self.__id == 0:
+                raise StopAsyncIteration()
+            yield self.__refresh()
+        raise _Return(self.__data.popleft())
+
+    @_coroutine
+    def to_list(self, length=None):
+        """Return a list of the next `length` documents, or all of them.
+        """
+        documents = yield self._collect(length)
+        raise _Return(documents)
+
+    def _collect(self, length):
+        documents = []
+        while length is None or len(documents) < length:
+            if not self.__data:
+                if self.__killed or self.__id == 0:
+                    break
+                yield self.__refresh()
+                continue
+            documents.append(self.__data.popleft())
+        raise _Return(documents)
+
+    def __refresh(self):
+        """Get the next batch of documents."""
+        collection = self._collection
+        try:
+            if self.__id is None:
+                # Started, with no id yet.
+                self.__id = -1
+                command, read_preference, codec_options = (
+                    self._first_command())
+                response, self.__address = yield collection._run(
+                    command, read_preference, codec_options)
+                cursor = response['cursor']
+                documents = cursor['firstBatch']
+            else:
+                command = message._gen_get_more_command(
+                    self.__id, collection.name, self._batch_size, None)
+                response, _ = yield collection._run(
+                    command, collection.read_preference,
+                    address=self.__address)
+                cursor = response['cursor']
+                documents = cursor['nextBatch']
+        except BaseException:
+            self.__die()
+            raise
+        self.__id = cursor['id']
+        if self._received(documents):
+            self.__die()
+        self.__data.extend(documents)
+
+    def __die(self):
+        cursor_id, self.__id = self.__id, 0
+        if cursor_id and cursor_id != -1 and not self.__killed:
+            # Closed on the delegate client's thread.
+            self._collection.database.client.delegate.close_cursor(
+                cursor_id, self.__address)
+        self.__killed = True
+
+    def close(self):
+        """Close the server cursor. Buffered documents are discarded."""
+        self.__data.clear()
+        self.__die()
+
+
+class AsyncCursor(_AsyncCursorBase):
+    """The results of :meth:`AsyncCollection.find`.
+
+    Iterate with ``async for``, or get a list with :meth:`to_list`.
+
+    :Parameters:
+      - `collection`: The :class:`AsyncCollection` to query.
+      - `filter` (optional): A query that documents must match.
+      - `projection` (optional): A list of field names, or a dict of
+        fields to include or exclude.
+      - `skip` (optional): The number of documents to skip.
+      - `limit` (optional): The most documents to return. A negative
+        limit returns at most that many, in one batch.
+      - `no_cursor_timeout` (optional): If True, the server won't close
+        the cursor after 10 minutes of inactivity.
+      - `sort` (optional): A list of (key, direction) pairs.
+      - `batch_size` (optional): Documents per batch.
+      - `max_time_ms` (optional): A time limit for the query, in
+        milliseconds.
+    """
+    def __init__(self, collection, filter=None, projection=None, skip=0,
+                 limit=0, no_cursor_timeout=False, sort=None, batch_size=0,
+                 max_time_ms=None):
+        super(AsyncCursor, self).__init__(collection, batch_size)
+        if filter is not None:
+            common.validate_is_mapping("filter", filter)
+        if projection is not None and not isinstance(
+                projection, collections.Mapping):
+            projection = helpers._fields_list_to_dict(
+                projection, "projection")
+        self.__filter = filter or {}
+        self.__projection = projection
+        self.__no_cursor_timeout = no_cursor_timeout
+        self.__returned = 0
+        self.__limit = 0
+        self.__skip = 0
+        self.__sort = None
+        self.__max_time_ms = None
+        self.skip(skip)
+        self.limit(limit)
+        self.batch_size(batch_size)
+        if sort is not None:
+            self.sort(sort)
+        self.max_time_ms(max_time_ms)
+
+    def __check_okay_to_chain(self):
+        if self.started:
+            raise InvalidOperation("cannot set options after executing query")
+
+    def limit(self, limit):
+        """Return at most `limit` documents."""
+        if not isinstance(limit, integer_types):
+            raise TypeError("limit must be an integer")
+        self.__check_okay_to_chain()
+        self.__limit = limit
+        return self
+
+    def skip(self, skip):
+        """Skip the first `skip` documents."""
+        if not isinstance(skip, integer_types):
+            raise TypeError("skip must be an integer")
+        if skip < 0:
+            raise ValueError("skip must be >= 0")
+        self.__check_okay_to_chain()
+        self.__skip = skip
+        return self
+
+    def sort(self, key_or_list, direction=None):
+        """Sort the results, like :meth:`~pymongo.cursor.Cursor.sort`."""
+        self.__check_okay_to_chain()
+        self.__sort = helpers._index_document(
+            helpers._index_list(key_or_list, direction))
+        return self
+
+    def batch_size(self, batch_size):
+        """Get documents from the server `batch_size` at a time."""
+        if not isinstance(batch_size, integer_types):
+            raise TypeError("batch_size must be an integer")
+        if batch_size < 0:
+            raise ValueError("batch_size must be >= 0")
+        self.__check_okay_to_chain()
+        self._batch_size = batch_size
+        return self
+
+    def max_time_ms(self, max_time_ms):
+        """Stop the query after `max_time_ms` milliseconds."""
+        if (max_time_ms is not None and
+                not isinstance(max_time_ms, integer_types)):
+            raise TypeError("max_time_ms must be an integer or None")
+        self.__check_okay_to_chain()
+        self.__max_time_ms = max_time_ms
+        return self
+
+    def _first_command(self):
+        collection = self._collection
+        spec = self.__filter
+        if self.__sort or self.__max_time_ms:
+            spec = SON([('$query', spec)])
+            if self.__sort:
+                spec['$orderby'] = self.__sort
+            if self.__max_time_ms:
+                spec['$maxTimeMS'] = self.__max_time_ms
+        options = 0
+        if self.__no_cursor_timeout:
+            options |= _QUERY_OPTIONS["no_timeout"]
+        command = message._gen_find_command(
+            collection.name, spec, self.__projection, self.__skip,
+            self.__limit, self._batch_size, options,
+            collection.read_concern)
+        return command, collection.read_preference, collection.codec_options
+
+    def _received(self, documents):
+        limit = abs(self.__limit)
+        self.__returned += len(documents)
+        if limit and self.__returned >= limit:
+            excess = self.__returned - limit
+            if excess:
+                del documents[-excess:]
+            return True
+        return self.__limit < 0
+
+
+class AsyncCommandCursor(_AsyncCursorBase):
+    """The results of :meth:`AsyncCollection.aggregate`."""
+
+    def __init__(self, collection, command, read_preference, batch_size):
+        super(AsyncCommandCursor, self).__init__(collection, batch_size)
+        self.__command = command
+        self.__read_preference = read_preference
+
+    def _first_command(self):
+        return (self.__command, self.__read_preference,
+                self._collection.codec_options)
@@ -16,6 +16,7 @@
 
 import hmac
 import socket
+import threading
 
 HAVE_KERBEROS = True
 try:
@@ -123,26 +124,40 @@ except ImportError:
             return pbkdf2_hmac('sha1', data, salt, iterations)
 
     except ImportError:
+        _TRANS_5C = bytes(bytearray((x ^ 0x5C) for x in range(256)))
+        _TRANS_36 = bytes(bytearray((x ^ 0x36) for x in range(256)))
 
         def _hi(data, salt, iterations):
-            """A simple implementation of PBKDF2."""
-            mac = hmac.HMAC(data, None, sha1)
-
-            def _digest(msg, mac=mac):
-                """Get a digest for msg."""
-                _mac = mac.copy()
-                _mac.update(msg)
-                return _mac.digest()
-
+            """A simple implementation of PBKDF2 with HMAC-SHA1.
+
+            Computes HMAC by hand from SHA-1 states pre-keyed with the inner
+            and outer pads, copying two hash objects per iteration instead
+            of a whole HMAC object.
+            """
+            if len(data) > 64:
+                data = sha1(data).digest()
+            data += b'\x00' * (64 - len(data))
+            inner_copy = sha1(data.translate(_TRANS_36)).copy
+            outer_copy = sha1(data.translate(_TRANS_5C)).copy
             from_bytes = _from_bytes
-            to_bytes = _to_bytes
+
+            def _digest(msg):
+                inner = inner_copy()
+                inner.update(msg)
+                outer = outer_copy()
+                outer.update(inner.digest())
+                return outer.digest()
 
             _u1 = _digest(salt + b'\x00\x00\x00\x01')
             _ui = from_bytes(_u1, 'big')
             for _ in range(iterations - 1):
-                _u1 = _digest(_u1)
+                inner = inner_copy()
+                inner.update(_u1)
+                outer = outer_copy()
+                outer.update(inner.digest())
+                _u1 = outer.digest()
                 _ui ^= from_bytes(_u1, 'big')
-            return to_bytes(_ui, 20, 'big')
+            return _to_bytes(_ui, 20, 'big')
 
 try:
     from hmac import compare_digest
@@ -174,6 +189,86 @@ except ImportError:
         return result == 0
 
 
+class _ScramKeyCache(object):
+    """Client and server keys of recent SCRAM-SHA-1 conversations.
+
+    Deriving the keys runs PBKDF2 with the server's iteration count, which
+    dominates the cost of authenticating a new socket. Entries are keyed by
+    (password digest, salt, iterations): the digest covers the user name
+    and password, and the server picks a new salt when a password changes.
+    When several threads miss on the same key at once, one computes the
+    keys while the others wait for it.
+
+    :Parameters:
+      - `max_size`: The most entries kept. The least recently used entry
+        is evicted first.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        # Maps key to [value, last use].
+        self.entries = {}
+        # Maps key to a threading.Event set when it has been computed.
+        self.computing = {}
+        self.counter = 0
+
+    def get(self, key, compute):
+        """Return the cached value for key, or call compute() to get it."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.counter += 1
+                entry[1] = self.counter
+                return entry[0]
+            event = self.computing.get(key)
+            owner = event is None
+            if owner:
+                event = self.computing[key] = threading.Event()
+
+        if not owner:
+            event.wait()
+            with self.lock:
+                entry = self.entries.get(key)
+            if entry is not None:
+                return entry[0]
+            # The computation failed in the other thread, try ourselves.
+            return compute()
+
+        try:
+            value = compute()
+            with self.lock:
+                if len(self.entries) >= self.max_size:
+                    oldest = min(self.entries,
+                                 key=lambda k: self.entries[k][1])
+                    del self.entries[oldest]
+                self.counter += 1
+                self.entries[key] = [value, self.counter]
+        finally:
+            with self.lock:
+                del self.computing[key]
+            event.set()
+        return value
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_SCRAM_KEY_CACHE = _ScramKeyCache(max_size=64)
+
+
+def _scram_sha1_keys(data, salt, iterations):
+    """Return the client key and server key for a salted password."""
+    salted_pass = _hi(data, salt, iterations)
+    client_key = hmac.HMAC(salted_pass, b"Client Key", sha1).digest()
+    server_key = hmac.HMAC(salted_pass, b"Server Key", sha1).digest()
+    return client_key, server_key
+
+
 def _parse_scram_response(response):
     """Split a scram response into key, value pairs."""
     return dict(item.split(b"=", 1) for item in response.split(b","))
@@ -209,27 +304,33 @@ def _authenticate_scram_sha1(credentials, sock_info):
         raise OperationFailure("Server returned an invalid nonce.")
 
     without_proof = b"c=biws,r=" + rnonce
-    salted_pass = _hi(_password_digest(username, password).encode("utf-8"),
-                      standard_b64decode(salt),
-                      iterations)
-    client_key = _hmac(salted_pass, b"Client Key", _sha1).digest()
+    data = _password_digest(username, password).encode("utf-8")
+    salt = standard_b64decode(salt)
+    cache_key = (data, salt, iterations)
+    client_key, server_key = _SCRAM_KEY_CACHE.get(
+        cache_key, lambda: _scram_sha1_keys(data, salt, iterations))
     stored_key = _sha1(client_key).digest()
     auth_msg = b",".join((first_bare, server_first, without_proof))
     client_sig = _hmac(stored_key, auth_msg, _sha1).digest()
     client_proof = b"p=" + standard_b64encode(_xor(client_key, client_sig))
     client_final = b",".join((without_proof, client_proof))
 
-    server_key = _hmac(salted_pass, b"Server Key", _sha1).digest()
     server_sig = standard_b64encode(
         _hmac(server_key, auth_msg, _sha1).digest())
 
     cmd = SON([('saslContinue', 1),
                ('conversationId', res['conversationId']),
                ('payload', Binary(client_final))])
-    res = sock_info.command(source, cmd)
+    try:
+        res = sock_info.command(source, cmd)
+    except OperationFailure:
+        # Perhaps the password is wrong: don't keep its keys.
+        _SCRAM_KEY_CACHE.discard(cache_key)
+        raise
 
     parsed = _parse_scram_response(res['payload'])
     if not compare_digest(parsed[b'v'], server_sig):
+        _SCRAM_KEY_CACHE.discard(cache_key)
         raise OperationFailure("Server returned an invalid signature.")
 
     # Depending on how it's configured, Cyrus SASL (which the server uses)
@@ -17,6 +17,10 @@
 .. versionadded:: 2.7
 """
 
+import threading
+
+from collections import deque
+
 from bson.objectid import ObjectId
 from bson.raw_bson import RawBSONDocument
 from bson.son import SON
@@ -31,6 +35,7 @@ from pymongo.errors import (BulkWriteError,
                             InvalidOperation,
                             OperationFailure)
 from pymongo.message import (_INSERT, _UPDATE, _DELETE,
+                             _batched_write_command,
                              _do_batched_write_command,
                              _randint,
                              _BulkWriteContext)
@@ -198,6 +203,119 @@ def _merge_command(run, full_result, results):
             full_result["writeConcernErrors"].append(wc_error)
 
 
+class _PipelinedSender(object):
+    """Send encoded write command batches on several sockets at once.
+
+    The caller encodes batches and hands them to :meth:`send`, which
+    blocks while `max_in_flight` batches are waiting. Sender threads start
+    as needed, up to `max_in_flight`. The first one uses the caller's
+    socket. The others check sockets out of the same server's pool without
+    waiting: once the pool has none to spare, no more threads start and
+    the running ones send the remaining batches.
+    """
+    def __init__(self, client, sock_info, max_in_flight, db_name, op_id):
+        self.client = client
+        self.sock_info = sock_info
+        server = client._topology.get_server_by_address(sock_info.address)
+        self.pool = server.pool if server is not None else None
+        self.credentials = client._credentials()
+        # Set when the pool has no more sockets to lend.
+        self.exhausted = self.pool is None
+        self.max_in_flight = max_in_flight
+        self.db_name = db_name
+        self.op_id = op_id
+        self.listeners = client._event_listeners
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.pending = deque()
+        self.results = []
+        self.error = None
+        self.closed = False
+        self.threads = []
+        self.idle = 0
+        self.sent = 0
+
+    def send(self, run, cmd, batch):
+        """Queue a batch from _batched_write_command to be sent.
+
+        Returns False, without queueing the batch, if sending has failed.
+        """
+        with self.lock:
+            while (len(self.pending) >= self.max_in_flight and
+                   self.error is None):
+                self.cond.wait()
+            if self.error is not None:
+                return False
+            self.pending.append((self.sent, run, cmd, batch))
+            self.sent += 1
+            if (not self.idle and len(self.threads) < self.max_in_flight and
+                    (not self.threads or not self.exhausted)):
+                thread = threading.Thread(
+                    target=self._run, args=(not self.threads,),
+                    name="pymongo_bulk_write_thread")
+                thread.daemon = True
+                self.threads.append(thread)
+                thread.start()
+            else:
+                self.cond.notify()
+        return True
+
+    def close(self):
+        """Wait for the queued batches to be sent.
+
+        Returns a list of (run, offset, result) in the order the batches
+        were queued. Raises the first error any sender thread hit.
+        """
+        with self.lock:
+            self.closed = True
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+        self.results.sort(key=lambda result: result[0])
+        return [result[1:] for result in self.results]
+
+    def _run(self, use_callers_socket):
+        try:
+            if use_callers_socket:
+                self._send_batches(self.sock_info)
+                return
+            with self.pool.get_socket_nowait(self.credentials) as sock_info:
+                if sock_info is None:
+                    # Leave this thread's batches to the others.
+                    with self.lock:
+                        self.exhausted = True
+                    return
+                self._send_batches(sock_info)
+        except Exception as exc:
+            with self.lock:
+                if self.error is None:
+                    self.error = exc
+                self.cond.notify_all()
+
+    def _send_batches(self, sock_info):
+        while True:
+            with self.lock:
+                self.idle += 1
+                while (not self.pending and not self.closed and
+                       self.error is None):
+                    self.cond.wait()
+                self.idle -= 1
+                if self.error is not None or not self.pending:
+                    return
+                seq, run, cmd, batch = self.pending.popleft()
+                # Wake the caller if it waits for room in the queue.
+                self.cond.notify_all()
+
+            offset, request_id, msg, docs = batch
+            ctx = _BulkWriteContext(
+                self.db_name, cmd, sock_info, self.op_id, self.listeners)
+            result = ctx.write_command(request_id, msg, docs)
+            with self.lock:
+                self.results.append((seq, run, offset, result))
+
+
 class _Bulk(object):
     """The private guts of the bulk write API.
     """
@@ -303,26 +421,28 @@ class _Bulk(object):
         }
         op_id = _randint()
         db_name = self.collection.database.name
-        listeners = self.collection.database.client._event_listeners
+        client = self.collection.database.client
+        listeners = client._event_listeners
 
-        for run in generator:
-            cmd = SON([(_COMMANDS[run.op_type], self.collection.name),
-                       ('ordered', self.ordered)])
-            if write_concern.document:
-                cmd['writeConcern'] = write_concern.document
-            if self.bypass_doc_val and sock_info.max_wire_version >= 4:
-                cmd['bypassDocumentValidation'] = True
-
-            bwc = _BulkWriteContext(db_name, cmd, sock_info, op_id, listeners)
-            results = _do_batched_write_command(
-                self.namespace, run.op_type, cmd,
-                run.ops, True, self.collection.codec_options, bwc)
-
-            _merge_command(run, full_result, results)
-            # We're supposed to continue if errors are
-            # at the write concern level (e.g. wtimeout)
-            if self.ordered and full_result['writeErrors']:
-                break
+        if not self.ordered and client.bulk_write_concurrency > 1:
+            self.execute_pipelined(
+                sock_info, generator, write_concern, full_result, op_id,
+                client.bulk_write_concurrency)
+        else:
+            for run in generator:
+                cmd = self._make_command(run, sock_info, write_concern)
+                bwc = _BulkWriteContext(
+                    db_name, cmd, sock_info, op_id, listeners,
+                    client._document_encoder)
+                results = _do_batched_write_command(
+                    self.namespace, run.op_type, cmd,
+                    run.ops, True, self.collection.codec_options, bwc)
+
+                _merge_command(run, full_result, results)
+                # We're supposed to continue if errors are
+                # at the write concern level (e.g. wtimeout)
+                if self.ordered and full_result['writeErrors']:
+                    break
 
         if full_result["writeErrors"] or full_result["writeConcernErrors"]:
             if full_result['writeErrors']:
@@ -331,6 +451,53 @@ class _Bulk(object):
             raise BulkWriteError(full_result)
         return full_result
 
+    def execute_pipelined(self, sock_info, generator, write_concern,
+                          full_result, op_id, max_in_flight):
+        """Execute unordered write commands with several batches in flight.
+
+        Encodes each batch while up to `max_in_flight` earlier batches are
+        sent on separate sockets, then merges all results into full_result.
+        """
+        db_name = self.collection.database.name
+        client = self.collection.database.client
+        sender = _PipelinedSender(
+            client, sock_info, max_in_flight, db_name, op_id)
+        try:
+            for run in generator:
+                cmd = self._make_command(run, sock_info, write_concern)
+                # Only used for the server's size limits while encoding.
+                bwc = _BulkWriteContext(
+                    db_name, cmd, sock_info, op_id, client._event_listeners,
+                    client._document_encoder)
+                for batch in _batched_write_command(
+                        self.namespace, run.op_type, cmd, run.ops, True,
+                        self.collection.codec_options, bwc):
+                    if not sender.send(run, cmd, batch):
+                        break
+                if sender.error is not None:
+                    # A batch failed, close() raises the error.
+                    break
+        except Exception:
+            # Wait for the batches in flight before raising.
+            try:
+                sender.close()
+            except Exception:
+                pass
+            raise
+
+        for run, offset, result in sender.close():
+            _merge_command(run, full_result, [(offset, result)])
+
+    def _make_command(self, run, sock_info, write_concern):
+        """The write command for a run, without its documents."""
+        cmd = SON([(_COMMANDS[run.op_type], self.collection.name),
+                   ('ordered', self.ordered)])
+        if write_concern.document:
+            cmd['writeConcern'] = write_concern.document
+        if self.bypass_doc_val and sock_info.max_wire_version >= 4:
+            cmd['bypassDocumentValidation'] = True
+        return cmd
+
     def execute_no_results(self, sock_info, generator):
         """Execute all operations, returning no results (w=0).
         """
@@ -479,8 +646,7 @@ class _Bulk(object):
         else:
             generator = self.gen_unordered()
 
-        client = self.collection.database.client
-        with client._socket_for_writes() as sock_info:
+        with self.collection._socket_for_writes() as sock_info:
             if sock_info.max_wire_version < 5 and self.uses_collation:
                 raise ConfigurationError(
                     'Must be connected to MongoDB 3.4+ to use a collation.')
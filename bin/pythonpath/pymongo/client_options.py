@@ -19,8 +19,9 @@ from pymongo.auth import _build_credentials_tuple
 from pymongo.common import validate_boolean
 from pymongo import common
 from pymongo.errors import ConfigurationError
-from pymongo.monitoring import _EventListeners
+from pymongo.monitoring import _EventListeners, DROP_NEWEST
 from pymongo.pool import PoolOptions
+from pymongo.profiler import _log_from_environment, _threshold_from_environment
 from pymongo.read_concern import ReadConcern
 from pymongo.read_preferences import make_read_preference
 from pymongo.ssl_support import get_ssl_context
@@ -109,7 +110,11 @@ def _parse_pool_options(options):
     wait_queue_timeout = options.get('waitqueuetimeoutms')
     wait_queue_multiple = options.get('waitqueuemultiple')
     event_listeners = options.get('event_listeners')
+    event_queue_size = options.get('eventqueuesize', 0)
+    event_queue_overflow = options.get('eventqueueoverflow', DROP_NEWEST)
     appname = options.get('appname')
+    fork_handoff_size = options.get('forkhandoffsize',
+                                    common.FORK_HANDOFF_SIZE)
     ssl_context, ssl_match_hostname = _parse_ssl_options(options)
     return PoolOptions(max_pool_size,
                        min_pool_size,
@@ -117,8 +122,11 @@ def _parse_pool_options(options):
                        connect_timeout, socket_timeout,
                        wait_queue_timeout, wait_queue_multiple,
                        ssl_context, ssl_match_hostname, socket_keepalive,
-                       _EventListeners(event_listeners),
-                       appname)
+                       _EventListeners(event_listeners,
+                                       event_queue_size,
+                                       event_queue_overflow),
+                       appname,
+                       fork_handoff_size)
 
 
 class ClientOptions(object):
@@ -133,6 +141,8 @@ class ClientOptions(object):
             username, password, database, options)
         self.__local_threshold_ms = options.get(
             'localthresholdms', common.LOCAL_THRESHOLD_MS)
+        self.__local_threshold_percentile = options.get(
+            'localthresholdpercentile', common.LOCAL_THRESHOLD_PERCENTILE)
         # self.__server_selection_timeout is in seconds. Must use full name for
         # common.SERVER_SELECTION_TIMEOUT because it is set directly by tests.
         self.__server_selection_timeout = options.get(
@@ -145,6 +155,20 @@ class ClientOptions(object):
         self.__connect = options.get('connect')
         self.__heartbeat_frequency = options.get(
             'heartbeatfrequencyms', common.HEARTBEAT_FREQUENCY)
+        self.__bulk_write_concurrency = options.get(
+            'bulkwriteconcurrency', common.BULK_WRITE_CONCURRENCY)
+        self.__encode_workers = options.get(
+            'encodeworkers', common.ENCODE_WORKERS)
+        self.__document_cache_size = options.get(
+            'documentcachesize', common.DOCUMENT_CACHE_SIZE)
+        self.__document_cache_ttl = options.get(
+            'documentcachettlms', common.DOCUMENT_CACHE_TTL)
+        if 'slowquerythresholdms' in options:
+            self.__slow_query_threshold = options['slowquerythresholdms']
+        else:
+            self.__slow_query_threshold = _threshold_from_environment()
+        self.__slow_query_log = options.get('slowquerylog',
+                                            _log_from_environment())
 
     @property
     def _options(self):
@@ -171,6 +195,12 @@ class ClientOptions(object):
         """The local threshold for this instance."""
         return self.__local_threshold_ms
 
+    @property
+    def local_threshold_percentile(self):
+        """Round trip time percentile compared with the local threshold, or
+        None to compare average round trip times."""
+        return self.__local_threshold_percentile
+
     @property
     def server_selection_timeout(self):
         """The server selection timeout for this instance in seconds."""
@@ -181,6 +211,36 @@ class ClientOptions(object):
         """The monitoring frequency in seconds."""
         return self.__heartbeat_frequency
 
+    @property
+    def bulk_write_concurrency(self):
+        """Maximum number of batches of an unordered write in flight."""
+        return self.__bulk_write_concurrency
+
+    @property
+    def encode_workers(self):
+        """Processes encoding the documents of batched writes, or 0."""
+        return self.__encode_workers
+
+    @property
+    def document_cache_size(self):
+        """Maximum bytes of query results to cache, or 0 to disable."""
+        return self.__document_cache_size
+
+    @property
+    def document_cache_ttl(self):
+        """Seconds to keep cached query results, or None."""
+        return self.__document_cache_ttl
+
+    @property
+    def slow_query_threshold(self):
+        """Seconds before a query is profiled as slow, or None."""
+        return self.__slow_query_threshold
+
+    @property
+    def slow_query_log(self):
+        """File to log slow queries to, or None."""
+        return self.__slow_query_log
+
     @property
     def pool_options(self):
         """A :class:`~pymongo.pool.PoolOptions` instance."""
@@ -0,0 +1,168 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Share one MongoClient per URI and options within a process.
+
+Every :class:`~pymongo.mongo_client.MongoClient` parses its URI, starts
+monitor threads and fills its own connection pools. Code that creates a
+client for each task can instead borrow a shared one::
+
+    from pymongo import client_registry
+
+    with client_registry.shared_client(os.environ["AVALON_MONGO"]) as client:
+        client.avalon.assets.find_one()
+
+or, when the client's lifetime is not a block::
+
+    client = client_registry.get_client(uri, serverSelectionTimeoutMS=500)
+    ...
+    client_registry.release_client(client)
+
+Calls with the same host, port and keyword arguments get the same client.
+Each :func:`get_client` must be matched by one :func:`release_client`; the
+client is closed when the last user releases it. Don't call ``close()`` on
+a shared client, or use it in a ``with`` statement directly.
+
+After a fork the child process starts with an empty registry, and creates
+new clients instead of using the parent's.
+"""
+
+import contextlib
+import os
+import threading
+
+from bson.py3compat import iteritems
+from pymongo.mongo_client import MongoClient
+
+
+def _freeze(value):
+    """A hashable stand-in for a keyword argument's value."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item))
+                            for key, item in iteritems(value)))
+    return value
+
+
+def _client_key(host, port, kwargs):
+    try:
+        return (_freeze(host), port, tuple(sorted(
+            (key.lower(), _freeze(value))
+            for key, value in iteritems(kwargs))))
+    except TypeError:
+        raise TypeError("arguments to a shared client must be hashable, or "
+                        "lists, tuples or dicts of hashable values")
+
+
+class _Registry(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        # Maps a client's key to [client, reference count].
+        self.clients = {}
+        # Maps id(client) to its key.
+        self.keys = {}
+
+    def _check_pid(self):
+        """Forget the parent's clients after a fork. Hold the lock."""
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.clients = {}
+            self.keys = {}
+
+    def get(self, host, port, kwargs):
+        key = _client_key(host, port, kwargs)
+        with self.lock:
+            self._check_pid()
+            entry = self.clients.get(key)
+            if entry is not None:
+                entry[1] += 1
+                return entry[0]
+
+        # Construct outside the lock, a bad URI may take a while to fail.
+        client = MongoClient(host, port, **kwargs)
+        with self.lock:
+            self._check_pid()
+            entry = self.clients.get(key)
+            if entry is None:
+                entry = self.clients[key] = [client, 0]
+                self.keys[id(client)] = key
+                client = None
+            entry[1] += 1
+            shared = entry[0]
+
+        if client is not None:
+            # Another thread registered an equal client first.
+            client.close()
+        return shared
+
+    def release(self, client):
+        with self.lock:
+            self._check_pid()
+            key = self.keys.get(id(client))
+            entry = self.clients.get(key)
+            if entry is None or entry[0] is not client:
+                raise ValueError("%r is not a shared client" % (client,))
+            entry[1] -= 1
+            if entry[1]:
+                return
+            del self.clients[key]
+            del self.keys[id(client)]
+        client.close()
+
+    def stats(self):
+        with self.lock:
+            self._check_pid()
+            return [(entry[0], entry[1]) for entry in self.clients.values()]
+
+
+_REGISTRY = _Registry()
+
+
+def get_client(host=None, port=None, **kwargs):
+    """Get the shared MongoClient for these arguments, creating it if needed.
+
+    Takes the same arguments as :class:`~pymongo.mongo_client.MongoClient`,
+    except that `document_class`, `tz_aware` and `connect` must be passed by
+    keyword. Keyword values must be hashable, or lists, tuples or dicts of
+    hashable values. Pass the client to :func:`release_client` when done.
+    """
+    return _REGISTRY.get(host, port, kwargs)
+
+
+def release_client(client):
+    """Release a client from :func:`get_client`.
+
+    Closes the client when no other users remain. Raises ValueError if
+    `client` isn't shared, or has been released by all its users.
+    """
+    _REGISTRY.release(client)
+
+
+@contextlib.contextmanager
+def shared_client(host=None, port=None, **kwargs):
+    """A context manager for :func:`get_client` and :func:`release_client`.
+    """
+    client = get_client(host, port, **kwargs)
+    try:
+        yield client
+    finally:
+        release_client(client)
+
+
+def shared_clients():
+    """A list of (client, reference count) for this process's shared clients.
+    """
+    return _REGISTRY.stats()
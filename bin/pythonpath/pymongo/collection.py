@@ -15,9 +15,11 @@
 """Collection level utilities for Mongo."""
 
 import collections
+import contextlib
 import datetime
 import warnings
 
+from bson import BSON
 from bson.code import Code
 from bson.objectid import ObjectId
 from bson.py3compat import (_unicode,
@@ -32,11 +34,16 @@ from pymongo import (common,
 from pymongo.bulk import BulkOperationBuilder, _Bulk
 from pymongo.command_cursor import CommandCursor
 from pymongo.collation import validate_collation_or_none
-from pymongo.cursor import Cursor
-from pymongo.errors import ConfigurationError, InvalidName, OperationFailure
+from pymongo.cursor import Cursor, _QUERY_OPTIONS
+from pymongo.errors import (ConfigurationError,
+                            InvalidName,
+                            NotMasterError,
+                            OperationFailure)
 from pymongo.helpers import _check_write_command_response
 from pymongo.helpers import _UNICODE_REPLACE_CODEC_OPTIONS
+from pymongo.monotonic import time as _time
 from pymongo.operations import _WriteOp, IndexModel
+from pymongo.profiler import _explain_command, _query_of
 from pymongo.read_concern import DEFAULT_READ_CONCERN
 from pymongo.read_preferences import ReadPreference
 from pymongo.results import (BulkWriteResult,
@@ -56,6 +63,28 @@ _NO_OBJ_ERROR = "No matching object found"
 _UJOIN = u"%s.%s"
 
 
+def _id_key(value):
+    """A dict key for an _id value, which may be an embedded document."""
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return BSON.encode({"_id": value})
+
+
+def _output_namespace(database_name, out):
+    """The (database, collection) an aggregate ``$out`` stage or mapReduce
+    `out` option writes to. The collection is None if it's not known.
+    """
+    if isinstance(out, string_type):
+        return database_name, out
+    database_name = out.get('db', database_name)
+    for key in ('coll', 'replace', 'merge', 'reduce'):
+        if isinstance(out.get(key), string_type):
+            return database_name, out[key]
+    return database_name, None
+
+
 class ReturnDocument(object):
     """An enum used with
     :meth:`~pymongo.collection.Collection.find_one_and_replace` and
@@ -172,9 +201,19 @@ class Collection(common.BaseObject):
         if create or kwargs or collation:
             self.__create(kwargs, collation)
 
-        self.__write_response_codec_options = self.codec_options._replace(
-            unicode_decode_error_handler='replace',
-            document_class=dict)
+        # Made on first use, see __write_response_codec_options.
+        self.__write_response_options = None
+
+    @property
+    def __write_response_codec_options(self):
+        """CodecOptions to decode write command replies with."""
+        options = self.__write_response_options
+        if options is None:
+            options = self.__write_response_options = (
+                self.codec_options._replace(
+                    unicode_decode_error_handler='replace',
+                    document_class=dict))
+        return options
 
     def _socket_for_reads(self):
         return self.__database.client._socket_for_reads(self.read_preference)
@@ -182,8 +221,28 @@ class Collection(common.BaseObject):
     def _socket_for_primary_reads(self):
         return self.__database.client._socket_for_reads(ReadPreference.PRIMARY)
 
+    @contextlib.contextmanager
     def _socket_for_writes(self):
-        return self.__database.client._socket_for_writes()
+        client = self.__database.client
+        try:
+            with client._socket_for_writes() as sock_info:
+                yield sock_info
+        finally:
+            # Even a failed write may have changed documents.
+            client._invalidate_documents(self.__database.name, self.__name)
+
+    @contextlib.contextmanager
+    def _invalidating(self, out):
+        """Drop cached results from the output collection of an aggregate
+        ``$out`` stage or a mapReduce, on exit. `out` names the collection
+        as the command does, or is None if there's no output collection.
+        """
+        try:
+            yield
+        finally:
+            if out is not None:
+                self.__database.client._invalidate_documents(
+                    *_output_namespace(self.__database.name, out))
 
     def _command(self, sock_info, command, slave_ok=False,
                  read_preference=None,
@@ -218,7 +277,10 @@ class Collection(common.BaseObject):
 
           (result document, address of server the command was run on)
         """
-        return sock_info.command(
+        profiler = self.__database.client._profiler
+        if profiler is not None:
+            start = _time()
+        result = sock_info.command(
             self.__database.name,
             command,
             slave_ok,
@@ -230,6 +292,22 @@ class Collection(common.BaseObject):
             write_concern=write_concern,
             parse_write_concern_error=parse_write_concern_error,
             collation=collation)
+        if profiler is not None:
+            duration = _time() - start
+            if duration >= profiler.threshold:
+                self.__profile(profiler, command, duration)
+        return result
+
+    def __profile(self, profiler, command, duration):
+        """Record a slow count, distinct or aggregate command."""
+        name = next(iter(command))
+        if name not in ("count", "distinct", "aggregate"):
+            return
+        key = profiler.record(
+            self.__full_name, name, _query_of(command), duration)
+        if key is not None:
+            profiler.explain(key, _explain_command(
+                self.__database, command, self.read_preference))
 
     def __create(self, options, collation):
         """Sends a create command with the given options.
@@ -263,7 +341,7 @@ class Collection(common.BaseObject):
         return self.__getitem__(name)
 
     def __getitem__(self, name):
-        return Collection(self.__database, _UJOIN % (self.__name, name))
+        return self.__database[_UJOIN % (self.__name, name)]
 
     def __repr__(self):
         return "Collection(%r, %r)" % (self.__database, self.__name)
@@ -600,9 +678,10 @@ class Collection(common.BaseObject):
             op_id = message._randint()
         if bypass_doc_val and sock_info.max_wire_version >= 4:
             command['bypassDocumentValidation'] = True
+        client = self.database.client
         bwc = message._BulkWriteContext(
             self.database.name, command, sock_info, op_id,
-            self.database.client._event_listeners)
+            client._event_listeners, client._document_encoder)
         if sock_info.max_wire_version > 1 and acknowledged:
             # Batched insert command.
             results = message._do_batched_write_command(
@@ -1090,9 +1169,19 @@ class Collection(common.BaseObject):
             specified as part of `**kwargs`, e.g.
 
               >>> find_one(max_time_ms=100)
+
+        A lookup by ``_id`` with at most a `projection`, such as
+        ``find_one(oid)``, sends its query without creating a
+        :class:`~pymongo.cursor.Cursor`. To look up many documents by
+        ``_id`` use :meth:`find_by_ids`.
         """
         if (filter is not None and not
                 isinstance(filter, collections.Mapping)):
+            if (len(args) + len(kwargs) <= 1 and
+                    set(kwargs) <= set(["projection"]) and
+                    self.__database.client._document_cache is None):
+                # The common lookup by _id: skip building a Cursor.
+                return self.__find_by_id(filter, *args, **kwargs)
             filter = {"_id": filter}
 
         max_time_ms = kwargs.pop("max_time_ms", None)
@@ -1103,6 +1192,128 @@ class Collection(common.BaseObject):
             return result
         return None
 
+    def __find_by_id(self, value, projection=None):
+        """find_one({"_id": value}, projection), in a single query message.
+        """
+        if projection is not None:
+            if not projection:
+                projection = {"_id": 1}
+            projection = helpers._fields_list_to_dict(projection,
+                                                      "projection")
+        read_preference = self.read_preference
+        flags = 0
+        if read_preference != ReadPreference.PRIMARY:
+            flags = _QUERY_OPTIONS["slave_okay"]
+        operation = message._Query(flags, self.__database.name, self.__name,
+                                   0, {"_id": value}, projection,
+                                   self.codec_options, read_preference, -1,
+                                   0, self.read_concern, None)
+        client = self.__database.client
+        profiler = client._profiler
+        if profiler is not None:
+            start = _time()
+        response = client._send_message_with_response(
+            operation, read_preference=read_preference)
+        documents = self.__unpack_first_batch(client, operation, response)
+        if profiler is not None:
+            duration = _time() - start
+            if duration >= profiler.threshold:
+                key = profiler.record(self.__full_name, "find",
+                                      SON([("filter", {"_id": value})]),
+                                      duration)
+                if key is not None:
+                    cursor = self.find({"_id": value}, projection)
+                    profiler.explain(key, cursor.limit(-1).explain)
+        if not documents:
+            return None
+        return self.__database._fix_outgoing_batch(documents[:1], self)[0]
+
+    def __unpack_first_batch(self, client, operation, response):
+        """Decode the reply to a single batch query, publishing command
+        events the way Cursor does.
+        """
+        listeners = client._event_listeners
+        publish = listeners.enabled_for_commands
+        cmd_name = operation.name
+        address = response.address
+        if publish:
+            start = datetime.datetime.now()
+        try:
+            doc = helpers._unpack_response(response=response.data,
+                                           codec_options=self.codec_options)
+            if response.from_command:
+                helpers._check_command_response(doc['data'][0])
+        except Exception as exc:
+            if publish:
+                duration = (datetime.datetime.now() - start) + \
+                    response.duration
+                if isinstance(exc, (NotMasterError, OperationFailure)):
+                    failure = exc.details
+                else:
+                    failure = message._convert_exception(exc)
+                listeners.publish_command_failure(
+                    duration, failure, cmd_name, response.request_id,
+                    address)
+            if isinstance(exc, NotMasterError):
+                client._reset_server_and_request_check(address)
+            raise
+
+        if response.from_command:
+            res = doc['data'][0]
+            documents = res['cursor']['firstBatch']
+        else:
+            documents = doc['data']
+            res = {"cursor": {"id": doc["cursor_id"],
+                              "ns": self.__full_name,
+                              "firstBatch": documents},
+                   "ok": 1}
+        if publish:
+            duration = (datetime.datetime.now() - start) + response.duration
+            listeners.publish_command_success(
+                duration, res, cmd_name, response.request_id, address)
+        return documents
+
+    def find_by_ids(self, ids, projection=None, batch_size=1000):
+        """Look up many documents by ``_id``, with ``$in`` queries.
+
+        Returns a list with the document for each of `ids`, in the same
+        order, or ``None`` for ids that match no document::
+
+          >>> db.test.find_by_ids([1, 2, 3])
+          [{u'_id': 1, u'x': 1}, None, {u'_id': 3, u'x': 3}]
+
+        The :meth:`find_by_ids` method obeys the :attr:`read_preference` of
+        this :class:`Collection`.
+
+        :Parameters:
+          - `ids`: An iterable of ``_id`` values.
+          - `projection` (optional): The fields to return, as for
+            :meth:`find`. ``_id`` is always returned.
+          - `batch_size` (optional): The most ids in each query.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        ids = list(ids)
+        if projection is not None:
+            if not projection:
+                projection = {"_id": 1}
+            projection = helpers._fields_list_to_dict(projection,
+                                                      "projection")
+            if not projection.get("_id", True):
+                # Results are matched to ids by _id.
+                projection = projection.copy()
+                del projection["_id"]
+                projection = projection or None
+
+        found = {}
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            cursor = self.find({"_id": {"$in": chunk}}, projection,
+                               batch_size=len(chunk))
+            for document in cursor:
+                found[_id_key(document["_id"])] = document
+        return [found.get(_id_key(value)) for value in ids]
+
     def find(self, *args, **kwargs):
         """Query the database.
 
@@ -1279,6 +1490,10 @@ class Collection(common.BaseObject):
 
         .. note:: Requires server version **>= 2.5.5**.
 
+        .. seealso:: :class:`~pymongo.parallel_reader.ParallelReader`, which
+           reads the cursors on threads, and splits by ``_id`` where
+           parallelCollectionScan isn't available.
+
         .. versionchanged:: 3.4
            Added back support for arbitrary keyword arguments. MongoDB 3.4
            adds support for maxTimeMS as an option to the
@@ -1840,50 +2055,55 @@ class Collection(common.BaseObject):
             "batchSize", kwargs.pop("batchSize", None))
         use_cursor = common.validate_boolean(
             "useCursor", kwargs.pop("useCursor", True))
+        dollar_out = pipeline and '$out' in pipeline[-1]
+        out = pipeline[-1]['$out'] if dollar_out else None
         # If the server does not support the "cursor" option we
         # ignore useCursor and batchSize.
-        with self._socket_for_reads() as (sock_info, slave_ok):
-            if sock_info.max_wire_version > 0:
-                if use_cursor:
-                    if "cursor" not in kwargs:
-                        kwargs["cursor"] = {}
-                    if batch_size is not None:
-                        kwargs["cursor"]["batchSize"] = batch_size
-
-            dollar_out = pipeline and '$out' in pipeline[-1]
-            if (sock_info.max_wire_version >= 5 and dollar_out and
-                    self.write_concern):
-                cmd['writeConcern'] = self.write_concern.document
-
-            cmd.update(kwargs)
-
-            # Apply this Collection's read concern if $out is not in the
-            # pipeline.
-            if sock_info.max_wire_version >= 4 and 'readConcern' not in cmd:
-                if dollar_out:
-                    result = self._command(sock_info, cmd, slave_ok,
-                                           parse_write_concern_error=True,
-                                           collation=collation)
+        with self._invalidating(out):
+            with self._socket_for_reads() as (sock_info, slave_ok):
+                if sock_info.max_wire_version > 0:
+                    if use_cursor:
+                        if "cursor" not in kwargs:
+                            kwargs["cursor"] = {}
+                        if batch_size is not None:
+                            kwargs["cursor"]["batchSize"] = batch_size
+
+                if (sock_info.max_wire_version >= 5 and dollar_out and
+                        self.write_concern):
+                    cmd['writeConcern'] = self.write_concern.document
+
+                cmd.update(kwargs)
+
+                # Apply this Collection's read concern if $out is not in the
+                # pipeline.
+                if (sock_info.max_wire_version >= 4 and
+                        'readConcern' not in cmd):
+                    if dollar_out:
+                        result = self._command(sock_info, cmd, slave_ok,
+                                               parse_write_concern_error=True,
+                                               collation=collation)
+                    else:
+                        result = self._command(sock_info, cmd, slave_ok,
+                                               read_concern=self.read_concern,
+                                               collation=collation)
                 else:
-                    result = self._command(sock_info, cmd, slave_ok,
-                                           read_concern=self.read_concern,
-                                           collation=collation)
-            else:
-                result = self._command(sock_info, cmd, slave_ok,
-                                       parse_write_concern_error=dollar_out,
-                                       collation=collation)
+                    result = self._command(
+                        sock_info, cmd, slave_ok,
+                        parse_write_concern_error=dollar_out,
+                        collation=collation)
 
-            if "cursor" in result:
-                cursor = result["cursor"]
-            else:
-                # Pre-MongoDB 2.6. Fake a cursor.
-                cursor = {
-                    "id": 0,
-                    "firstBatch": result["result"],
-                    "ns": self.full_name,
-                }
-            return CommandCursor(
-                self, cursor, sock_info.address).batch_size(batch_size or 0)
+                if "cursor" in result:
+                    cursor = result["cursor"]
+                else:
+                    # Pre-MongoDB 2.6. Fake a cursor.
+                    cursor = {
+                        "id": 0,
+                        "firstBatch": result["result"],
+                        "ns": self.full_name,
+                    }
+                return CommandCursor(
+                    self, cursor, sock_info.address).batch_size(
+                        batch_size or 0)
 
     # key and condition ought to be optional, but deprecation
     # would be painful as argument order would have to change.
@@ -1977,11 +2197,15 @@ class Collection(common.BaseObject):
 
         new_name = "%s.%s" % (self.__database.name, new_name)
         cmd = SON([("renameCollection", self.__full_name), ("to", new_name)])
-        with self._socket_for_writes() as sock_info:
-            if sock_info.max_wire_version >= 5 and self.write_concern:
-                cmd['writeConcern'] = self.write_concern.document
-            cmd.update(kwargs)
-            sock_info.command('admin', cmd, parse_write_concern_error=True)
+        try:
+            with self._socket_for_writes() as sock_info:
+                if sock_info.max_wire_version >= 5 and self.write_concern:
+                    cmd['writeConcern'] = self.write_concern.document
+                cmd.update(kwargs)
+                sock_info.command('admin', cmd, parse_write_concern_error=True)
+        finally:
+            self.__database.client._invalidate_documents(
+                self.__database.name, new_name.split('.', 1)[1])
 
     def distinct(self, key, filter=None, **kwargs):
         """Get a list of distinct values for `key` among all documents
@@ -2090,24 +2314,25 @@ class Collection(common.BaseObject):
         cmd.update(kwargs)
 
         inline = 'inline' in cmd['out']
-        with self._socket_for_primary_reads() as (sock_info, slave_ok):
-            if (sock_info.max_wire_version >= 5 and self.write_concern and
-                    not inline):
-                cmd['writeConcern'] = self.write_concern.document
-            cmd.update(kwargs)
-            if (sock_info.max_wire_version >= 4 and 'readConcern' not in cmd and
-                    inline):
-                # No need to parse 'writeConcernError' here, since the command
-                # is an inline map reduce.
-                response = self._command(
-                    sock_info, cmd, slave_ok, ReadPreference.PRIMARY,
-                    read_concern=self.read_concern,
-                    collation=collation)
-            else:
-                response = self._command(
-                    sock_info, cmd, slave_ok, ReadPreference.PRIMARY,
-                    parse_write_concern_error=not inline,
-                    collation=collation)
+        with self._invalidating(None if inline else out):
+            with self._socket_for_primary_reads() as (sock_info, slave_ok):
+                if (sock_info.max_wire_version >= 5 and self.write_concern and
+                        not inline):
+                    cmd['writeConcern'] = self.write_concern.document
+                cmd.update(kwargs)
+                if (sock_info.max_wire_version >= 4 and
+                        'readConcern' not in cmd and inline):
+                    # No need to parse 'writeConcernError' here, since the
+                    # command is an inline map reduce.
+                    response = self._command(
+                        sock_info, cmd, slave_ok, ReadPreference.PRIMARY,
+                        read_concern=self.read_concern,
+                        collation=collation)
+                else:
+                    response = self._command(
+                        sock_info, cmd, slave_ok, ReadPreference.PRIMARY,
+                        parse_write_concern_error=not inline,
+                        collation=collation)
 
         if full_response or not response.get('result'):
             return response
@@ -15,12 +15,16 @@
 """CommandCursor class to iterate over command results."""
 
 import datetime
+import weakref
 
 from collections import deque
 
 from bson.py3compat import integer_types
-from pymongo import helpers
-from pymongo.errors import AutoReconnect, NotMasterError, OperationFailure
+from pymongo import helpers, thread_util
+from pymongo.errors import (AutoReconnect,
+                            InvalidOperation,
+                            NotMasterError,
+                            OperationFailure)
 from pymongo.message import _CursorAddress, _GetMore, _convert_exception
 
 
@@ -31,10 +35,11 @@ class CommandCursor(object):
     def __init__(self, collection, cursor_info, address, retrieved=0):
         """Create a new command cursor.
         """
+        self.__prefetcher = None
         self.__collection = collection
         self.__id = cursor_info['id']
         self.__address = address
-        self.__data = deque(cursor_info['firstBatch'])
+        self.__deliver(cursor_info['firstBatch'])
         self.__retrieved = retrieved
         self.__batch_size = 0
         self.__killed = (self.__id == 0)
@@ -45,6 +50,8 @@ class CommandCursor(object):
             self.__ns = collection.full_name
 
     def __del__(self):
+        # No getMore is in progress: the thread holds a reference meanwhile.
+        self.__stop_prefetch(wait=False)
         if self.__id and not self.__killed:
             self.__die()
 
@@ -61,6 +68,7 @@ class CommandCursor(object):
         other Python implementations that don't use reference counting
         garbage collection.
         """
+        self.__stop_prefetch()
         self.__die()
 
     def batch_size(self, batch_size):
@@ -87,8 +95,60 @@ class CommandCursor(object):
         self.__batch_size = batch_size == 1 and 2 or batch_size
         return self
 
+    def prefetch(self, max_buffered_batches=1):
+        """Request the next batches of results in the background.
+
+        While the application processes one batch, a background thread sends
+        the getMore for the next, so network round trips overlap with work
+        on the documents already received. At most `max_buffered_batches`
+        unread batches are held in memory.
+
+        Errors from a prefetched getMore are raised from :meth:`next` once
+        the application reaches that batch.
+
+        Raises :exc:`TypeError` if `max_buffered_batches` is not an integer.
+        Raises :exc:`ValueError` if `max_buffered_batches` is less than
+        ``0``. Raises :exc:`~pymongo.errors.InvalidOperation` if prefetching
+        was already started.
+
+        :Parameters:
+          - `max_buffered_batches` (optional): the most batches to fetch ahead
+            of the application. Defaults to ``1``.
+        """
+        if not isinstance(max_buffered_batches, integer_types):
+            raise TypeError("max_buffered_batches must be an integer")
+        if max_buffered_batches < 0:
+            raise ValueError("max_buffered_batches must be >= 0")
+
+        if self.__prefetcher is not None:
+            raise InvalidOperation("prefetch was already started")
+
+        if max_buffered_batches and not self.__killed:
+            # The thread must not keep an abandoned cursor alive.
+            self_ref = weakref.ref(self)
+
+            def fetch():
+                cursor = self_ref()
+                if cursor is None or cursor.__killed:
+                    return [], False
+                documents = cursor.__get_more()
+                return documents, not cursor.__killed
+
+            self.__prefetcher = thread_util.Prefetcher(
+                fetch, max_buffered_batches,
+                name="pymongo_cursor_prefetch_thread")
+        return self
+
+    def __stop_prefetch(self, wait=True):
+        """Stop prefetching. Unless `wait` is False, first wait for a
+        getMore in progress, which updates this cursor when it returns.
+        """
+        if self.__prefetcher is not None:
+            self.__prefetcher.close(wait)
+            self.__prefetcher = None
+
     def __send_message(self, operation):
-        """Send a getmore message and handle the response.
+        """Send a getmore message and return the documents in the reply.
         """
         client = self.__collection.database.client
         listeners = client._event_listeners
@@ -168,8 +228,22 @@ class CommandCursor(object):
 
         if self.__id == 0:
             self.__killed = True
-        self.__data = deque(documents)
-
+        return documents
+
+    def __get_more(self):
+        """Send a getMore and return the documents in the reply."""
+        dbname, collname = self.__ns.split('.', 1)
+        return self.__send_message(
+            _GetMore(dbname,
+                     collname,
+                     self.__batch_size,
+                     self.__id,
+                     self.__collection.codec_options))
+
+    def __deliver(self, documents):
+        """Make a batch of documents the next to be returned by next()."""
+        coll = self.__collection
+        self.__data = deque(coll.database._fix_outgoing_batch(documents, coll))
 
     def _refresh(self):
         """Refreshes the cursor with more data from the server.
@@ -178,17 +252,26 @@ class CommandCursor(object):
         self.__data is already non-empty. Raises OperationFailure when the
         cursor cannot be refreshed due to an error on the query.
         """
-        if len(self.__data) or self.__killed:
+        if len(self.__data):
+            return len(self.__data)
+
+        if self.__prefetcher is not None:
+            try:
+                documents = self.__prefetcher.get()
+            except Exception:
+                self.__prefetcher = None
+                raise
+            if documents is None:
+                self.__prefetcher = None
+            else:
+                self.__deliver(documents)
+            return len(self.__data)
+
+        if self.__killed:
             return len(self.__data)
 
         if self.__id:  # Get More
-            dbname, collname = self.__ns.split('.', 1)
-            self.__send_message(
-                _GetMore(dbname,
-                         collname,
-                         self.__batch_size,
-                         self.__id,
-                         self.__collection.codec_options))
+            self.__deliver(self.__get_more())
 
         else:  # Cursor id is zero nothing else to return
             self.__killed = True
@@ -210,6 +293,8 @@ class CommandCursor(object):
           :meth:`next` fails to retrieve the next batch of results from the
           server.
         """
+        if self.__prefetcher is not None and not self.__prefetcher.exhausted:
+            return True
         return bool(len(self.__data) or (not self.__killed))
 
     @property
@@ -231,8 +316,7 @@ class CommandCursor(object):
     def next(self):
         """Advance the cursor."""
         if len(self.__data) or self._refresh():
-            coll = self.__collection
-            return coll.database._fix_outgoing(self.__data.popleft(), coll)
+            return self.__data.popleft()
         else:
             raise StopIteration
 
@@ -242,4 +326,5 @@ class CommandCursor(object):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__stop_prefetch()
         self.__die()
@@ -18,6 +18,7 @@
 import collections
 import datetime
 import warnings
+import weakref
 
 from bson.binary import (STANDARD, PYTHON_LEGACY,
                          JAVA_LEGACY, CSHARP_LEGACY)
@@ -26,7 +27,7 @@ from bson.py3compat import string_type, integer_types, iteritems
 from bson.raw_bson import RawBSONDocument
 from pymongo.auth import MECHANISMS
 from pymongo.errors import ConfigurationError
-from pymongo.monitoring import _validate_event_listeners
+from pymongo.monitoring import _validate_event_listeners, _OVERFLOW_POLICIES
 from pymongo.read_concern import ReadConcern
 from pymongo.read_preferences import (read_pref_mode_from_name,
                                       _ServerMode)
@@ -77,6 +78,24 @@ MAX_IDLE_TIME_MS = None
 # Default value for localThresholdMS.
 LOCAL_THRESHOLD_MS = 15
 
+# Default value for localThresholdPercentile: use average round trip times.
+LOCAL_THRESHOLD_PERCENTILE = None
+
+# Default value for bulkWriteConcurrency.
+BULK_WRITE_CONCURRENCY = 1
+
+# Default value for forkHandoffSize: no sockets for child processes.
+FORK_HANDOFF_SIZE = 0
+
+# Default value for encodeWorkers: encode on the calling thread.
+ENCODE_WORKERS = 0
+
+# Default value for documentCacheSize: no document cache.
+DOCUMENT_CACHE_SIZE = 0
+
+# Default value for documentCacheTTLMS, in seconds.
+DOCUMENT_CACHE_TTL = 60
+
 # mongod/s 2.6 and above return code 59 when a
 # command doesn't exist. mongod versions previous
 # to 2.6 and mongos 2.4.x return no error code
@@ -264,6 +283,27 @@ def validate_positive_float_or_zero(option, value):
     return validate_positive_float(option, value)
 
 
+def validate_percentile_or_none(option, value):
+    """Validates that 'value' is None or a number greater than 0 and at
+    most 100.
+    """
+    if value is None:
+        return value
+    value = validate_positive_float(option, value)
+    if value > 100:
+        raise ValueError("%s must be greater than 0 and at most 100"
+                         % (option,))
+    return value
+
+
+def validate_event_queue_overflow(option, value):
+    """Validate the eventQueueOverflow policy."""
+    if value not in _OVERFLOW_POLICIES:
+        raise ValueError("%s must be one of %s"
+                         % (option, ", ".join(sorted(_OVERFLOW_POLICIES))))
+    return value
+
+
 def validate_timeout_or_none(option, value):
     """Validates a timeout specified in milliseconds returning
     a value in floating point seconds.
@@ -485,6 +525,7 @@ URI_VALIDATORS = {
     'readpreference': validate_read_preference_mode,
     'readpreferencetags': validate_read_preference_tags,
     'localthresholdms': validate_positive_float_or_zero,
+    'localthresholdpercentile': validate_percentile_or_none,
     'authmechanism': validate_auth_mechanism,
     'authsource': validate_string,
     'authmechanismproperties': validate_auth_mechanism_properties,
@@ -492,6 +533,13 @@ URI_VALIDATORS = {
     'uuidrepresentation': validate_uuid_representation,
     'connect': validate_boolean_or_string,
     'minpoolsize': validate_non_negative_integer,
+    'forkhandoffsize': validate_non_negative_integer,
+    'bulkwriteconcurrency': validate_positive_integer,
+    'encodeworkers': validate_non_negative_integer,
+    'eventqueuesize': validate_non_negative_integer,
+    'eventqueueoverflow': validate_event_queue_overflow,
+    'documentcachesize': validate_non_negative_integer,
+    'slowquerylog': validate_string_or_none,
     'appname': validate_appname_or_none,
     'unicode_decode_error_handler': validate_unicode_decode_error_handler
 }
@@ -503,6 +551,8 @@ TIMEOUT_VALIDATORS = {
     'serverselectiontimeoutms': validate_timeout_or_zero,
     'heartbeatfrequencyms': validate_timeout_or_none,
     'maxidletimems': validate_timeout_or_none,
+    'documentcachettlms': validate_timeout_or_none,
+    'slowquerythresholdms': validate_timeout_or_none,
     'maxstalenessseconds': validate_max_staleness,
 }
 
@@ -570,6 +620,11 @@ WRITE_CONCERN_OPTIONS = frozenset([
 ])
 
 
+# How many names BaseObject._get_handle remembers before it first looks
+# for references to objects that have been freed.
+_MAX_DEAD_HANDLES = 256
+
+
 class BaseObject(object):
     """A base class that provides attributes and methods common
     to multiple pymongo classes.
@@ -601,6 +656,39 @@ class BaseObject(object):
                             "pymongo.read_concern.ReadConcern")
         self.__read_concern = read_concern
 
+        # Weak references to child Collection objects with this instance's
+        # options, by name. See _get_handle.
+        self.__handles = {}
+        self.__handles_limit = _MAX_DEAD_HANDLES
+
+    def _get_handle(self, name, factory):
+        """Get the child object called `name`, or create it with
+        factory(self, name).
+
+        Lookups return the same object for as long as the application keeps
+        a reference to it, without keeping unused objects alive.
+        """
+        handles = self.__handles
+        try:
+            ref = handles.get(name)
+        except TypeError:
+            # Unhashable: let the factory raise its usual error.
+            return factory(self, name)
+        if ref is not None:
+            handle = ref()
+            if handle is not None:
+                return handle
+        handle = factory(self, name)
+        if len(handles) >= self.__handles_limit:
+            # Dead references are replaced, not removed. Prune them when
+            # many names have been used.
+            for key, value in list(iteritems(handles)):
+                if value() is None:
+                    handles.pop(key, None)
+            self.__handles_limit = max(_MAX_DEAD_HANDLES, 2 * len(handles))
+        handles[name] = weakref.ref(handle)
+        return handle
+
     @property
     def codec_options(self):
         """Read only access to the :class:`~bson.codec_options.CodecOptions`
@@ -16,6 +16,7 @@
 
 import copy
 import datetime
+import weakref
 
 from collections import deque
 
@@ -25,15 +26,19 @@ from bson.py3compat import (iteritems,
                             integer_types,
                             string_type)
 from bson.son import SON
-from pymongo import helpers
-from pymongo.common import validate_boolean, validate_is_mapping
+from pymongo import helpers, thread_util
+from pymongo.common import (MAX_MESSAGE_SIZE,
+                            validate_boolean,
+                            validate_is_mapping)
 from pymongo.collation import validate_collation_or_none
+from pymongo.document_cache import _freeze, _freeze_unordered
 from pymongo.errors import (AutoReconnect,
                             ConnectionFailure,
                             InvalidOperation,
                             NotMasterError,
                             OperationFailure)
 from pymongo.message import _CursorAddress, _GetMore, _Query, _convert_exception
+from pymongo.monotonic import time as _time
 from pymongo.read_preferences import ReadPreference
 
 _QUERY_OPTIONS = {
@@ -97,6 +102,107 @@ class _SocketManager:
             self.sock, self.pool = None, None
 
 
+# The options Cursor._clone copies, as mangled attribute names.
+_CLONED_ATTRIBUTES = frozenset(
+    "_Cursor__" + name for name in (
+        "spec", "projection", "skip", "limit", "max_time_ms",
+        "max_await_time_ms", "comment", "max", "min", "ordering", "explain",
+        "hint", "batch_size", "max_scan", "manipulate", "query_flags",
+        "modifiers", "collation", "prefetch_batches",
+        "adaptive_target_bytes"))
+
+# Default bytes of documents to request per getMore in adaptive mode.
+ADAPTIVE_TARGET_BYTES = 4 * 1024 * 1024
+
+# The server's batch sizes for a cursor with no batch_size, the baseline for
+# round trips saved by adaptive batch sizing.
+_DEFAULT_FIRST_BATCH_SIZE = 101
+_DEFAULT_GET_MORE_BYTES = 4 * 1024 * 1024
+
+
+class _AdaptiveBatchSizer(object):
+    """Choose getMore batch sizes from observed document size and speed.
+
+    The batch size aims at `target_bytes` of documents per round trip. When
+    the application is slow to consume documents compared to a round trip,
+    batches shrink toward just enough documents that waiting on the network
+    stays about a tenth of the total time.
+    """
+    # Weight of the newest sample in the moving averages.
+    _ALPHA = 0.3
+    # Size batches so round trips take at most ~1/(1 + 9) of the time.
+    _WORK_TO_ROUND_TRIP_RATIO = 9
+    _MIN_BATCH_SIZE = 2
+
+    def __init__(self, target_bytes, baseline_batch_size):
+        self.target_bytes = target_bytes
+        self.baseline_batch_size = baseline_batch_size
+        self.doc_size = None
+        self.round_trip_time = None
+        self.consume_time = None
+        self.round_trips = 0
+        self.documents = 0
+        self.bytes = 0
+        self.last_batch_size = None
+
+    def _average(self, average, sample):
+        if average is None:
+            return sample
+        return (1 - self._ALPHA) * average + self._ALPHA * sample
+
+    def record_batch(self, n_documents, n_bytes, round_trip_time):
+        """Record a reply of n_documents in n_bytes."""
+        self.round_trips += 1
+        self.documents += n_documents
+        self.bytes += n_bytes
+        if n_documents:
+            self.doc_size = self._average(
+                self.doc_size, float(n_bytes) / n_documents)
+        if round_trip_time >= 0:
+            self.round_trip_time = self._average(
+                self.round_trip_time, round_trip_time)
+
+    def record_consumed(self, n_documents, seconds):
+        """Record that the application took seconds for n_documents."""
+        if n_documents and seconds >= 0:
+            self.consume_time = self._average(
+                self.consume_time, seconds / n_documents)
+
+    def next_batch_size(self):
+        """The batch size for the next getMore, or 0 if unknown."""
+        if not self.doc_size:
+            return 0
+        size = int(self.target_bytes / self.doc_size)
+        if self.consume_time and self.round_trip_time:
+            enough = int(self._WORK_TO_ROUND_TRIP_RATIO *
+                         self.round_trip_time / self.consume_time)
+            size = min(size, enough)
+        size = max(size, self._MIN_BATCH_SIZE)
+        self.last_batch_size = size
+        return size
+
+    def _baseline_round_trips(self):
+        if self.baseline_batch_size:
+            return -(-self.documents // self.baseline_batch_size)
+        # The server's defaults: 101 documents, then up to 4MiB per getMore.
+        if self.documents <= _DEFAULT_FIRST_BATCH_SIZE:
+            return 1
+        rest = self.bytes * (self.documents - _DEFAULT_FIRST_BATCH_SIZE)
+        return 1 + -(-rest // (self.documents * _DEFAULT_GET_MORE_BYTES))
+
+    def stats(self):
+        baseline = self._baseline_round_trips()
+        return {
+            'round_trips': self.round_trips,
+            'documents': self.documents,
+            'bytes': self.bytes,
+            'last_batch_size': self.last_batch_size,
+            'baseline_batch_size': self.baseline_batch_size,
+            'baseline_round_trips': baseline,
+            'round_trips_saved': baseline - self.round_trips,
+        }
+
+
 class Cursor(object):
     """A cursor / iterator over Mongo query results.
     """
@@ -115,6 +221,7 @@ class Cursor(object):
         .. mongodoc:: cursors
         """
         self.__id = None
+        self.__prefetcher = None
 
         spec = filter
         if spec is None:
@@ -161,6 +268,14 @@ class Cursor(object):
         self.__min = None
         self.__manipulate = manipulate
         self.__collation = validate_collation_or_none(collation)
+        self.__prefetch_batches = 0
+        self.__adaptive_target_bytes = None
+        self.__sizer = None
+        self.__reply_size = 0
+        self.__batch_delivered = None
+        self.__delivered_count = 0
+        self.__cache_key = None
+        self.__cache_reply = None
 
         # Exhaust cursor support
         self.__exhaust = False
@@ -214,6 +329,8 @@ class Cursor(object):
         return self.__retrieved
 
     def __del__(self):
+        # No getMore is in progress: the thread holds a reference meanwhile.
+        self.__stop_prefetch(wait=False)
         if self.__id and not self.__killed:
             self.__die()
 
@@ -226,11 +343,14 @@ class Cursor(object):
         be sent to the server, even if the resultant data has already been
         retrieved by this cursor.
         """
+        self.__stop_prefetch()
         self.__data = deque()
         self.__id = None
         self.__address = None
         self.__retrieved = 0
         self.__killed = False
+        self.__sizer = None
+        self.__batch_delivered = None
 
         return self
 
@@ -241,19 +361,20 @@ class Cursor(object):
         been set on the current instance. The clone will be completely
         unevaluated, even if the current instance has been partially or
         completely evaluated.
+
+        The clone shares the filter, projection, sort and other options
+        with this cursor rather than copying them, so cloning costs the
+        same however large the filter is. Cursor methods never modify
+        these in place, but the application mustn't either: use
+        ``copy.deepcopy(cursor)`` for a clone with its own copies.
         """
-        return self._clone(True)
+        return self._clone(False)
 
     def _clone(self, deepcopy=True):
         """Internal clone helper."""
         clone = self._clone_base()
-        values_to_clone = ("spec", "projection", "skip", "limit",
-                           "max_time_ms", "max_await_time_ms", "comment",
-                           "max", "min", "ordering", "explain", "hint",
-                           "batch_size", "max_scan", "manipulate",
-                           "query_flags", "modifiers", "collation")
         data = dict((k, v) for k, v in iteritems(self.__dict__)
-                    if k.startswith('_Cursor__') and k[9:] in values_to_clone)
+                    if k in _CLONED_ATTRIBUTES)
         if deepcopy:
             data = self._deepcopy(data)
         clone.__dict__.update(data)
@@ -287,6 +408,7 @@ class Cursor(object):
         other Python implementations that don't use reference counting
         garbage collection.
         """
+        self.__stop_prefetch()
         self.__die()
 
     def __query_spec(self):
@@ -432,6 +554,92 @@ class Cursor(object):
         self.__batch_size = batch_size
         return self
 
+    def prefetch(self, max_buffered_batches=1):
+        """Request the next batches of results in the background.
+
+        While the application processes one batch, a background thread sends
+        the getMore for the next, so network round trips overlap with work
+        on the documents already received. At most `max_buffered_batches`
+        unread batches are held in memory; the thread waits for the
+        application to catch up before requesting more. Pass ``0`` to turn
+        prefetching off.
+
+        Errors from a prefetched getMore are raised from :meth:`next` once
+        the application reaches that batch.
+
+        Raises :exc:`TypeError` if `max_buffered_batches` is not an integer.
+        Raises :exc:`ValueError` if `max_buffered_batches` is less than
+        ``0``. Raises :exc:`~pymongo.errors.InvalidOperation` if this
+        :class:`Cursor` has already been used, or if it is a tailable or
+        exhaust cursor.
+
+        :Parameters:
+          - `max_buffered_batches` (optional): the most batches to fetch ahead
+            of the application. Defaults to ``1``.
+        """
+        if not isinstance(max_buffered_batches, integer_types):
+            raise TypeError("max_buffered_batches must be an integer")
+        if max_buffered_batches < 0:
+            raise ValueError("max_buffered_batches must be >= 0")
+        self.__check_okay_to_chain()
+        if self.__exhaust or (
+                self.__query_flags & _QUERY_OPTIONS["tailable_cursor"]):
+            raise InvalidOperation(
+                "Can't use prefetch with tailable or exhaust cursors.")
+
+        self.__prefetch_batches = max_buffered_batches
+        return self
+
+    def adaptive_batch_size(self, target_bytes=ADAPTIVE_TARGET_BYTES):
+        """Size each getMore from the documents and the application's pace.
+
+        After each batch the cursor estimates the average document size and
+        requests about `target_bytes` of documents in the next getMore, so
+        small documents come in large batches and huge ones in small
+        batches. If the application spends long on each document compared
+        to a round trip, batches shrink so fewer documents wait in memory.
+        The first batch still uses :meth:`batch_size`, or the server
+        default. Pass ``None`` to go back to a fixed batch size.
+
+        Use :attr:`adaptive_batch_stats` to see the effect.
+
+        Raises :exc:`TypeError` if `target_bytes` is not an integer or
+        ``None``. Raises :exc:`ValueError` if `target_bytes` is not
+        positive or exceeds the default maximum message size. Raises
+        :exc:`~pymongo.errors.InvalidOperation` if this :class:`Cursor` has
+        already been used.
+
+        :Parameters:
+          - `target_bytes` (optional): bytes of documents to request per
+            round trip. Defaults to 4MiB.
+        """
+        if (not isinstance(target_bytes, integer_types)
+                and target_bytes is not None):
+            raise TypeError("target_bytes must be an integer or None")
+        if target_bytes is not None and not (
+                0 < target_bytes <= MAX_MESSAGE_SIZE):
+            raise ValueError("target_bytes must be > 0 and <= %d"
+                             % (MAX_MESSAGE_SIZE,))
+        self.__check_okay_to_chain()
+
+        self.__adaptive_target_bytes = target_bytes
+        return self
+
+    @property
+    def adaptive_batch_stats(self):
+        """Statistics for :meth:`adaptive_batch_size`, or None if unused.
+
+        A dict with the ``round_trips`` made, the ``documents`` and
+        ``bytes`` received, and the ``last_batch_size`` requested. The
+        ``round_trips_saved`` estimate compares ``round_trips`` with fetching
+        the same documents in fixed batches of ``baseline_batch_size``, the
+        cursor's :meth:`batch_size`, or if that is ``None`` with the server's
+        defaults of 101 documents in the first batch and 4MiB per getMore.
+        """
+        if self.__sizer is None:
+            return None
+        return self.__sizer.stats()
+
     def skip(self, skip):
         """Skips the first `skip` results of this cursor.
 
@@ -825,7 +1033,11 @@ class Cursor(object):
         if not isinstance(code, Code):
             code = Code(code)
 
-        self.__spec["$where"] = code
+        # Copy on write: the filter may be shared with clones, or with
+        # the application.
+        spec = self.__spec.copy()
+        spec["$where"] = code
+        self.__spec = spec
         return self
 
     def collation(self, collation):
@@ -853,7 +1065,8 @@ class Cursor(object):
         the next result batch off the exhaust socket instead of
         sending getMore messages to the server.
 
-        Can raise ConnectionFailure.
+        Returns the list of documents in the reply. Can raise
+        ConnectionFailure.
         """
         client = self.__collection.database.client
         listeners = client._event_listeners
@@ -879,9 +1092,12 @@ class Cursor(object):
 
                 cmd_name = operation.name
                 data = response.data
+                self.__reply_size = len(data)
                 cmd_duration = response.duration
                 rqst_id = response.request_id
                 from_command = response.from_command
+                if self.__cache_key is not None:
+                    self.__cache_reply = (data, from_command)
             except AutoReconnect:
                 # Don't try to send kill cursors on another socket
                 # or to another server. It can cause a _pinValue
@@ -906,6 +1122,7 @@ class Cursor(object):
                 start = datetime.datetime.now()
             try:
                 data = self.__exhaust_mgr.sock.receive_message(1, None)
+                self.__reply_size = len(data)
             except Exception as exc:
                 if publish:
                     duration = datetime.datetime.now() - start
@@ -942,7 +1159,7 @@ class Cursor(object):
             # self.__killed to True ensures Cursor.alive will be
             # False. No need to re-raise.
             if self.__query_flags & _QUERY_OPTIONS["tailable_cursor"]:
-                return
+                return []
             raise
         except NotMasterError as exc:
             # Don't send kill cursors to another server after a "not master"
@@ -992,11 +1209,10 @@ class Cursor(object):
                 documents = cursor['firstBatch']
             else:
                 documents = cursor['nextBatch']
-            self.__data = deque(documents)
             self.__retrieved += len(documents)
         else:
             self.__id = doc["cursor_id"]
-            self.__data = deque(doc["data"])
+            documents = doc["data"]
             self.__retrieved += doc["number_returned"]
 
         if self.__id == 0:
@@ -1011,6 +1227,130 @@ class Cursor(object):
         if self.__exhaust and self.__id == 0:
             self.__exhaust_mgr.close()
 
+        return documents
+
+    def __get_more(self):
+        """Send a getMore and return the documents in the reply."""
+        batch_size = self.__batch_size
+        if self.__sizer is not None:
+            batch_size = self.__sizer.next_batch_size() or batch_size
+        if self.__limit:
+            limit = self.__limit - self.__retrieved
+            if batch_size:
+                limit = min(limit, batch_size)
+        else:
+            limit = batch_size
+
+        # Exhaust cursors don't send getMore messages.
+        if self.__exhaust:
+            operation = None
+        else:
+            operation = _GetMore(self.__collection.database.name,
+                                 self.__collection.name,
+                                 limit,
+                                 self.__id,
+                                 self.__codec_options,
+                                 self.__max_await_time_ms)
+        return self.__send_and_measure(operation)
+
+    def __send_and_measure(self, operation):
+        """Like __send_message, but feed the adaptive batch sizer."""
+        if self.__sizer is None:
+            return self.__send_message(operation)
+        start = _time()
+        documents = self.__send_message(operation)
+        self.__sizer.record_batch(
+            len(documents), self.__reply_size, _time() - start)
+        return documents
+
+    def __deliver(self, documents):
+        """Make a batch of documents the next to be returned by next()."""
+        if self.__sizer is not None:
+            self.__batch_delivered = _time()
+            self.__delivered_count = len(documents)
+        if self.__manipulate:
+            coll = self.__collection
+            documents = coll.database._fix_outgoing_batch(documents, coll)
+        self.__data = deque(documents)
+
+    def __make_cache_key(self):
+        """The document cache key for this query, or None if its results
+        mustn't be cached.
+        """
+        if (self.__exhaust or self.__explain or
+                "$explain" in self.__modifiers or
+                self.__query_flags & _QUERY_OPTIONS["tailable_cursor"]):
+            return None
+        try:
+            return (self.__collection.full_name,
+                    _freeze_unordered(self.__spec),
+                    _freeze_unordered(self.__projection),
+                    _freeze(self.__ordering),
+                    self.__skip,
+                    self.__limit,
+                    _freeze_unordered(self.__modifiers),
+                    _freeze(self.__hint),
+                    _freeze(self.__max),
+                    _freeze(self.__min),
+                    self.__max_scan,
+                    _freeze(self.__collation),
+                    _freeze(self.__read_preference.document),
+                    self.__read_concern.level,
+                    self.__query_flags & _QUERY_OPTIONS["partial"])
+        except TypeError:
+            # An unhashable value in the query.
+            return None
+
+    def __use_cached(self, reply, from_command, address):
+        """Return the documents in a reply from the document cache."""
+        doc = helpers._unpack_response(response=reply,
+                                       codec_options=self.__codec_options)
+        if from_command:
+            documents = doc['data'][0]['cursor']['firstBatch']
+        else:
+            documents = doc['data']
+        self.__address = address
+        self.__id = 0
+        self.__killed = True
+        self.__retrieved += len(documents)
+        return documents
+
+    def __profile(self, profiler, duration):
+        """Record a slow query."""
+        if self.__explain:
+            return
+        query = SON([("filter", self.__spec)])
+        if self.__ordering:
+            query["sort"] = self.__ordering
+        key = profiler.record(
+            self.__collection.full_name, "find", query, duration)
+        if key is not None:
+            profiler.explain(key, self.clone().explain)
+
+    def __start_prefetch(self):
+        """Start sending getMores on a background thread."""
+        # The thread must not keep an abandoned cursor alive.
+        self_ref = weakref.ref(self)
+
+        def fetch():
+            cursor = self_ref()
+            if cursor is None or cursor.__killed:
+                return [], False
+            documents = cursor.__get_more()
+            return documents, not cursor.__killed
+
+        self.__prefetcher = thread_util.Prefetcher(
+            fetch, self.__prefetch_batches,
+            name="pymongo_cursor_prefetch_thread")
+
+    def __stop_prefetch(self, wait=True):
+        """Stop prefetching. Unless `wait` is False, first wait for a
+        getMore in progress, which updates this cursor when it returns.
+        """
+        if self.__prefetcher is not None:
+            self.__prefetcher.close(wait)
+            self.__prefetcher = None
+
     def _refresh(self):
         """Refreshes the cursor with more data from Mongo.
 
@@ -1018,11 +1358,48 @@ class Cursor(object):
         self.__data is already non-empty. Raises OperationFailure when the
         cursor cannot be refreshed due to an error on the query.
         """
-        if len(self.__data) or self.__killed:
+        if len(self.__data):
+            return len(self.__data)
+
+        if self.__batch_delivered is not None:
+            # The application has used every document in the last batch.
+            self.__sizer.record_consumed(
+                self.__delivered_count, _time() - self.__batch_delivered)
+            self.__batch_delivered = None
+
+        if self.__prefetcher is not None:
+            try:
+                documents = self.__prefetcher.get()
+            except Exception:
+                self.__prefetcher = None
+                raise
+            if documents is None:
+                self.__prefetcher = None
+            else:
+                self.__deliver(documents)
+            return len(self.__data)
+
+        if self.__killed:
             return len(self.__data)
 
         if self.__id is None:  # Query
-            self.__send_message(_Query(self.__query_flags,
+            cache = self.__collection.database.client._document_cache
+            if cache is not None:
+                self.__cache_key = self.__make_cache_key()
+            if self.__cache_key is not None:
+                cached = cache.get(self.__cache_key)
+                if cached is not None:
+                    self.__cache_key = None
+                    self.__deliver(self.__use_cached(*cached))
+                    return len(self.__data)
+                generation = cache.generation(self.__cache_key[0])
+            if self.__adaptive_target_bytes:
+                self.__sizer = _AdaptiveBatchSizer(
+                    self.__adaptive_target_bytes, self.__batch_size)
+            profiler = self.__collection.database.client._profiler
+            if profiler is not None:
+                start = _time()
+            self.__deliver(self.__send_and_measure(_Query(self.__query_flags,
                                        self.__collection.database.name,
                                        self.__collection.name,
                                        self.__skip,
@@ -1033,27 +1410,25 @@ class Cursor(object):
                                        self.__limit,
                                        self.__batch_size,
                                        self.__read_concern,
-                                       self.__collation))
+                                       self.__collation)))
+            if profiler is not None:
+                duration = _time() - start
+                if duration >= profiler.threshold:
+                    self.__profile(profiler, duration)
+            if self.__cache_key is not None:
+                if not self.__id or self.__killed:
+                    # The reply holds every result.
+                    cache.put(self.__cache_key, generation,
+                              self.__cache_reply[0], self.__cache_reply[1],
+                              self.__address)
+                self.__cache_key = self.__cache_reply = None
             if not self.__id:
                 self.__killed = True
+            elif (self.__prefetch_batches and not self.__exhaust and
+                  not self.__query_flags & _QUERY_OPTIONS["tailable_cursor"]):
+                self.__start_prefetch()
         elif self.__id:  # Get More
-            if self.__limit:
-                limit = self.__limit - self.__retrieved
-                if self.__batch_size:
-                    limit = min(limit, self.__batch_size)
-            else:
-                limit = self.__batch_size
-
-            # Exhaust cursors don't send getMore messages.
-            if self.__exhaust:
-                self.__send_message(None)
-            else:
-                self.__send_message(_GetMore(self.__collection.database.name,
-                                             self.__collection.name,
-                                             limit,
-                                             self.__id,
-                                             self.__codec_options,
-                                             self.__max_await_time_ms))
+            self.__deliver(self.__get_more())
 
         else:  # Cursor id is zero nothing else to return
             self.__killed = True
@@ -1080,6 +1455,8 @@ class Cursor(object):
           return False after :meth:`next` fails to retrieve the next batch
           of results from the server.
         """
+        if self.__prefetcher is not None and not self.__prefetcher.exhausted:
+            return True
         return bool(len(self.__data) or (not self.__killed))
 
     @property
@@ -1110,13 +1487,8 @@ class Cursor(object):
         """Advance the cursor."""
         if self.__empty:
             raise StopIteration
-        _db = self.__collection.database
         if len(self.__data) or self._refresh():
-            if self.__manipulate:
-                return _db._fix_outgoing(self.__data.popleft(),
-                                         self.__collection)
-            else:
-                return self.__data.popleft()
+            return self.__data.popleft()
         else:
             raise StopIteration
 
@@ -1126,6 +1498,7 @@ class Cursor(object):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__stop_prefetch()
         self.__die()
 
     def __copy__(self):
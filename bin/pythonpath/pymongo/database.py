@@ -35,6 +35,40 @@ from pymongo.son_manipulator import SONManipulator
 from pymongo.write_concern import WriteConcern
 
 
+# Commands that never modify documents, lowercased. Database.command drops
+# cached query results after any other command.
+_READ_ONLY_COMMANDS = frozenset([
+    'aggregate', 'buildinfo', 'collstats', 'connectionstatus', 'count',
+    'currentop', 'datasize', 'dbhash', 'dbstats', 'distinct', 'explain',
+    'features', 'filemd5', 'find', 'geonear', 'geosearch', 'getcmdlineopts',
+    'getlasterror', 'getlog', 'getmore', 'getparameter', 'getpreverror',
+    'group', 'hostinfo', 'ismaster', 'listcollections', 'listcommands',
+    'listdatabases', 'listindexes', 'parallelcollectionscan', 'ping',
+    'replsetgetconfig', 'replsetgetstatus', 'rolesinfo', 'serverstatus',
+    'top', 'usersinfo', 'whatsmyuri'])
+
+
+def _is_read_only(command, pipeline=None):
+    """True if `command`, a name or a command document, can't modify
+    documents.
+
+    `pipeline` is the aggregation pipeline passed as a keyword argument to
+    :meth:`Database.command`, if any.
+    """
+    if isinstance(command, string_type):
+        name = command
+    else:
+        name = next(iter(command), '')
+    name = name.lower()
+    if name not in _READ_ONLY_COMMANDS:
+        return False
+    if name == 'aggregate':
+        if pipeline is None and not isinstance(command, string_type):
+            pipeline = command.get('pipeline')
+        return not (pipeline and '$out' in pipeline[-1])
+    return True
+
+
 def _check_name(name):
     """Check if a database name is valid.
     """
@@ -47,6 +81,24 @@ def _check_name(name):
                               "character %r" % invalid_char)
 
 
+def _compose(transforms):
+    """Compose (son, collection) -> son functions, applied in order.
+
+    Returns None for an empty list, so callers can skip the call.
+    """
+    if not transforms:
+        return None
+    if len(transforms) == 1:
+        return transforms[0]
+    transforms = tuple(transforms)
+
+    def transform(son, collection):
+        for func in transforms:
+            son = func(son, collection)
+        return son
+    return transform
+
+
 class Database(common.BaseObject):
     """A Mongo database.
     """
@@ -112,12 +164,22 @@ class Database(common.BaseObject):
         self.__incoming_copying_manipulators = []
         self.__outgoing_manipulators = []
         self.__outgoing_copying_manipulators = []
+        # The manipulator chains composed into single callables, or None
+        # when there is nothing to apply. See __compile_manipulators.
+        self.__incoming_plain_transform = None
+        self.__incoming_copying_transform = None
+        self.__incoming_transform = None
+        self.__outgoing_transform = None
 
     def add_son_manipulator(self, manipulator):
         """Add a new son manipulator to this database.
 
         **DEPRECATED** - `add_son_manipulator` is deprecated.
 
+        The manipulator applies to this :class:`Database` object and its
+        collections only: looking the database up on the client again
+        returns a new object without it.
+
         .. versionchanged:: 3.0
           Deprecated add_son_manipulator.
         """
@@ -139,6 +201,24 @@ class Database(common.BaseObject):
                 self.__incoming_manipulators.insert(0, manipulator)
             if method_overwritten(manipulator, "transform_outgoing"):
                 self.__outgoing_manipulators.insert(0, manipulator)
+        self.__compile_manipulators()
+
+    def __compile_manipulators(self):
+        """Compose the manipulator lists into the callables applied to
+        documents, once per add_son_manipulator instead of per document.
+        """
+        incoming = [manipulator.transform_incoming
+                    for manipulator in self.__incoming_manipulators]
+        incoming_copying = [
+            manipulator.transform_incoming
+            for manipulator in self.__incoming_copying_manipulators]
+        self.__incoming_plain_transform = _compose(incoming)
+        self.__incoming_copying_transform = _compose(incoming_copying)
+        self.__incoming_transform = _compose(incoming + incoming_copying)
+        self.__outgoing_transform = _compose([
+            manipulator.transform_outgoing for manipulator in
+            self.__outgoing_manipulators[::-1] +
+            self.__outgoing_copying_manipulators[::-1]])
 
     @property
     def system_js(self):
@@ -229,8 +309,11 @@ class Database(common.BaseObject):
 
         :Parameters:
           - `name`: the name of the collection to get
+
+        Returns the same :class:`~pymongo.collection.Collection` for a name
+        as long as the application holds a reference to it.
         """
-        return Collection(self, name)
+        return self._get_handle(name, Collection)
 
     def get_collection(self, name, codec_options=None, read_preference=None,
                        write_concern=None, read_concern=None):
@@ -271,6 +354,9 @@ class Database(common.BaseObject):
             default) the :attr:`read_concern` of this :class:`Database` is
             used.
         """
+        if (codec_options is None and read_preference is None and
+                write_concern is None and read_concern is None):
+            return self._get_handle(name, Collection)
         return Collection(
             self, name, False, codec_options, read_preference,
             write_concern, read_concern)
@@ -347,15 +433,17 @@ class Database(common.BaseObject):
 
     def _apply_incoming_manipulators(self, son, collection):
         """Apply incoming manipulators to `son`."""
-        for manipulator in self.__incoming_manipulators:
-            son = manipulator.transform_incoming(son, collection)
-        return son
+        transform = self.__incoming_plain_transform
+        if transform is None:
+            return son
+        return transform(son, collection)
 
     def _apply_incoming_copying_manipulators(self, son, collection):
         """Apply incoming copying manipulators to `son`."""
-        for manipulator in self.__incoming_copying_manipulators:
-            son = manipulator.transform_incoming(son, collection)
-        return son
+        transform = self.__incoming_copying_transform
+        if transform is None:
+            return son
+        return transform(son, collection)
 
     def _fix_incoming(self, son, collection):
         """Apply manipulators to an incoming SON object before it gets stored.
@@ -364,9 +452,10 @@ class Database(common.BaseObject):
           - `son`: the son object going into the database
           - `collection`: the collection the son object is being saved in
         """
-        son = self._apply_incoming_manipulators(son, collection)
-        son = self._apply_incoming_copying_manipulators(son, collection)
-        return son
+        transform = self.__incoming_transform
+        if transform is None:
+            return son
+        return transform(son, collection)
 
     def _fix_outgoing(self, son, collection):
         """Apply manipulators to a SON object as it comes out of the database.
@@ -375,11 +464,25 @@ class Database(common.BaseObject):
           - `son`: the son object coming out of the database
           - `collection`: the collection the son object was saved in
         """
-        for manipulator in reversed(self.__outgoing_manipulators):
-            son = manipulator.transform_outgoing(son, collection)
-        for manipulator in reversed(self.__outgoing_copying_manipulators):
-            son = manipulator.transform_outgoing(son, collection)
-        return son
+        transform = self.__outgoing_transform
+        if transform is None:
+            return son
+        return transform(son, collection)
+
+    def _fix_outgoing_batch(self, documents, collection):
+        """Apply manipulators to a batch of documents from the database.
+
+        Returns `documents` itself if no outgoing manipulators are
+        installed, otherwise a new list.
+
+        :Parameters:
+          - `documents`: a list of son objects coming out of the database
+          - `collection`: the collection the son objects were saved in
+        """
+        transform = self.__outgoing_transform
+        if transform is None:
+            return documents
+        return [transform(son, collection) for son in documents]
 
     def _command(self, sock_info, command, slave_ok=False, value=1, check=True,
                  allowable_errors=None, read_preference=ReadPreference.PRIMARY,
@@ -488,10 +591,21 @@ class Database(common.BaseObject):
         .. mongodoc:: commands
         """
         client = self.__client
-        with client._socket_for_reads(read_preference) as (sock_info, slave_ok):
-            return self._command(sock_info, command, slave_ok, value,
-                                 check, allowable_errors, read_preference,
-                                 codec_options, **kwargs)
+        try:
+            with client._socket_for_reads(
+                    read_preference) as (sock_info, slave_ok):
+                return self._command(sock_info, command, slave_ok, value,
+                                     check, allowable_errors, read_preference,
+                                     codec_options, **kwargs)
+        finally:
+            if (client._document_cache is not None and
+                    not _is_read_only(command, kwargs.get("pipeline"))):
+                if self.__name == "admin":
+                    # Commands like renameCollection and applyOps act on
+                    # other databases.
+                    client.clear_document_cache()
+                else:
+                    client._invalidate_documents(self.__name)
 
     def _list_collections(self, sock_info, slave_okay, criteria=None):
         """Internal listCollections helper."""
@@ -572,13 +686,16 @@ class Database(common.BaseObject):
 
         self.__client._purge_index(self.__name, name)
 
-        with self.__client._socket_for_reads(
-                ReadPreference.PRIMARY) as (sock_info, slave_ok):
-            return self._command(
-                sock_info, 'drop', slave_ok, _unicode(name),
-                allowable_errors=['ns not found'],
-                write_concern=self.write_concern,
-                parse_write_concern_error=True)
+        try:
+            with self.__client._socket_for_reads(
+                    ReadPreference.PRIMARY) as (sock_info, slave_ok):
+                return self._command(
+                    sock_info, 'drop', slave_ok, _unicode(name),
+                    allowable_errors=['ns not found'],
+                    write_concern=self.write_concern,
+                    parse_write_concern_error=True)
+        finally:
+            self.__client._invalidate_documents(self.__name, name)
 
     def validate_collection(self, name_or_collection,
                             scandata=False, full=False):
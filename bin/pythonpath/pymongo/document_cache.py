@@ -0,0 +1,189 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Client-side cache of query results, enabled by `documentCacheSize`."""
+
+import threading
+
+from collections import Mapping, OrderedDict
+
+from bson.code import Code
+from bson.py3compat import iteritems
+from pymongo.monotonic import time as _time
+
+
+def _freeze(value):
+    """A hashable stand-in for part of a query.
+
+    Values are tagged with their type, since the server tells 1, 1.0 and
+    True apart. Raises TypeError if a value isn't hashable.
+    """
+    if isinstance(value, Mapping):
+        return (Mapping, tuple((key, _freeze(item))
+                               for key, item in iteritems(value)))
+    if isinstance(value, (list, tuple)):
+        return (list, tuple(_freeze(item) for item in value))
+    if isinstance(value, Code):
+        # Code is a str, whose hash and equality ignore the scope.
+        return (Code, str(value), _freeze(value.scope))
+    hash(value)
+    return (type(value), value)
+
+
+def _freeze_unordered(mapping):
+    """Like _freeze, for a mapping whose top-level key order is ignored."""
+    if not mapping:
+        return None
+    return tuple(sorted((key, _freeze(value))
+                        for key, value in iteritems(mapping)))
+
+
+class _Entry(object):
+    __slots__ = ('namespace', 'expires', 'reply', 'address')
+
+    def __init__(self, namespace, expires, reply, address):
+        self.namespace = namespace
+        self.expires = expires
+        self.reply = reply
+        self.address = address
+
+
+class DocumentCache(object):
+    """Least-recently-used query replies, up to `max_bytes` in all.
+
+    Replies are keyed by namespace and query, and kept as the raw bytes
+    received, so each hit decodes new documents. Writes through the same
+    client invalidate the namespace they modify.
+
+    :Parameters:
+      - `max_bytes`: The most reply bytes to keep.
+      - `ttl`: Seconds a reply is kept, or None to keep replies until
+        they're evicted or invalidated.
+    """
+    def __init__(self, max_bytes, ttl):
+        self.__max_bytes = max_bytes
+        self.__ttl = ttl
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()
+        # Maps namespace to the keys of its entries.
+        self.__keys = {}
+        # Maps namespace to a counter bumped by each write, and a counter
+        # bumped when whole databases are invalidated.
+        self.__generations = {}
+        self.__epoch = 0
+        self.__bytes = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+        self.__invalidations = 0
+
+    def generation(self, namespace):
+        """Call before querying `namespace`, and pass the result to put()."""
+        return self.__epoch, self.__generations.get(namespace, 0)
+
+    def get(self, key):
+        """The (reply, from_command, address) cached for `key`, or None."""
+        with self.__lock:
+            entry = self.__entries.pop(key, None)
+            if entry is None:
+                self.__misses += 1
+                return None
+            if entry.expires is not None and entry.expires <= _time():
+                self.__forget(key, entry)
+                self.__expirations += 1
+                self.__misses += 1
+                return None
+            # Most recently used last.
+            self.__entries[key] = entry
+            self.__hits += 1
+            return entry.reply + (entry.address,)
+
+    def put(self, key, generation, reply, from_command, address):
+        """Cache a complete reply to the query `key`.
+
+        Ignored if `key`'s namespace was written since `generation`.
+        """
+        size = len(reply)
+        if size > self.__max_bytes:
+            return
+        namespace = key[0]
+        expires = None
+        if self.__ttl is not None:
+            expires = _time() + self.__ttl
+        with self.__lock:
+            if self.generation(namespace) != generation:
+                # The reply may predate a write.
+                return
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__forget(key, old)
+            self.__entries[key] = _Entry(
+                namespace, expires, (reply, from_command), address)
+            self.__keys.setdefault(namespace, set()).add(key)
+            self.__bytes += size
+            while self.__bytes > self.__max_bytes:
+                old_key, old = self.__entries.popitem(last=False)
+                self.__forget(old_key, old)
+                self.__evictions += 1
+
+    def __forget(self, key, entry):
+        """Account for an entry removed from __entries. Hold the lock."""
+        self.__bytes -= len(entry.reply[0])
+        keys = self.__keys[entry.namespace]
+        keys.discard(key)
+        if not keys:
+            del self.__keys[entry.namespace]
+
+    def invalidate(self, namespace):
+        """Drop replies from `namespace` and any queries in progress."""
+        with self.__lock:
+            self.__generations[namespace] = (
+                self.__generations.get(namespace, 0) + 1)
+            self.__invalidations += 1
+            for key in self.__keys.pop(namespace, ()):
+                self.__bytes -= len(self.__entries.pop(key).reply[0])
+
+    def invalidate_database(self, name):
+        """Drop replies from every collection in database `name`."""
+        prefix = name + '.'
+        with self.__lock:
+            self.__epoch += 1
+            self.__invalidations += 1
+            for namespace in list(self.__keys):
+                if namespace.startswith(prefix):
+                    for key in self.__keys.pop(namespace):
+                        self.__bytes -= len(self.__entries.pop(key).reply[0])
+
+    def clear(self):
+        """Drop every cached reply. Statistics are kept."""
+        with self.__lock:
+            self.__epoch += 1
+            self.__entries.clear()
+            self.__keys.clear()
+            self.__bytes = 0
+
+    def stats(self):
+        """A dict of counters, see MongoClient.document_cache_stats()."""
+        with self.__lock:
+            return {
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'entries': len(self.__entries),
+                'bytes': self.__bytes,
+                'max_bytes': self.__max_bytes,
+                'evictions': self.__evictions,
+                'expirations': self.__expirations,
+                'invalidations': self.__invalidations,
+            }
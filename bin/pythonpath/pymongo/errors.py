@@ -190,6 +190,13 @@ class InvalidName(PyMongoError):
     """Raised when an invalid name is used."""
 
 
+class WriteFutureTimeout(PyMongoError):
+    """Raised when waiting for a
+    :class:`~pymongo.write_coalescer.WriteFuture` takes longer than the
+    timeout given. The write may still be sent later.
+    """
+
+
 class CollectionInvalid(PyMongoError):
     """Raised when collection validation fails."""
 
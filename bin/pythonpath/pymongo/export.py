@@ -0,0 +1,451 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Stream query results to a file.
+
+Results are written as they arrive instead of being collected in a list
+first, so an export needs memory for a few batches however large it is::
+
+    from pymongo.export import export_aggregate
+
+    def report(progress):
+        print('%d documents, %.0f/s' % (progress.documents,
+                                        progress.documents_per_second))
+
+    export_aggregate(db.assets, 'assets.csv', pipeline,
+                     fields=['name', 'data.fps'], progress=report)
+
+The calling thread runs the cursor while a worker thread encodes and
+writes, so encoding overlaps the wait for each ``getMore``. The buffer
+between them is bounded: when the file can't keep up, the cursor waits.
+
+Files are written as concatenated BSON documents (like ``mongodump``),
+JSON lines in MongoDB Extended JSON, or CSV.
+"""
+
+import csv
+import datetime
+import threading
+
+from collections import deque
+
+from bson import BSON
+from bson.json_util import DEFAULT_JSON_OPTIONS, dumps
+from bson.objectid import ObjectId
+from bson.py3compat import PY3, integer_types, string_type, text_type
+from bson.raw_bson import RawBSONDocument
+from pymongo.monotonic import time as _time
+
+if PY3:
+    from io import StringIO as _TextBuffer
+else:
+    from bson.py3compat import StringIO as _TextBuffer
+
+BSON_FILE = 'bson'
+"""Concatenated BSON documents, readable by ``mongorestore`` and
+:func:`bson.decode_file_iter`."""
+
+JSON_LINES = 'jsonl'
+"""One MongoDB Extended JSON document per line."""
+
+CSV = 'csv'
+"""Comma separated values with a header row. Nested documents and
+arrays are written as JSON."""
+
+_FORMATS = frozenset([BSON_FILE, JSON_LINES, CSV])
+
+_EXTENSIONS = {
+    '.bson': BSON_FILE,
+    '.json': JSON_LINES,
+    '.jsonl': JSON_LINES,
+    '.csv': CSV,
+}
+
+# The names of export_cursor's options, to tell them apart from find and
+# aggregate options in export_find and export_aggregate.
+_EXPORT_OPTIONS = frozenset([
+    'format', 'fields', 'json_options', 'chunk_size', 'max_buffered_chunks',
+    'progress', 'progress_interval'])
+
+
+class ExportProgress(object):
+    """How far an export has got.
+
+    :Parameters:
+      - `documents`: The number of documents written.
+      - `bytes`: The number of bytes written.
+      - `elapsed`: Seconds since the export started.
+    """
+    __slots__ = ('documents', 'bytes', 'elapsed')
+
+    def __init__(self, documents, bytes, elapsed):
+        self.documents = documents
+        self.bytes = bytes
+        self.elapsed = elapsed
+
+    @property
+    def documents_per_second(self):
+        """Documents written per second so far."""
+        return self.documents / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_second(self):
+        """Bytes written per second so far."""
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return "ExportProgress(documents=%d, bytes=%d, elapsed=%.3f)" % (
+            self.documents, self.bytes, self.elapsed)
+
+
+def _format_for(destination, format):
+    """Validate `format`, or choose one from the file name."""
+    if format is None:
+        name = destination
+        if not isinstance(name, string_type):
+            name = getattr(destination, 'name', None)
+        if isinstance(name, string_type):
+            dot = name.rfind('.')
+            if dot != -1:
+                format = _EXTENSIONS.get(name[dot:].lower())
+        if format is None:
+            raise ValueError("format must be given unless the file name "
+                             "ends with one of %s" % (
+                                 ", ".join(sorted(_EXTENSIONS)),))
+    if format not in _FORMATS:
+        raise ValueError("format must be one of %s" % (
+            ", ".join(sorted(_FORMATS)),))
+    return format
+
+
+def _encode_bson(chunk):
+    return b''.join([
+        doc.raw if isinstance(doc, RawBSONDocument) else BSON.encode(doc)
+        for doc in chunk])
+
+
+def _json_lines_encoder(json_options):
+    def encode(chunk):
+        if not chunk:
+            return b''
+        lines = [dumps(doc, json_options=json_options) for doc in chunk]
+        lines.append('')
+        return '\n'.join(lines).encode('utf-8')
+    return encode
+
+
+def _lookup(document, path):
+    """The value at a split dotted `path`, or None."""
+    value = document
+    for part in path:
+        if isinstance(value, list):
+            try:
+                value = value[int(part)]
+            except (ValueError, IndexError):
+                return None
+        else:
+            try:
+                value = value[part]
+            except (KeyError, TypeError):
+                return None
+    return value
+
+
+def _csv_value(value, json_options):
+    """Text for one CSV cell."""
+    if value is None:
+        return u''
+    if isinstance(value, text_type):
+        return value
+    if isinstance(value, bool):
+        return u'true' if value else u'false'
+    if isinstance(value, integer_types) or isinstance(value,
+                                                      (float, ObjectId)):
+        return text_type(value)
+    if isinstance(value, datetime.datetime):
+        return text_type(value.isoformat())
+    if hasattr(value, 'items') or isinstance(value, (list, bytes)):
+        return text_type(dumps(value, json_options=json_options))
+    return text_type(value)
+
+
+class _CSVEncoder(object):
+    """Encodes chunks as CSV rows, after a header row.
+
+    Without `fields`, the columns are the top-level fields of the first
+    document.
+    """
+    def __init__(self, fields, json_options):
+        self.fields = fields
+        self.paths = None
+        self.json_options = json_options
+
+    def __call__(self, chunk):
+        rows = []
+        if self.paths is None:
+            if self.fields is None:
+                if not chunk:
+                    return b''
+                self.fields = list(chunk[0])
+            self.paths = [tuple(field.split('.')) for field in self.fields]
+            rows.append(self.fields)
+        json_options = self.json_options
+        for doc in chunk:
+            rows.append([_csv_value(_lookup(doc, path), json_options)
+                         for path in self.paths])
+        return self.write(rows)
+
+    if PY3:
+        @staticmethod
+        def write(rows):
+            buf = _TextBuffer()
+            csv.writer(buf).writerows(rows)
+            return buf.getvalue().encode('utf-8')
+    else:
+        @staticmethod
+        def write(rows):
+            # Python 2's csv module writes bytes, not unicode.
+            buf = _TextBuffer()
+            csv.writer(buf).writerows(
+                [[cell.encode('utf-8') for cell in row] for row in rows])
+            return buf.getvalue()
+
+
+class _Writer(object):
+    """A thread that encodes chunks of documents and writes them to a file,
+    taking them from a bounded buffer.
+    """
+    def __init__(self, file, encode, max_buffered):
+        self.file = file
+        self.encode = encode
+        self.max_buffered = max(1, max_buffered)
+        self.buffer = deque()
+        self.cond = threading.Condition(threading.Lock())
+        self.error = None
+        self.finished = False
+        self.documents = 0
+        self.bytes = 0
+        self.thread = threading.Thread(target=self.run,
+                                       name="pymongo_export_thread")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        try:
+            while True:
+                with self.cond:
+                    while not self.buffer and not self.finished:
+                        self.cond.wait()
+                    if not self.buffer:
+                        chunk = None
+                    else:
+                        chunk = self.buffer.popleft()
+                        self.cond.notify_all()
+                if chunk is None:
+                    # Lets the CSV encoder write a header for no documents.
+                    self.write([])
+                    return
+                self.write(chunk)
+        except Exception as exc:
+            with self.cond:
+                self.error = exc
+                self.buffer.clear()
+                self.cond.notify_all()
+
+    def write(self, chunk):
+        data = self.encode(chunk)
+        if data:
+            self.file.write(data)
+        self.documents += len(chunk)
+        self.bytes += len(data)
+
+    def put(self, chunk):
+        """Wait for room and buffer a chunk. Raises the writer's error."""
+        with self.cond:
+            while (len(self.buffer) >= self.max_buffered and
+                   self.error is None):
+                self.cond.wait()
+            if self.error is not None:
+                raise self.error
+            self.buffer.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self):
+        """Write the buffered chunks and stop. Raises the writer's error."""
+        with self.cond:
+            self.finished = True
+            self.cond.notify_all()
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def abort(self):
+        """Discard the buffered chunks and stop."""
+        with self.cond:
+            self.buffer.clear()
+            self.finished = True
+            self.cond.notify_all()
+        self.thread.join()
+
+
+def export_cursor(cursor, destination, format=None, fields=None,
+                  json_options=DEFAULT_JSON_OPTIONS, chunk_size=1000,
+                  max_buffered_chunks=4, progress=None,
+                  progress_interval=1.0):
+    """Write the documents from a cursor to a file.
+
+    Returns an :class:`ExportProgress` for the whole export. If the export
+    fails the cursor is closed, and the file holds the documents written
+    so far.
+
+    For :data:`BSON_FILE`, a cursor returning
+    :class:`~bson.raw_bson.RawBSONDocument` skips decoding and re-encoding;
+    :func:`export_find` and :func:`export_aggregate` use one.
+
+    :Parameters:
+      - `cursor`: A :class:`~pymongo.cursor.Cursor`,
+        :class:`~pymongo.command_cursor.CommandCursor` or other iterable of
+        documents.
+      - `destination`: A file name, or a file opened in binary mode. A file
+        object is left open.
+      - `format` (optional): :data:`BSON_FILE`, :data:`JSON_LINES` or
+        :data:`CSV`. Defaults to the one for the file name's extension:
+        ``.bson``, ``.json`` or ``.jsonl``, or ``.csv``.
+      - `fields` (optional): For CSV, the columns, as dotted field names.
+        Defaults to the top-level fields of the first document.
+      - `json_options` (optional): A :class:`~bson.json_util.JSONOptions`
+        for JSON lines, and for documents and arrays in CSV cells.
+      - `chunk_size` (optional): Documents passed to the writer thread at
+        a time.
+      - `max_buffered_chunks` (optional): The most chunks waiting to be
+        written before the cursor waits for the writer.
+      - `progress` (optional): Called on the calling thread with an
+        :class:`ExportProgress` at most every `progress_interval` seconds,
+        as documents are written.
+      - `progress_interval` (optional): Seconds between `progress` calls.
+    """
+    format = _format_for(destination, format)
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if format == CSV:
+        encode = _CSVEncoder(fields, json_options)
+    elif format == JSON_LINES:
+        encode = _json_lines_encoder(json_options)
+    else:
+        encode = _encode_bson
+
+    if isinstance(destination, string_type):
+        with open(destination, 'wb') as file:
+            return _export(cursor, file, encode, chunk_size,
+                           max_buffered_chunks, progress, progress_interval)
+    return _export(cursor, destination, encode, chunk_size,
+                   max_buffered_chunks, progress, progress_interval)
+
+
+def _export(cursor, file, encode, chunk_size, max_buffered, progress,
+            progress_interval):
+    start = _time()
+    next_report = start + progress_interval
+    writer = _Writer(file, encode, max_buffered)
+    try:
+        chunk = []
+        for document in cursor:
+            chunk.append(document)
+            if len(chunk) >= chunk_size:
+                writer.put(chunk)
+                chunk = []
+                if progress is not None:
+                    now = _time()
+                    if now >= next_report:
+                        next_report = now + progress_interval
+                        progress(ExportProgress(
+                            writer.documents, writer.bytes, now - start))
+        if chunk:
+            writer.put(chunk)
+        writer.finish()
+    except BaseException:
+        writer.abort()
+        close = getattr(cursor, 'close', None)
+        if close is not None:
+            close()
+        raise
+    result = ExportProgress(writer.documents, writer.bytes, _time() - start)
+    if progress is not None:
+        progress(result)
+    return result
+
+
+def _split_options(kwargs):
+    """Separate export_cursor's options from find or aggregate options."""
+    options = {}
+    for name in _EXPORT_OPTIONS.intersection(kwargs):
+        options[name] = kwargs.pop(name)
+    return options
+
+
+def _for_format(collection, destination, options):
+    """The collection to query: with raw documents for BSON files."""
+    if _format_for(destination, options.get('format')) == BSON_FILE:
+        return collection.with_options(
+            codec_options=collection.codec_options._replace(
+                document_class=RawBSONDocument))
+    return collection
+
+
+def export_find(collection, destination, filter=None, projection=None,
+                **kwargs):
+    """Write the documents matching `filter` to a file.
+
+    Takes :func:`export_cursor`'s options, like `format` and `progress`,
+    and returns its :class:`ExportProgress`. Other keyword arguments are
+    passed to :meth:`~pymongo.collection.Collection.find`::
+
+        export_find(db.assets, 'shots.jsonl', {'type': 'shot'},
+                    sort=[('name', 1)], progress=report)
+
+    :Parameters:
+      - `collection`: The :class:`~pymongo.collection.Collection` to query.
+      - `destination`: A file name, or a file opened in binary mode.
+      - `filter` (optional): A query that documents must match.
+      - `projection` (optional): The fields to write, as for
+        :meth:`~pymongo.collection.Collection.find`.
+      - `**kwargs`: :func:`export_cursor` and
+        :meth:`~pymongo.collection.Collection.find` options.
+    """
+    options = _split_options(kwargs)
+    collection = _for_format(collection, destination, options)
+    cursor = collection.find(filter, projection, **kwargs)
+    return export_cursor(cursor, destination, **options)
+
+
+def export_aggregate(collection, destination, pipeline, **kwargs):
+    """Write the results of an aggregation pipeline to a file.
+
+    Takes :func:`export_cursor`'s options, like `format` and `progress`,
+    and returns its :class:`ExportProgress`. Other keyword arguments, like
+    `allowDiskUse` and `batchSize`, are passed to
+    :meth:`~pymongo.collection.Collection.aggregate`.
+
+    :Parameters:
+      - `collection`: The :class:`~pymongo.collection.Collection` to
+        aggregate.
+      - `destination`: A file name, or a file opened in binary mode.
+      - `pipeline`: A list of aggregation pipeline stages.
+      - `**kwargs`: :func:`export_cursor` and
+        :meth:`~pymongo.collection.Collection.aggregate` options.
+    """
+    options = _split_options(kwargs)
+    collection = _for_format(collection, destination, options)
+    cursor = collection.aggregate(pipeline, **kwargs)
+    return export_cursor(cursor, destination, **options)
@@ -0,0 +1,170 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Compact fixed-bucket histograms of durations."""
+
+from bisect import bisect_left as _bisect_left
+
+
+def _exponential_bounds(start, factor, count):
+    bounds = []
+    bound = start
+    for _ in range(count):
+        bounds.append(bound)
+        bound *= factor
+    return tuple(bounds)
+
+
+# Upper bounds in seconds, from 50 microseconds to a little over 100 seconds.
+DEFAULT_BOUNDS = _exponential_bounds(0.00005, 2, 22)
+
+# Finer bounds, each 25% above the last, from 50 microseconds to about a
+# minute. For percentiles that are compared with each other.
+FINE_BOUNDS = _exponential_bounds(0.00005, 1.25, 64)
+
+
+class Histogram(object):
+    """Counts samples in exponentially-sized buckets.
+
+    Memory use is constant no matter how many samples are recorded. Not
+    thread-safe: the owner must serialize calls to :meth:`record`.
+
+    :Parameters:
+      - `bounds` (optional): ascending sequence of bucket upper bounds.
+        Samples above the last bound are counted in an overflow bucket.
+    """
+    __slots__ = ('bounds', 'counts', 'total', 'max')
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        # This is on the hot path of every pool checkout, keep it short.
+        if value < 0:
+            # System time change, not using a monotonic clock. Ignore it.
+            return
+        self.counts[_bisect_left(self.bounds, value)] += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add the samples counted by another Histogram with equal bounds."""
+        if other.bounds != self.bounds:
+            raise ValueError("cannot merge histograms with different bounds")
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def count(self):
+        """The number of samples recorded."""
+        return sum(self.counts)
+
+    @property
+    def mean(self):
+        """The mean of all samples, or None if there are none."""
+        count = self.count
+        if not count:
+            return None
+        return self.total / count
+
+    def percentile(self, pct):
+        """Estimate the `pct` percentile (0-100), or None if no samples.
+
+        The estimate is the upper bound of the bucket holding the requested
+        rank, clamped to the largest sample seen.
+        """
+        count = self.count
+        if not count:
+            return None
+        rank = max(1, int(round(count * pct / 100.0)))
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                if i < len(self.bounds):
+                    return min(self.bounds[i], self.max)
+                break
+        return self.max
+
+    def copy(self):
+        histogram = Histogram(self.bounds)
+        histogram.merge(self)
+        return histogram
+
+    def as_dict(self):
+        """A summary of this histogram suitable for JSON encoding."""
+        count = self.count
+        return {
+            'count': count,
+            'sum': self.total,
+            'max': self.max if count else None,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': [(bound, bucket_count) for bound, bucket_count
+                        in zip(self.bounds + (None,), self.counts)],
+        }
+
+    def __repr__(self):
+        return "Histogram(count=%d, mean=%r, max=%r)" % (
+            self.count, self.mean, self.max)
+
+
+class WindowedHistogram(object):
+    """Histogram of only the most recent samples.
+
+    Samples go into a current generation of at most `window` samples. When
+    it is full it replaces the previous generation, so :meth:`get` always
+    covers between `window` and 2 * `window` of the latest samples.
+    """
+    def __init__(self, window=16, bounds=FINE_BOUNDS):
+        self.window = window
+        self.bounds = bounds
+        self.reset()
+
+    def add_sample(self, sample):
+        if sample < 0:
+            # System time change, not using a monotonic clock. Ignore it.
+            return
+        if self.current_count >= self.window:
+            self.previous = self.current
+            self.current = Histogram(self.bounds)
+            self.current_count = 0
+        self.current.record(sample)
+        self.current_count += 1
+
+    def get(self):
+        """A new Histogram of the recent samples, or None if there are none.
+        """
+        if not self.current_count:
+            return None
+        histogram = self.current.copy()
+        if self.previous is not None:
+            histogram.merge(self.previous)
+        return histogram
+
+    def reset(self):
+        self.current = Histogram(self.bounds)
+        self.current_count = 0
+        self.previous = None
@@ -0,0 +1,433 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Recommend indexes from the queries an application actually runs.
+
+An :class:`IndexAdvisor` is a command listener. It records the shape of
+each query: which fields are compared for equality, which are sorted on,
+and which are compared by range. Later, :meth:`IndexAdvisor.recommend`
+compares the shapes seen with each collection's indexes, and suggests
+compound indexes for the shapes no index serves, most costly first::
+
+    from pymongo import MongoClient
+    from pymongo.index_advisor import IndexAdvisor
+
+    advisor = IndexAdvisor()
+    client = MongoClient(event_listeners=[advisor])
+    ...
+    for collection, indexes in advisor.index_models(client):
+        print(collection.full_name, [index.document for index in indexes])
+        # collection.create_indexes(indexes)
+
+Suggested keys put equality fields first, then sort fields, then range
+fields. Queries on ``$or``, ``$where``, text and geospatial operators
+are ignored, as are the fields inside them.
+"""
+
+import threading
+
+from collections import Mapping
+
+from bson.py3compat import iteritems, string_type
+from pymongo import monitoring
+from pymongo.errors import OperationFailure
+from pymongo.operations import IndexModel
+
+# Started commands waiting for their result. More are forgotten.
+_MAX_PENDING = 10000
+
+# Distinct shapes recorded. New shapes are ignored after this.
+_MAX_SHAPES = 10000
+
+# The most fields in a compound index.
+_MAX_INDEX_KEYS = 31
+
+_EQUALITY_OPERATORS = frozenset(['$eq', '$in', '$all', '$size'])
+
+# Operators whose fields need special indexes, or none.
+_IGNORED_OPERATORS = frozenset([
+    '$or', '$nor', '$where', '$text', '$expr', '$near', '$nearSphere',
+    '$geoWithin', '$geoIntersects', '$within'])
+
+
+class _Fields(object):
+    """The fields of a filter, by how they're compared."""
+
+    def __init__(self):
+        self.equality = set()
+        self.range = set()
+        self.ignored = False
+
+
+def _add_filter(fields, query):
+    if not isinstance(query, Mapping):
+        return
+    for key, value in iteritems(query):
+        if key == '$and':
+            for clause in value or ():
+                _add_filter(fields, clause)
+        elif key in _IGNORED_OPERATORS:
+            fields.ignored = True
+        elif key.startswith('$'):
+            # $comment, $isolated, and other modifiers.
+            continue
+        elif isinstance(value, Mapping) and any(
+                isinstance(op, string_type) and op.startswith('$')
+                for op in value):
+            if any(op in _IGNORED_OPERATORS for op in value):
+                fields.ignored = True
+            elif all(op in _EQUALITY_OPERATORS for op in value):
+                fields.equality.add(key)
+            else:
+                fields.range.add(key)
+        else:
+            fields.equality.add(key)
+
+
+def _sort_keys(sort):
+    """A tuple of (field, direction) pairs from a sort document."""
+    if not isinstance(sort, Mapping):
+        return ()
+    return tuple((key, -1 if direction == -1 else 1)
+                 for key, direction in iteritems(sort)
+                 if direction in (1, -1))
+
+
+def _shape(query, sort=None):
+    """(equality fields, sort keys, range fields), or None if the query
+    can't use a regular index, or has nothing to index.
+    """
+    fields = _Fields()
+    _add_filter(fields, query)
+    if fields.ignored:
+        return None
+    sort = _sort_keys(sort)
+    equality = frozenset(fields.equality)
+    range_ = frozenset(fields.range - fields.equality)
+    if not (equality or sort or range_):
+        return None
+    return equality, sort, range_
+
+
+def _aggregate_shape(pipeline):
+    """The shape of an aggregation's leading $match and $sort stages."""
+    query, sort = None, None
+    for stage in pipeline or ():
+        if not isinstance(stage, Mapping) or len(stage) != 1:
+            break
+        if '$match' in stage and query is None and sort is None:
+            query = stage['$match']
+        elif '$sort' in stage and sort is None:
+            sort = stage['$sort']
+        else:
+            break
+    return _shape(query, sort)
+
+
+def _shapes(command_name, command):
+    """The shapes of the queries in a command."""
+    if command_name == 'find':
+        shapes = [_shape(command.get('filter'), command.get('sort'))]
+    elif command_name in ('count', 'distinct'):
+        shapes = [_shape(command.get('query'))]
+    elif command_name == 'findAndModify':
+        shapes = [_shape(command.get('query'), command.get('sort'))]
+    elif command_name == 'aggregate':
+        shapes = [_aggregate_shape(command.get('pipeline'))]
+    elif command_name == 'update':
+        shapes = [_shape(update.get('q'))
+                  for update in command.get('updates') or ()]
+    elif command_name == 'delete':
+        shapes = [_shape(delete.get('q'))
+                  for delete in command.get('deletes') or ()]
+    else:
+        return []
+    return [shape for shape in shapes if shape is not None]
+
+
+def _direction(direction):
+    """1 or -1 for an ascending or descending key, else None."""
+    if isinstance(direction, string_type):
+        return None
+    return -1 if direction < 0 else 1
+
+
+def _serves(keys, shape):
+    """True if an index on `keys` can answer `shape` without a collection
+    scan or in-memory sort: equality fields first in any order, then the
+    sort keys, or all of them reversed.
+    """
+    equality, sort, range_ = shape
+    # Text and geospatial keys can't be searched like the others.
+    keys = [(field, _direction(direction)) for field, direction in keys
+            if direction == 'hashed' or _direction(direction)]
+    fields = [field for field, _ in keys]
+    prefix = len(equality)
+    if set(fields[:prefix]) != equality:
+        return False
+    if sort:
+        sort = tuple((field, direction) for field, direction in sort
+                     if field not in equality)
+        following = tuple(keys[prefix:prefix + len(sort)])
+        reverse = tuple((field, -direction) for field, direction in sort)
+        return following in (sort, reverse)
+    if not equality:
+        return bool(fields) and fields[0] in range_
+    return True
+
+
+class _ShapeStats(object):
+    """Everything recorded for one query shape in one namespace."""
+
+    def __init__(self, namespace, shape):
+        self.namespace = namespace
+        self.shape = shape
+        self.count = 0
+        self.total_micros = 0.0
+
+    def copy(self):
+        stats = _ShapeStats(self.namespace, self.shape)
+        stats.count = self.count
+        stats.total_micros = self.total_micros
+        return stats
+
+    def as_dict(self):
+        equality, sort, range_ = self.shape
+        return {
+            'namespace': self.namespace,
+            'equality': sorted(equality),
+            'sort': list(sort),
+            'range': sorted(range_),
+            'count': self.count,
+            'total_ms': round(self.total_micros / 1000.0, 3),
+        }
+
+
+class _Recommendation(object):
+    def __init__(self, namespace, keys):
+        self.namespace = namespace
+        self.keys = keys
+        self.count = 0
+        self.total_micros = 0.0
+
+    def add(self, stats):
+        self.count += stats.count
+        self.total_micros += stats.total_micros
+
+    def as_dict(self):
+        database, collection = self.namespace.split('.', 1)
+        return {
+            'namespace': self.namespace,
+            'database': database,
+            'collection': collection,
+            'keys': list(self.keys),
+            'count': self.count,
+            'total_ms': round(self.total_micros / 1000.0, 3),
+            'mean_ms': round(self.total_micros / 1000.0 / self.count, 3),
+            'index': IndexModel(list(self.keys)),
+        }
+
+
+def _index_keys(stats, frequency):
+    """Index keys for a shape: equality fields, most common in the
+    namespace first, then sort keys, then range fields.
+    """
+    equality, sort, range_ = stats.shape
+
+    def by_frequency(field):
+        return -frequency.get(field, 0), field
+
+    keys = [(field, 1) for field in sorted(equality, key=by_frequency)]
+    seen = set(equality)
+    for field, direction in sort:
+        if field not in seen:
+            keys.append((field, direction))
+            seen.add(field)
+    for field in sorted(range_, key=by_frequency):
+        if field not in seen:
+            keys.append((field, 1))
+            seen.add(field)
+    return tuple(keys[:_MAX_INDEX_KEYS])
+
+
+def _existing_keys(collection):
+    """The key patterns of a collection's indexes, or None if they can't
+    be listed.
+    """
+    try:
+        info = collection.index_information()
+    except OperationFailure:
+        return None
+    return [index['key'] for index in info.values()]
+
+
+class IndexAdvisor(monitoring.CommandListener):
+    """Record query shapes from command events, and recommend indexes.
+
+    Pass to :class:`~pymongo.mongo_client.MongoClient` in
+    `event_listeners`, or to :func:`~pymongo.monitoring.register`.
+    Queries are recorded when they succeed, with their duration. Find,
+    count, distinct, aggregate (its leading ``$match`` and ``$sort``),
+    findAndModify, update and delete commands are recorded.
+    """
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__pending = {}
+        # Maps (namespace, shape) to _ShapeStats.
+        self.__shapes = {}
+
+    def started(self, event):
+        shapes = _shapes(event.command_name, event.command)
+        if not shapes:
+            return
+        target = event.command.get(event.command_name)
+        if not isinstance(target, string_type):
+            return
+        pending = self.__pending
+        if len(pending) >= _MAX_PENDING:
+            pending.clear()
+        pending[(event.connection_id, event.request_id)] = (
+            '%s.%s' % (event.database_name, target), shapes)
+
+    def succeeded(self, event):
+        started = self.__pending.pop(
+            (event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        namespace, shapes = started
+        # Writes share their duration among their statements.
+        micros = float(event.duration_micros) / len(shapes)
+        with self.__lock:
+            for shape in shapes:
+                key = (namespace, shape)
+                stats = self.__shapes.get(key)
+                if stats is None:
+                    if len(self.__shapes) >= _MAX_SHAPES:
+                        continue
+                    stats = self.__shapes[key] = _ShapeStats(
+                        namespace, shape)
+                stats.count += 1
+                stats.total_micros += micros
+
+    def failed(self, event):
+        self.__pending.pop((event.connection_id, event.request_id), None)
+
+    def shapes(self):
+        """A list of dicts describing each query shape seen, most total
+        time first.
+        """
+        with self.__lock:
+            shapes = [stats.as_dict() for stats in self.__shapes.values()]
+        shapes.sort(key=lambda shape: shape['total_ms'], reverse=True)
+        return shapes
+
+    def reset(self):
+        """Forget the query shapes recorded so far."""
+        with self.__lock:
+            self.__shapes.clear()
+        self.__pending.clear()
+
+    def recommend(self, client, limit=None, min_count=1):
+        """Recommend indexes for the shapes no existing index serves.
+
+        Lists the indexes of each namespace seen with `client`. Shapes an
+        index doesn't serve are grouped by the index that would serve
+        them, and each group is ranked by its count times its mean
+        latency: the total time its queries took.
+
+        Returns a list of dicts, most total time first, with keys
+        ``namespace``, ``database``, ``collection``, ``keys`` (a list of
+        (field, direction) pairs), ``count``, ``total_ms``, ``mean_ms``,
+        and ``index``, an :class:`~pymongo.operations.IndexModel`.
+
+        :Parameters:
+          - `client`: A :class:`~pymongo.mongo_client.MongoClient` for the
+            cluster the queries were sent to.
+          - `limit` (optional): The most indexes to recommend.
+          - `min_count` (optional): Ignore shapes seen fewer times.
+        """
+        by_namespace = {}
+        with self.__lock:
+            for stats in self.__shapes.values():
+                if stats.count >= min_count:
+                    by_namespace.setdefault(stats.namespace, []).append(
+                        stats.copy())
+
+        recommendations = []
+        for namespace, shapes in iteritems(by_namespace):
+            database, _, collection = namespace.partition('.')
+            if not collection or collection.startswith('system.'):
+                continue
+            existing = _existing_keys(client[database][collection])
+            if existing is None:
+                continue
+            recommendations.extend(
+                self.__recommend_namespace(namespace, shapes, existing))
+        recommendations.sort(key=lambda rec: rec.total_micros, reverse=True)
+        if limit is not None:
+            recommendations = recommendations[:limit]
+        return [rec.as_dict() for rec in recommendations]
+
+    def __recommend_namespace(self, namespace, shapes, existing):
+        frequency = {}
+        for stats in shapes:
+            for field in stats.shape[0] | stats.shape[2]:
+                frequency[field] = frequency.get(field, 0) + stats.count
+
+        shapes.sort(key=lambda stats: stats.total_micros, reverse=True)
+        recommended = []
+        for stats in shapes:
+            if any(_serves(keys, stats.shape) for keys in existing):
+                continue
+            for rec in recommended:
+                if _serves(rec.keys, stats.shape):
+                    rec.add(stats)
+                    break
+            else:
+                rec = _Recommendation(namespace,
+                                      _index_keys(stats, frequency))
+                rec.add(stats)
+                recommended.append(rec)
+
+        # Fold recommendations that prefix others into the longest.
+        kept = []
+        for rec in recommended:
+            longer = [other for other in recommended
+                      if len(other.keys) > len(rec.keys) and
+                      other.keys[:len(rec.keys)] == rec.keys]
+            if longer:
+                max(longer, key=lambda other: len(other.keys)).add(rec)
+            else:
+                kept.append(rec)
+        return kept
+
+    def index_models(self, client, limit=None, min_count=1):
+        """The recommended indexes, grouped by collection.
+
+        Returns a list of (collection, indexes) pairs, where `indexes` is a
+        list of :class:`~pymongo.operations.IndexModel` ready to pass to
+        the collection's
+        :meth:`~pymongo.collection.Collection.create_indexes`. Takes the
+        same arguments as :meth:`recommend`.
+        """
+        grouped = []
+        positions = {}
+        for rec in self.recommend(client, limit, min_count):
+            namespace = rec['namespace']
+            if namespace not in positions:
+                positions[namespace] = len(grouped)
+                collection = client[rec['database']][rec['collection']]
+                grouped.append((collection, []))
+            grouped[positions[namespace]][1].append(rec['index'])
+        return grouped
@@ -21,8 +21,17 @@ MongoDB.
 """
 
 import datetime
+import os
 import random
 import struct
+import threading
+
+from collections import deque
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 import bson
 from bson.codec_options import DEFAULT_CODEC_OPTIONS
@@ -510,15 +519,17 @@ class _BulkWriteContext(object):
     """A wrapper around SocketInfo for use with write splitting functions."""
 
     __slots__ = ('db_name', 'command', 'sock_info', 'op_id',
-                 'name', 'field', 'publish', 'start_time', 'listeners')
+                 'name', 'field', 'publish', 'start_time', 'listeners',
+                 'encoder')
 
-    def __init__(
-            self, database_name, command, sock_info, operation_id, listeners):
+    def __init__(self, database_name, command, sock_info, operation_id,
+                 listeners, encoder=None):
         self.db_name = database_name
         self.command = command
         self.sock_info = sock_info
         self.op_id = operation_id
         self.listeners = listeners
+        self.encoder = encoder
         self.publish = listeners.enabled_for_commands
         self.name = next(iter(command))
         self.field = _FIELD_MAP[self.name]
@@ -613,6 +624,138 @@ class _BulkWriteContext(object):
             request_id, self.sock_info.address, self.op_id)
 
 
+def _encode_documents(docs, check_keys, opts):
+    """Encode documents until one fails.
+
+    Returns the encoded documents and the error, or None.
+    """
+    encoded = []
+    try:
+        for doc in docs:
+            encoded.append(bson.BSON.encode(doc, check_keys, opts))
+    except Exception as exc:
+        return encoded, exc
+    return encoded, None
+
+
+def _encode_pickled(data):
+    """Run _encode_documents in a worker process.
+
+    Returns None if the documents can't be unpickled here, for example
+    when their class was defined after the worker started.
+    """
+    try:
+        docs, check_keys, opts = pickle.loads(data)
+    except Exception:
+        return None
+    return _encode_documents(docs, check_keys, opts)
+
+
+def _encode_inline(docs, check_keys, opts):
+    """Generate (document, encoded document) pairs."""
+    for doc in docs:
+        yield doc, bson.BSON.encode(doc, check_keys, opts)
+
+
+class _DocumentEncoder(object):
+    """Encodes the documents of batched writes ahead, in worker processes.
+
+    The pure-Python BSON encoder holds the GIL, so the workers are
+    processes. They start on first use, and again after a fork.
+    """
+    # Documents sent to a worker at a time.
+    chunk_size = 100
+    # Seconds to wait for a chunk before encoding it on the calling thread
+    # and replacing the pool, in case a worker is stuck or has died.
+    timeout = 10
+
+    def __init__(self, workers):
+        self.workers = workers
+        # Chunks encoding at once: about two batches of 1000 documents.
+        self.max_pending = max(2 * workers, 2000 // self.chunk_size)
+        self.__lock = threading.Lock()
+        self.__pool = None
+        self.__pid = None
+
+    def __get_pool(self):
+        with self.__lock:
+            if self.__pool is None or self.__pid != os.getpid():
+                # Imported here: multiprocessing is slow to import, and
+                # most clients never need it.
+                import multiprocessing
+                self.__pool = multiprocessing.Pool(self.workers)
+                self.__pid = os.getpid()
+            return self.__pool
+
+    def __discard_pool(self, pool):
+        """Stop `pool`. The next call to __get_pool starts a new one."""
+        with self.__lock:
+            if self.__pool is pool:
+                self.__pool = None
+        pool.terminate()
+
+    def encode(self, docs, check_keys, opts):
+        """Generate (document, encoded document) pairs, encoding up to
+        `max_pending` chunks ahead of the caller.
+
+        An error encoding a document is raised when the caller reaches
+        it, as if the documents were encoded one by one.
+        """
+        pool = self.__get_pool()
+        import multiprocessing
+        docs = iter(docs)
+        pending = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.max_pending:
+                chunk = []
+                for doc in docs:
+                    chunk.append(doc)
+                    if len(chunk) == self.chunk_size:
+                        break
+                else:
+                    exhausted = True
+                if not chunk:
+                    break
+                try:
+                    data = pickle.dumps((chunk, check_keys, opts),
+                                        pickle.HIGHEST_PROTOCOL)
+                except Exception:
+                    result = None
+                else:
+                    result = pool.apply_async(_encode_pickled, (data,))
+                pending.append((chunk, result))
+            if not pending:
+                return
+            chunk, result = pending.popleft()
+            try:
+                outcome = result and result.get(self.timeout)
+            except multiprocessing.TimeoutError:
+                # Chunks sent to this pool may never come back.
+                self.__discard_pool(pool)
+                pool = self.__get_pool()
+                pending = deque((queued, None) for queued, _ in pending)
+                outcome = None
+            if outcome is None:
+                # The chunk couldn't be pickled, unpickled or encoded in
+                # time: encode it here instead.
+                for pair in _encode_inline(chunk, check_keys, opts):
+                    yield pair
+                continue
+            encoded, error = outcome
+            for pair in zip(chunk, encoded):
+                yield pair
+            if error is not None:
+                raise error
+
+    def close(self):
+        """Stop the worker processes."""
+        with self.__lock:
+            pool, self.__pool = self.__pool, None
+            if pool is not None and self.__pid == os.getpid():
+                pool.terminate()
+
+
 def _raise_document_too_large(operation, doc_size, max_size):
     """Internal helper for raising DocumentTooLarge."""
     if operation == "insert":
@@ -649,8 +792,11 @@ def _do_batched_insert(collection_name, docs, check_keys,
     message_length = begin_loc = data.tell()
     has_docs = False
     to_send = []
-    for doc in docs:
-        encoded = bson.BSON.encode(doc, check_keys, opts)
+    if ctx.encoder is None:
+        pairs = _encode_inline(docs, check_keys, opts)
+    else:
+        pairs = ctx.encoder.encode(docs, check_keys, opts)
+    for doc, encoded in pairs:
         encoded_length = len(encoded)
         too_large = (encoded_length > ctx.max_bson_size)
 
@@ -707,14 +853,37 @@ def _do_batched_write_command(namespace, operation, command,
                               docs, check_keys, opts, ctx):
     """Execute a batch of insert, update, or delete commands.
     """
+    ordered = command.get('ordered', True)
+
+    # If there are multiple batches we'll
+    # merge results in the caller.
+    results = []
+    for idx_offset, request_id, msg, to_send in _batched_write_command(
+            namespace, operation, command, docs, check_keys, opts, ctx):
+        result = ctx.write_command(request_id, msg, to_send)
+        results.append((idx_offset, result))
+        if ordered and "writeErrors" in result:
+            break
+    return results
+if _use_c:
+    _do_batched_write_command = _cmessage._do_batched_write_command
+
+
+def _batched_write_command(namespace, operation, command,
+                           docs, check_keys, opts, ctx):
+    """Encode insert, update, or delete commands, one batch at a time.
+
+    Generates tuples (idx_offset, request_id, msg, docs) where idx_offset is
+    the index in `docs` of the first document in the batch. Each batch is
+    encoded only when the next one is requested, so the caller can stop at
+    any point.
+    """
     max_bson_size = ctx.max_bson_size
     max_write_batch_size = ctx.max_write_batch_size
     # Max BSON object size + 16k - 2 bytes for ending NUL bytes.
     # Server guarantees there is enough room: SERVER-10643.
     max_cmd_size = max_bson_size + _COMMAND_OVERHEAD
 
-    ordered = command.get('ordered', True)
-
     buf = StringIO()
     # Save space for message length and request id
     buf.write(_ZERO_64)
@@ -747,10 +916,8 @@ def _do_batched_write_command(namespace, operation, command,
     # Where to write list document length
     list_start = buf.tell() - 4
 
-    to_send = []
-
-    def send_message():
-        """Finalize and send the current OP_QUERY message.
+    def finish_message():
+        """Finalize the current OP_QUERY message.
         """
         # Close list and command documents
         buf.write(_ZERO_16)
@@ -766,20 +933,19 @@ def _do_batched_write_command(namespace, operation, command,
         buf.write(struct.pack('<i', request_id))
         buf.seek(0)
         buf.write(struct.pack('<i', length))
-        return ctx.write_command(request_id, buf.getvalue(), to_send)
-
-    # If there are multiple batches we'll
-    # merge results in the caller.
-    results = []
+        return request_id, buf.getvalue()
 
+    to_send = []
     idx = 0
     idx_offset = 0
     has_docs = False
-    for doc in docs:
+    if ctx.encoder is None:
+        pairs = _encode_inline(docs, check_keys, opts)
+    else:
+        pairs = ctx.encoder.encode(docs, check_keys, opts)
+    for doc, value in pairs:
         has_docs = True
-        # Encode the current operation
         key = b(str(idx))
-        value = bson.BSON.encode(doc, check_keys, opts)
         # Send a batch?
         enough_data = (buf.tell() + len(key) + len(value) + 2) >= max_cmd_size
         enough_documents = (idx >= max_write_batch_size)
@@ -788,10 +954,8 @@ def _do_batched_write_command(namespace, operation, command,
                 write_op = "insert" if operation == _INSERT else None
                 _raise_document_too_large(
                     write_op, len(value), max_bson_size)
-            result = send_message()
-            results.append((idx_offset, result))
-            if ordered and "writeErrors" in result:
-                return results
+            request_id, msg = finish_message()
+            yield idx_offset, request_id, msg, to_send
 
             # Truncate back to the start of list elements
             buf.seek(list_start + 4)
@@ -810,7 +974,5 @@ def _do_batched_write_command(namespace, operation, command,
     if not has_docs:
         raise InvalidOperation("cannot do an empty bulk write")
 
-    results.append((idx_offset, send_message()))
-    return results
-if _use_c:
-    _do_batched_write_command = _cmessage._do_batched_write_command
+    request_id, msg = finish_message()
+    yield idx_offset, request_id, msg, to_send
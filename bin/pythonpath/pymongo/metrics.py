@@ -0,0 +1,483 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Collect driver metrics from monitoring events and export them.
+
+A :class:`MetricsCollector` is a command and heartbeat listener that keeps
+latency histograms per command name and per namespace, counts failures and
+documents returned, and records heartbeat round trip times. Clients passed
+to :meth:`MetricsCollector.watch` also contribute their connection pool
+statistics: checkouts, wait times, and bytes sent and received.
+
+For example::
+
+    from pymongo import MongoClient
+    from pymongo.metrics import MetricsCollector
+
+    metrics = MetricsCollector()
+    client = MongoClient(event_listeners=[metrics], eventQueueSize=10000)
+    metrics.watch(client)
+
+    # Prometheus text at http://127.0.0.1:9216/metrics, JSON at /json.
+    metrics.serve(9216)
+
+    # Or rewrite a file every 15 seconds.
+    metrics.export_periodically('/var/tmp/pymongo.prom', 15,
+                                format='prometheus')
+
+Each event costs a dict operation and a histogram update under a lock.
+With ``eventQueueSize`` that work moves off the application's threads; see
+:mod:`~pymongo.monitoring`.
+"""
+
+import json
+import os
+import threading
+import weakref
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from bson.py3compat import iteritems, string_type
+from pymongo import monitoring, periodic_executor
+from pymongo.histogram import Histogram
+
+JSON = 'json'
+"""Export format: a JSON document, see :meth:`MetricsCollector.snapshot`."""
+
+PROMETHEUS = 'prometheus'
+"""Export format: the Prometheus text exposition format, version 0.0.4."""
+
+_FORMATS = frozenset([JSON, PROMETHEUS])
+
+_CONTENT_TYPES = {
+    JSON: 'application/json',
+    PROMETHEUS: 'text/plain; version=0.0.4; charset=utf-8',
+}
+
+# Started events whose outcome never arrives, for example because an event
+# queue dropped it, are forgotten past this many.
+_MAX_PENDING = 10000
+
+
+def _namespace(command_name, command, database_name):
+    """The "db.collection" a command acts on, or just the database name."""
+    if command_name == 'getMore':
+        target = command.get('collection')
+    else:
+        target = command.get(command_name)
+    if isinstance(target, string_type):
+        return '%s.%s' % (database_name, target)
+    return database_name
+
+
+def _documents_returned(reply):
+    """The number of documents in a reply's cursor batch."""
+    try:
+        cursor = reply['cursor']
+        if 'firstBatch' in cursor:
+            return len(cursor['firstBatch'])
+        return len(cursor['nextBatch'])
+    except (KeyError, TypeError):
+        return 0
+
+
+class _CommandMetrics(object):
+    __slots__ = ('latency', 'failures', 'documents')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.failures = 0
+        self.documents = 0
+
+    def as_dict(self):
+        return {
+            'latency': self.latency.as_dict(),
+            'failures': self.failures,
+            'documents_returned': self.documents,
+        }
+
+
+class _HeartbeatMetrics(object):
+    __slots__ = ('round_trip_time', 'failures')
+
+    def __init__(self):
+        self.round_trip_time = Histogram()
+        self.failures = 0
+
+    def as_dict(self):
+        return {
+            'round_trip_time': self.round_trip_time.as_dict(),
+            'failures': self.failures,
+        }
+
+
+def _address_string(address):
+    return '%s:%s' % address
+
+
+class MetricsCollector(monitoring.CommandListener,
+                       monitoring.ServerHeartbeatListener):
+    """Keep histograms and counters of driver activity.
+
+    Register an instance with ``event_listeners`` or
+    :func:`~pymongo.monitoring.register`. Thread-safe.
+    """
+    def __init__(self):
+        self.__lock = threading.Lock()
+        # Maps (connection_id, request_id) to the namespace of a command
+        # that has started.
+        self.__pending = {}
+        self.__commands = {}
+        self.__namespaces = {}
+        self.__heartbeats = {}
+        self.__clients = []
+        self.__executor = None
+        self.__server = None
+
+    def watch(self, client):
+        """Include `client`'s connection pool statistics in snapshots.
+
+        The client is weakly referenced.
+        """
+        with self.__lock:
+            self.__clients.append(weakref.ref(client))
+
+    def reset(self):
+        """Discard all command and heartbeat measurements."""
+        with self.__lock:
+            self.__pending.clear()
+            self.__commands.clear()
+            self.__namespaces.clear()
+            self.__heartbeats.clear()
+
+    def started(self, event):
+        if isinstance(event, monitoring.ServerHeartbeatStartedEvent):
+            return
+        pending = self.__pending
+        if len(pending) >= _MAX_PENDING:
+            pending.clear()
+        pending[(event.connection_id, event.request_id)] = _namespace(
+            event.command_name, event.command, event.database_name)
+
+    def succeeded(self, event):
+        if isinstance(event, monitoring.ServerHeartbeatSucceededEvent):
+            self.__heartbeat(event.connection_id, event.duration, False)
+        else:
+            self.__command(event, event.duration_micros,
+                           _documents_returned(event.reply), False)
+
+    def failed(self, event):
+        if isinstance(event, monitoring.ServerHeartbeatFailedEvent):
+            self.__heartbeat(event.connection_id, event.duration, True)
+        else:
+            self.__command(event, event.duration_micros, 0, True)
+
+    def __command(self, event, duration_micros, documents, failed):
+        namespace = self.__pending.pop(
+            (event.connection_id, event.request_id), None)
+        seconds = duration_micros / 1000000.0
+        with self.__lock:
+            entries = [(self.__commands, event.command_name)]
+            if namespace is not None:
+                entries.append((self.__namespaces, namespace))
+            for table, key in entries:
+                metrics = table.get(key)
+                if metrics is None:
+                    metrics = table[key] = _CommandMetrics()
+                metrics.latency.record(seconds)
+                metrics.documents += documents
+                if failed:
+                    metrics.failures += 1
+
+    def __heartbeat(self, address, duration, failed):
+        with self.__lock:
+            metrics = self.__heartbeats.get(address)
+            if metrics is None:
+                metrics = self.__heartbeats[address] = _HeartbeatMetrics()
+            if failed:
+                metrics.failures += 1
+            else:
+                metrics.round_trip_time.record(duration)
+
+    def snapshot(self):
+        """The current measurements as a dict suitable for JSON encoding.
+
+        ``commands`` and ``namespaces`` map each command name and each
+        "db.collection" to its ``latency`` histogram summary (see
+        :meth:`~pymongo.histogram.Histogram.as_dict`), ``failures`` and
+        ``documents_returned``. ``heartbeats`` maps each "host:port" to its
+        ``round_trip_time`` histogram and ``failures``. ``pools`` lists
+        :meth:`~pymongo.mongo_client.MongoClient.pool_stats` entries of
+        each watched client, with ``client`` and ``address`` keys added.
+        """
+        with self.__lock:
+            commands = dict((name, metrics.as_dict())
+                            for name, metrics in iteritems(self.__commands))
+            namespaces = dict(
+                (ns, metrics.as_dict())
+                for ns, metrics in iteritems(self.__namespaces))
+            heartbeats = dict(
+                (_address_string(address), metrics.as_dict())
+                for address, metrics in iteritems(self.__heartbeats))
+            clients = self.__clients[:]
+
+        pools = []
+        for i, ref in enumerate(clients):
+            client = ref()
+            if client is None:
+                continue
+            for address, stats in sorted(iteritems(client.pool_stats())):
+                stats['client'] = i
+                stats['address'] = _address_string(address)
+                pools.append(stats)
+
+        return {
+            'commands': commands,
+            'namespaces': namespaces,
+            'heartbeats': heartbeats,
+            'pools': pools,
+        }
+
+    def to_json(self):
+        """A snapshot encoded as a JSON string."""
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def to_prometheus(self):
+        """A snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for table, label in (('commands', 'command'),
+                             ('namespaces', 'namespace')):
+            items = sorted(iteritems(snapshot[table]))
+            _histogram(lines, 'pymongo_%s_duration_seconds' % (label,),
+                       'Command durations by %s.' % (label,),
+                       [({label: key}, entry['latency'])
+                        for key, entry in items])
+            _metric(lines, 'pymongo_%s_failures_total' % (label,),
+                    'counter', 'Failed commands by %s.' % (label,),
+                    [({label: key}, entry['failures'])
+                     for key, entry in items])
+            _metric(lines, 'pymongo_%s_documents_returned_total' % (label,),
+                    'counter', 'Documents in cursor batches by %s.' % (label,),
+                    [({label: key}, entry['documents_returned'])
+                     for key, entry in items])
+
+        items = sorted(iteritems(snapshot['heartbeats']))
+        _histogram(lines, 'pymongo_heartbeat_duration_seconds',
+                   'Server heartbeat round trip times.',
+                   [({'address': key}, entry['round_trip_time'])
+                    for key, entry in items])
+        _metric(lines, 'pymongo_heartbeat_failures_total', 'counter',
+                'Failed server heartbeats.',
+                [({'address': key}, entry['failures'])
+                 for key, entry in items])
+
+        pools = [({'client': str(stats['client']),
+                   'address': stats['address']}, stats)
+                 for stats in snapshot['pools']]
+        _histogram(lines, 'pymongo_pool_wait_seconds',
+                   'Time spent waiting for a socket from a full pool.',
+                   [(labels, stats['wait_time']) for labels, stats in pools])
+        _histogram(lines, 'pymongo_pool_checkout_seconds',
+                   'Time sockets were kept checked out.',
+                   [(labels, stats['checkout_duration'])
+                    for labels, stats in pools])
+        for key, kind, help_text in (
+                ('checkouts', 'counter', 'Sockets checked out.'),
+                ('sockets_created', 'counter', 'Sockets opened.'),
+                ('sockets_closed', 'counter', 'Sockets closed.'),
+                ('wait_queue_timeouts', 'counter',
+                 'Checkouts that timed out waiting for a socket.'),
+                ('bytes_sent', 'counter', 'Bytes sent to the server.'),
+                ('bytes_received', 'counter',
+                 'Bytes received from the server.'),
+                ('idle_sockets', 'gauge', 'Sockets idle in the pool.'),
+                ('active_sockets', 'gauge', 'Sockets checked out.'),
+                ('wait_queue_depth', 'gauge',
+                 'Threads waiting for a socket.')):
+            if kind == 'counter':
+                name = 'pymongo_pool_%s_total' % (key,)
+            else:
+                name = 'pymongo_pool_%s' % (key,)
+            _metric(lines, name, kind, help_text,
+                    [(labels, stats[key]) for labels, stats in pools])
+
+        return ''.join(lines)
+
+    def export(self, format=JSON):
+        """A snapshot encoded in `format`, as UTF-8 bytes."""
+        if format == JSON:
+            data = self.to_json()
+        elif format == PROMETHEUS:
+            data = self.to_prometheus()
+        else:
+            raise ValueError("format must be one of %s" % (
+                ", ".join(sorted(_FORMATS)),))
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        return data
+
+    def write(self, path, format=JSON):
+        """Write a snapshot to the file `path`.
+
+        The snapshot goes to a temporary file that then replaces `path`, so
+        readers never see a partial file.
+        """
+        data = self.export(format)
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        if os.name == 'nt' and os.path.exists(path):
+            # os.rename cannot replace a file on Windows.
+            os.remove(path)
+        os.rename(tmp, path)
+
+    def export_periodically(self, path, interval, format=JSON):
+        """Call :meth:`write` every `interval` seconds until :meth:`stop`.
+
+        Replaces any earlier periodic export.
+        """
+        if format not in _FORMATS:
+            raise ValueError("format must be one of %s" % (
+                ", ".join(sorted(_FORMATS)),))
+        self_ref = weakref.ref(self)
+
+        def target():
+            collector = self_ref()
+            if collector is None:
+                return False
+            collector.write(path, format)
+            return True
+
+        executor = periodic_executor.PeriodicExecutor(
+            interval=interval,
+            min_interval=interval,
+            target=target,
+            name="pymongo_metrics_export_thread")
+        with self.__lock:
+            old, self.__executor = self.__executor, executor
+        if old is not None:
+            old.close()
+        executor.open()
+
+    def serve(self, port=0, host='127.0.0.1'):
+        """Serve snapshots over HTTP on a background thread.
+
+        ``GET /metrics`` returns the Prometheus format and ``GET /json``
+        returns JSON. Listens on the loopback interface unless `host` says
+        otherwise. Returns the (host, port) listened on, useful when `port`
+        is 0 to pick any free port. Replaces any earlier server.
+        """
+        server = HTTPServer((host, port), _make_handler(weakref.ref(self)))
+        thread = threading.Thread(target=server.serve_forever,
+                                  name="pymongo_metrics_http_thread")
+        thread.daemon = True
+        with self.__lock:
+            old, self.__server = self.__server, server
+        if old is not None:
+            _stop_server(old)
+        thread.start()
+        return server.server_address
+
+    def stop(self):
+        """Stop periodic exports and the HTTP server."""
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+            server, self.__server = self.__server, None
+        if executor is not None:
+            executor.close()
+        if server is not None:
+            _stop_server(server)
+
+
+def _stop_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+def _make_handler(collector_ref):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            collector = collector_ref()
+            path = self.path.split('?', 1)[0]
+            fmt = {'/metrics': PROMETHEUS, '/json': JSON}.get(path)
+            if collector is None or fmt is None:
+                self.send_error(404)
+                return
+            data = collector.export(fmt)
+            self.send_response(200)
+            self.send_header('Content-Type', _CONTENT_TYPES[fmt])
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _format_labels(labels, extra=None):
+    pairs = sorted(iteritems(labels))
+    if extra is not None:
+        pairs.append(extra)
+    return '{%s}' % ','.join(
+        '%s="%s"' % (key, _escape(value)) for key, value in pairs)
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _header(lines, name, kind, help_text):
+    lines.append('# HELP %s %s\n' % (name, help_text))
+    lines.append('# TYPE %s %s\n' % (name, kind))
+
+
+def _metric(lines, name, kind, help_text, samples):
+    if not samples:
+        return
+    _header(lines, name, kind, help_text)
+    for labels, value in samples:
+        lines.append('%s%s %s\n' % (
+            name, _format_labels(labels), _format_value(value)))
+
+
+def _histogram(lines, name, help_text, samples):
+    """Add Histogram.as_dict() summaries with cumulative buckets."""
+    if not samples:
+        return
+    _header(lines, name, 'histogram', help_text)
+    for labels, summary in samples:
+        cumulative = 0
+        for bound, count in summary['buckets']:
+            cumulative += count
+            le = '+Inf' if bound is None else repr(float(bound))
+            lines.append('%s_bucket%s %d\n' % (
+                name, _format_labels(labels, ('le', le)), cumulative))
+        lines.append('%s_sum%s %s\n' % (
+            name, _format_labels(labels), _format_value(summary['sum'])))
+        lines.append('%s_count%s %d\n' % (
+            name, _format_labels(labels), summary['count']))
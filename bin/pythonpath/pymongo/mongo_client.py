@@ -39,6 +39,8 @@ import weakref
 
 from collections import defaultdict
 
+import bson
+
 from bson.codec_options import DEFAULT_CODEC_OPTIONS
 from bson.py3compat import (integer_types,
                             string_type)
@@ -51,6 +53,8 @@ from pymongo import (common,
                      uri_parser)
 from pymongo.client_options import ClientOptions
 from pymongo.cursor_manager import CursorManager
+from pymongo.document_cache import DocumentCache
+from pymongo.profiler import SlowQueryProfiler
 from pymongo.errors import (AutoReconnect,
                             ConfigurationError,
                             ConnectionFailure,
@@ -172,10 +176,23 @@ class MongoClient(common.BaseObject):
             connections to the requested server. Defaults to 100. Cannot be 0.
           - `minPoolSize` (optional): The minimum required number of concurrent
             connections that the pool will maintain to each connected server.
-            Default is 0.
+            Connections are opened and authenticated in parallel on
+            background threads, when the client is created and again within
+            a second of the pool being cleared. Default is 0.
           - `maxIdleTimeMS` (optional): The maximum number of milliseconds that
             a connection can remain idle in the pool before being removed and
             replaced. Defaults to `None` (no limit).
+          - `forkHandoffSize`: (integer) For applications that fork worker
+            processes after using the client: keep this many connected,
+            authenticated sockets to each server set aside for the next
+            child. The first child to use the client after a fork takes
+            them over as its pool, so its first operations don't connect.
+            Other children connect as usual. The process that created the
+            client keeps its own sockets, and sets aside new ones within a
+            second of a child taking them; call :meth:`prepare_fork` before
+            forking to be sure they're ready. Fork only while no other thread
+            is using the client. Defaults to ``0``: children open new
+            sockets.
           - `socketTimeoutMS`: (integer or None) Controls how long (in
             milliseconds) the driver will wait for a response after sending an
             ordinary (non-monitoring) database operation before concluding that
@@ -209,6 +226,55 @@ class MongoClient(common.BaseObject):
             profile collections.
           - `event_listeners`: a list or tuple of event listeners. See
             :mod:`~pymongo.monitoring` for details.
+          - `eventQueueSize`: (integer) If greater than 0, command and
+            heartbeat events are queued, up to this many, and delivered to
+            listeners on a background thread. Defaults to ``0``: listeners
+            are called on the application's threads.
+          - `eventQueueOverflow`: What to do with a new event when the event
+            queue is full: ``'drop_newest'`` (the default),
+            ``'drop_oldest'`` or ``'block'`` (wait up to 10 seconds for
+            room).
+          - `bulkWriteConcurrency`: (integer) The maximum number of batches
+            of an unordered bulk write (including
+            :meth:`~pymongo.collection.Collection.insert_many` with
+            ``ordered=False``) sent at once, each on its own connection.
+            The next batch is encoded while earlier batches are in flight.
+            Only sockets that are free in the pool are used: with none to
+            spare, batches go over the caller's socket. Defaults to ``1``:
+            batches are sent one after another.
+          - `encodeWorkers`: (integer) Without the C extensions, encode the
+            documents of :meth:`~pymongo.collection.Collection.insert_many`
+            and bulk writes in this many worker processes, while earlier
+            batches are sent. The processes start on the first such write.
+            Ignored when the C extensions are installed, since they encode
+            faster than documents can be sent to another process. Defaults
+            to ``0``: encode on the calling thread.
+          - `documentCacheSize`: (integer) If greater than 0, cache up to
+            this many bytes of query results, and answer repeated
+            :meth:`~pymongo.collection.Collection.find` and
+            :meth:`~pymongo.collection.Collection.find_one` calls from the
+            cache. Only results that arrive in a single reply are cached.
+            Writes through this client drop the cached results for the
+            collection they modify, including the output collection of
+            an aggregate ``$out`` stage or a map/reduce.
+            :meth:`~pymongo.database.Database.command` drops the whole
+            database's results unless the command is known to be
+            read-only. Defaults to ``0``: no cache.
+          - `documentCacheTTLMS`: (integer or None) How long, in
+            milliseconds, to keep cached query results, bounding how stale
+            they are after writes by other clients. ``None`` keeps them
+            until they are evicted or invalidated. Defaults to ``60000``.
+          - `slowQueryThresholdMS`: (integer or None) Profile finds and
+            count, distinct and aggregate commands that take longer than
+            this many milliseconds: record them by query shape, with the
+            calling code, and explain each new shape in the background.
+            See :meth:`slow_queries`. Defaults to the value of the
+            ``PYMONGO_SLOW_QUERY_MS`` environment variable, or ``None``:
+            no profiling.
+          - `slowQueryLog`: (string or None) A file to append a JSON line
+            to for each slow query shape, with its plan. The file is
+            renamed with a ``.1`` suffix when it reaches 10MB. Defaults to
+            the ``PYMONGO_SLOW_QUERY_LOG`` environment variable.
 
           | **Write Concern options:**
           | (Only set if passed. No default values.)
@@ -258,6 +324,12 @@ class MongoClient(common.BaseObject):
             Defaults to ``-1``, meaning no maximum. If maxStalenessSeconds
             is set, it must be a positive integer greater than or equal to
             90 seconds.
+          - `localThresholdPercentile`: (number or None) Compare this
+            percentile (for example ``50`` or ``95``) of each server's recent
+            round trip times, instead of their average, when finding the
+            servers within `localThresholdMS` of the fastest. Use ``95`` to
+            avoid servers that are fast on average but often slow. Defaults
+            to ``None``, meaning the average.
 
           | **SSL configuration:**
 
@@ -435,6 +507,24 @@ class MongoClient(common.BaseObject):
         self.__index_cache = {}
         self.__index_cache_lock = threading.Lock()
 
+        # Cache of query results, if enabled.
+        self._document_cache = None
+        if options.document_cache_size:
+            self._document_cache = DocumentCache(
+                options.document_cache_size, options.document_cache_ttl)
+
+        # Worker processes that encode batched writes, if enabled.
+        self._document_encoder = None
+        if options.encode_workers and not bson.has_c():
+            self._document_encoder = message._DocumentEncoder(
+                options.encode_workers)
+
+        # Profiler of slow queries, if enabled.
+        self._profiler = None
+        if options.slow_query_threshold is not None:
+            self._profiler = SlowQueryProfiler(
+                options.slow_query_threshold, options.slow_query_log)
+
         super(MongoClient, self).__init__(options.codec_options,
                                           options.read_preference,
                                           options.write_concern,
@@ -454,7 +544,8 @@ class MongoClient(common.BaseObject):
             condition_class=condition_class,
             local_threshold_ms=options.local_threshold_ms,
             server_selection_timeout=options.server_selection_timeout,
-            heartbeat_frequency=options.heartbeat_frequency)
+            heartbeat_frequency=options.heartbeat_frequency,
+            local_threshold_percentile=options.local_threshold_percentile)
 
         self._topology = Topology(self._topology_settings)
         if connect:
@@ -511,6 +602,10 @@ class MongoClient(common.BaseObject):
         """Purge credentials from the authentication cache."""
         self.__all_credentials.pop(source, None)
 
+    def _credentials(self):
+        """A copy of the cached credentials, by source."""
+        return self.__all_credentials.copy()
+
     def _cached(self, dbname, coll, index):
         """Test if `index` is cached."""
         cache = self.__index_cache
@@ -565,6 +660,19 @@ class MongoClient(common.BaseObject):
             if index_name in self.__index_cache[database_name][collection_name]:
                 del self.__index_cache[database_name][collection_name][index_name]
 
+    def _invalidate_documents(self, database_name, collection_name=None):
+        """Drop cached query results after a write.
+
+        If `collection_name` is None drop results from an entire database.
+        """
+        cache = self._document_cache
+        if cache is None:
+            return
+        if collection_name is None:
+            cache.invalidate_database(database_name)
+        else:
+            cache.invalidate(database_name + "." + collection_name)
+
     def _server_property(self, attr_name):
         """An attribute of the current server's description.
 
@@ -589,6 +697,58 @@ class MongoClient(common.BaseObject):
         """
         return self._event_listeners.event_listeners
 
+    def event_queue_stats(self):
+        """Counters for the event queue, or None if `eventQueueSize` is 0.
+
+        Returns a dict with the number of events ``queued``, ``delivered``
+        and ``dropped`` so far, the current and maximum ``depth``, and the
+        ``max_size`` and ``overflow`` policy of the queue.
+        """
+        return self._event_listeners.queue_stats()
+
+    def document_cache_stats(self):
+        """Counters for the document cache, or None if `documentCacheSize`
+        is 0.
+
+        Returns a dict with the number of ``hits`` and ``misses`` so far,
+        the current number of ``entries`` and their size in ``bytes``, the
+        ``max_bytes`` allowed, and the number of entries removed by
+        ``evictions`` and ``expirations``, and of ``invalidations`` by
+        writes.
+        """
+        cache = self._document_cache
+        if cache is None:
+            return None
+        return cache.stats()
+
+    def slow_queries(self):
+        """Queries slower than `slowQueryThresholdMS`, or None if it isn't
+        set.
+
+        Returns a list with a dict for each query shape: the
+        ``namespace``, the ``operation`` (``'find'``, ``'count'``,
+        ``'distinct'`` or ``'aggregate'``), the ``shape`` of the query with
+        its values replaced by ``'?'``, how many times it was slow
+        (``count``), its ``total_ms`` and ``max_ms``, and the most recent
+        ``call_site`` outside PyMongo. Once the query has been explained,
+        the dict also has its ``plan``, and the numbers of
+        ``docs_examined``, ``keys_examined`` and documents ``returned``.
+        The slowest shapes in total come first.
+        """
+        if self._profiler is None:
+            return None
+        return self._profiler.slow_queries()
+
+    def clear_document_cache(self):
+        """Drop all cached query results.
+
+        Writes through this client invalidate the results they may change,
+        but writes by other clients are only seen when results expire.
+        Does nothing if `documentCacheSize` is 0.
+        """
+        if self._document_cache is not None:
+            self._document_cache.clear()
+
     @property
     def address(self):
         """(host, port) of the current standalone, primary, or mongos, or None.
@@ -752,11 +912,62 @@ class MongoClient(common.BaseObject):
         """The local threshold for this instance."""
         return self.__options.local_threshold_ms
 
+    @property
+    def local_threshold_percentile(self):
+        """The round trip time percentile used with the local threshold, or
+        None if average round trip times are used."""
+        return self.__options.local_threshold_percentile
+
     @property
     def server_selection_timeout(self):
         """The server selection timeout for this instance in seconds."""
         return self.__options.server_selection_timeout
 
+    @property
+    def bulk_write_concurrency(self):
+        """The maximum number of batches of an unordered bulk write that
+        are sent at once. Defaults to 1.
+        """
+        return self.__options.bulk_write_concurrency
+
+    @property
+    def encode_workers(self):
+        """The number of processes that encode the documents of batched
+        writes, when the C extensions aren't installed. Defaults to 0.
+        """
+        return self.__options.encode_workers
+
+    def pool_stats(self):
+        """Connection pool statistics for each known server.
+
+        Returns a dict mapping (host, port) to a dict of counters:
+        ``checkouts``, ``sockets_created``, ``sockets_closed``,
+        ``idle_sockets``, ``active_sockets``, the current and maximum
+        ``wait_queue_depth``, and ``wait_queue_timeouts``. The
+        ``wait_time`` and ``checkout_duration`` entries summarize histograms
+        of how long threads waited for a socket and how long they kept it
+        checked out, in seconds. ``bytes_sent`` and ``bytes_received``
+        count the wire protocol messages moved over sockets that have been
+        returned to the pool. ``sockets_inherited`` counts sockets taken
+        over from a parent process, see `forkHandoffSize`.
+        """
+        return self._topology.pool_stats()
+
+    def prepare_fork(self):
+        """Make sure sockets are set aside for the next child process.
+
+        With the `forkHandoffSize` option, call this just before forking a
+        worker process, so the worker gets connected, authenticated sockets
+        even if the previous worker took the last ones a moment ago. Blocks
+        while new sockets connect. No effect without `forkHandoffSize`.
+        """
+        if not self.__options.pool_options.fork_handoff_size:
+            return
+        topology = self._get_topology()
+        # Discover the servers first.
+        topology.select_server(writable_preferred_server_selector)
+        topology.prepare_handoff(self.__all_credentials)
+
     def _is_writable(self):
         """Attempt to connect to a writable server, or return False.
         """
@@ -779,6 +990,8 @@ class MongoClient(common.BaseObject):
         the threads restarted.
         """
         self._topology.close()
+        if self._document_encoder is not None:
+            self._document_encoder.close()
 
     def set_cursor_manager(self, manager_class):
         """DEPRECATED - Set this client's cursor manager.
@@ -992,6 +1205,11 @@ class MongoClient(common.BaseObject):
 
         :Parameters:
           - `name`: the name of the database to get
+
+        Returns a new :class:`~pymongo.database.Database` on each call, so
+        SON manipulators added to one aren't seen by other code using the
+        same database. Collections of a database are reused, see
+        :meth:`~pymongo.database.Database.__getitem__`.
         """
         return database.Database(self, name)
 
@@ -1133,7 +1351,7 @@ class MongoClient(common.BaseObject):
                 except Exception:
                     helpers._handle_exception()
         try:
-            self._topology.update_pool()
+            self._topology.update_pool(self.__all_credentials)
         except Exception:
             helpers._handle_exception()
 
@@ -1178,15 +1396,18 @@ class MongoClient(common.BaseObject):
                             "of %s or a Database" % (string_type.__name__,))
 
         self._purge_index(name)
-        with self._socket_for_reads(
-                ReadPreference.PRIMARY) as (sock_info, slave_ok):
-            self[name]._command(
-                sock_info,
-                "dropDatabase",
-                slave_ok=slave_ok,
-                read_preference=ReadPreference.PRIMARY,
-                write_concern=self.write_concern,
-                parse_write_concern_error=True)
+        try:
+            with self._socket_for_reads(
+                    ReadPreference.PRIMARY) as (sock_info, slave_ok):
+                self[name]._command(
+                    sock_info,
+                    "dropDatabase",
+                    slave_ok=slave_ok,
+                    read_preference=ReadPreference.PRIMARY,
+                    write_concern=self.write_concern,
+                    parse_write_concern_error=True)
+        finally:
+            self._invalidate_documents(name)
 
     def get_default_database(self):
         """Get the database named in the MongoDB connection URI.
@@ -19,6 +19,7 @@ import weakref
 from bson.codec_options import DEFAULT_CODEC_OPTIONS
 from bson.son import SON
 from pymongo import common, helpers, message, periodic_executor
+from pymongo.histogram import WindowedHistogram
 from pymongo.server_type import SERVER_TYPE
 from pymongo.ismaster import IsMaster
 from pymongo.monotonic import time as _time
@@ -45,6 +46,7 @@ class Monitor(object):
         self._pool = pool
         self._settings = topology_settings
         self._avg_round_trip_time = MovingAverage()
+        self._round_trip_times = WindowedHistogram()
         self._listeners = self._settings._pool_options.event_listeners
         pub = self._listeners is not None
         self._publish = pub and self._listeners.enabled_for_server_heartbeat
@@ -133,6 +135,7 @@ class Monitor(object):
             default = ServerDescription(address, error=error)
             if not retry:
                 self._avg_round_trip_time.reset()
+                self._round_trip_times.reset()
                 # Server type defaults to Unknown.
                 return default
 
@@ -148,6 +151,7 @@ class Monitor(object):
                     self._listeners.publish_server_heartbeat_failed(
                         address, error_time, error)
                 self._avg_round_trip_time.reset()
+                self._round_trip_times.reset()
                 return default
 
     def _check_once(self, metadata=None):
@@ -162,10 +166,12 @@ class Monitor(object):
             response, round_trip_time = self._check_with_socket(
                 sock_info, metadata=metadata)
             self._avg_round_trip_time.add_sample(round_trip_time)
+            self._round_trip_times.add_sample(round_trip_time)
             sd = ServerDescription(
                 address=address,
                 ismaster=response,
-                round_trip_time=self._avg_round_trip_time.get())
+                round_trip_time=self._avg_round_trip_time.get(),
+                round_trip_times=self._round_trip_times.get())
             if self._publish:
                 self._listeners.publish_server_heartbeat_succeeded(
                     address, round_trip_time, response)
@@ -124,10 +124,30 @@ Note that previously registered global listeners are automatically included
 when configuring per client event listeners. Registering a new global listener
 will not add that listener to existing client instances.
 
-.. note:: Events are delivered **synchronously**. Application threads block
-  waiting for event handlers (e.g. :meth:`~CommandListener.started`) to
-  return. Care must be taken to ensure that your event handlers are efficient
-  enough to not adversely affect overall application performance.
+.. note:: Events are delivered **synchronously** by default. Application
+  threads block waiting for event handlers (e.g.
+  :meth:`~CommandListener.started`) to return. Care must be taken to ensure
+  that your event handlers are efficient enough to not adversely affect
+  overall application performance.
+
+To keep slow handlers off the application's threads, pass `eventQueueSize` to
+:class:`~pymongo.mongo_client.MongoClient`. Command and heartbeat events are
+then recorded in a queue of at most that many events, and delivered in
+batches on a background thread::
+
+    client = MongoClient(event_listeners=[CommandLogger()],
+                         eventQueueSize=10000,
+                         eventQueueOverflow='drop_oldest')
+
+When the queue is full, `eventQueueOverflow` decides what happens:
+:data:`DROP_NEWEST` (the default) discards the new event,
+:data:`DROP_OLDEST` discards the oldest queued event, and :data:`BLOCK` makes
+the application thread wait for room, for at most 10 seconds before the event
+is dropped. Events published on PyMongo's background threads, such as
+heartbeat events, are dropped rather than waited for, since the same threads
+deliver the queue. Dropped events are counted, see
+:meth:`~pymongo.mongo_client.MongoClient.event_queue_stats`. Events still
+queued when the interpreter exits may be lost.
 
 .. warning:: The command documents published through this API are *not* copies.
   If you intend to modify them in any way you must copy them in your event
@@ -135,10 +155,14 @@ will not add that listener to existing client instances.
 """
 
 import sys
+import threading
 import traceback
+import weakref
 
-from collections import namedtuple, Sequence
+from collections import deque, namedtuple, Sequence
+from pymongo import periodic_executor
 from pymongo.helpers import _handle_exception
+from pymongo.monotonic import time as _time
 
 _Listeners = namedtuple('Listeners',
                         ('command_listeners', 'server_listeners',
@@ -146,6 +170,32 @@ _Listeners = namedtuple('Listeners',
 
 _LISTENERS = _Listeners([], [], [], [])
 
+DROP_NEWEST = 'drop_newest'
+"""Discard the new event when the event queue is full."""
+
+DROP_OLDEST = 'drop_oldest'
+"""Discard the oldest queued event when the event queue is full."""
+
+BLOCK = 'block'
+"""Wait for room when the event queue is full.
+
+Application threads wait at most 10 seconds, then the event is dropped.
+Events from PyMongo's background threads are dropped without waiting.
+"""
+
+_OVERFLOW_POLICIES = frozenset([DROP_NEWEST, DROP_OLDEST, BLOCK])
+
+# Seconds between deliveries of queued events, and at least between two
+# deliveries when events arrive steadily.
+_EVENT_QUEUE_INTERVAL = 0.5
+_EVENT_QUEUE_MIN_INTERVAL = 0.01
+
+# Most events taken from the queue at once.
+_EVENT_BATCH_SIZE = 1000
+
+# Longest wait for room with the BLOCK policy, in seconds.
+_EVENT_QUEUE_BLOCK_TIMEOUT = 10
+
 
 class _EventListener(object):
     """Abstract base class for all event listeners."""
@@ -648,6 +698,112 @@ class ServerHeartbeatFailedEvent(_ServerHeartbeatEvent):
         return self.__reply
 
 
+class _EventQueue(object):
+    """A bounded queue of events waiting for delivery.
+
+    Each item is (event class, listeners, method name, event arguments): the
+    event object is created on the delivering thread.
+    """
+    def __init__(self, max_size, overflow):
+        self.max_size = max_size
+        self.overflow = overflow
+        self.lock = threading.Lock()
+        self.not_full = threading.Condition(self.lock)
+        self.items = deque()
+        self.executor = None
+        self.queued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item):
+        with self.lock:
+            if len(self.items) >= self.max_size:
+                if self.overflow == DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                elif self.overflow == DROP_OLDEST:
+                    self.items.popleft()
+                    self.dropped += 1
+                else:
+                    self.executor.wake()
+                    if not self._wait_not_full():
+                        self.dropped += 1
+                        return
+            self.items.append(item)
+            self.queued += 1
+            depth = len(self.items)
+            if depth > self.max_depth:
+                self.max_depth = depth
+        if depth == 1 or depth == self.max_size // 2:
+            self.executor.wake()
+
+    def _wait_not_full(self):
+        """Wait for room, holding the lock. Return False on timeout.
+
+        Delivery runs on the scheduler's worker threads, so a target running
+        there, like a server check publishing heartbeats, must not wait.
+        """
+        if periodic_executor.on_worker_thread():
+            return False
+        end = _time() + _EVENT_QUEUE_BLOCK_TIMEOUT
+        while len(self.items) >= self.max_size:
+            remaining = end - _time()
+            if remaining <= 0:
+                return False
+            self.not_full.wait(remaining)
+        return True
+
+    def take_batch(self):
+        with self.lock:
+            if len(self.items) <= _EVENT_BATCH_SIZE:
+                items = self.items
+                self.items = deque()
+            else:
+                popleft = self.items.popleft
+                items = [popleft() for _ in range(_EVENT_BATCH_SIZE)]
+            self.not_full.notify_all()
+            return items
+
+    def stats(self):
+        with self.lock:
+            return {
+                'queued': self.queued,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'depth': len(self.items),
+                'max_depth': self.max_depth,
+                'max_size': self.max_size,
+                'overflow': self.overflow,
+            }
+
+
+def _deliver_events(queue_ref):
+    queue = queue_ref()
+    if not queue:
+        return False  # Cancel PeriodicExecutor.
+
+    while True:
+        items = queue.take_batch()
+        if not items:
+            return True  # Continue PeriodicExecutor.
+        for event_class, subscribers, method_name, args in items:
+            try:
+                event = event_class(*args)
+            except Exception:
+                # Synchronous publishing would fail only this call. Keep
+                # delivering the rest.
+                _handle_exception()
+                continue
+            for subscriber in subscribers:
+                try:
+                    getattr(subscriber, method_name)(event)
+                except Exception:
+                    _handle_exception()
+        with queue.lock:
+            queue.delivered += len(items)
+
+
 class _EventListeners(object):
     """Configure event listeners for a client instance.
 
@@ -655,8 +811,13 @@ class _EventListeners(object):
 
     :Parameters:
       - `listeners`: A list of event listeners.
+      - `queue_size` (optional): Deliver command and heartbeat events from a
+        queue of at most this many events on a background thread. Zero or
+        None for synchronous delivery.
+      - `overflow` (optional): What to do when the queue is full: one of
+        :data:`DROP_NEWEST`, :data:`DROP_OLDEST` or :data:`BLOCK`.
     """
-    def __init__(self, listeners):
+    def __init__(self, listeners, queue_size=None, overflow=DROP_NEWEST):
         self.__command_listeners = _LISTENERS.command_listeners[:]
         self.__server_listeners = _LISTENERS.server_listeners[:]
         lst = _LISTENERS.server_heartbeat_listeners
@@ -678,6 +839,27 @@ class _EventListeners(object):
             self.__server_heartbeat_listeners)
         self.__enabled_for_topology = bool(self.__topology_listeners)
 
+        self.__queue = None
+        if queue_size and (self.__enabled_for_commands or
+                           self.__enabled_for_server_heartbeat):
+            self.__queue = queue = _EventQueue(queue_size, overflow)
+
+            def target():
+                return _deliver_events(queue_ref)
+
+            executor = periodic_executor.PeriodicExecutor(
+                interval=_EVENT_QUEUE_INTERVAL,
+                min_interval=_EVENT_QUEUE_MIN_INTERVAL,
+                target=target,
+                name="pymongo_event_queue_thread")
+
+            # The executor weakly references the queue via this closure.
+            # When these listeners and their queue are freed, the executor
+            # stops at its next run.
+            queue_ref = weakref.ref(queue)
+            queue.executor = executor
+            executor.open()
+
     @property
     def enabled_for_commands(self):
         """Are any CommandListener instances registered?"""
@@ -698,6 +880,13 @@ class _EventListeners(object):
         """Are any TopologyListener instances registered?"""
         return self.__enabled_for_topology
 
+    def queue_stats(self):
+        """Counters for the event queue, or None if delivery is synchronous.
+        """
+        if self.__queue is None:
+            return None
+        return self.__queue.stats()
+
     def event_listeners(self):
         """List of registered event listeners."""
         return (self.__command_listeners[:],
@@ -720,6 +909,11 @@ class _EventListeners(object):
         """
         if op_id is None:
             op_id = request_id
+        if self.__queue is not None:
+            self.__queue.put((
+                CommandStartedEvent, self.__command_listeners, 'started',
+                (command, database_name, request_id, connection_id, op_id)))
+            return
         event = CommandStartedEvent(
             command, database_name, request_id, connection_id, op_id)
         for subscriber in self.__command_listeners:
@@ -743,6 +937,12 @@ class _EventListeners(object):
         """
         if op_id is None:
             op_id = request_id
+        if self.__queue is not None:
+            self.__queue.put((
+                CommandSucceededEvent, self.__command_listeners, 'succeeded',
+                (duration, reply, command_name,
+                 request_id, connection_id, op_id)))
+            return
         event = CommandSucceededEvent(
             duration, reply, command_name, request_id, connection_id, op_id)
         for subscriber in self.__command_listeners:
@@ -767,6 +967,12 @@ class _EventListeners(object):
         """
         if op_id is None:
             op_id = request_id
+        if self.__queue is not None:
+            self.__queue.put((
+                CommandFailedEvent, self.__command_listeners, 'failed',
+                (duration, failure, command_name,
+                 request_id, connection_id, op_id)))
+            return
         event = CommandFailedEvent(
             duration, failure, command_name, request_id, connection_id, op_id)
         for subscriber in self.__command_listeners:
@@ -782,6 +988,12 @@ class _EventListeners(object):
         :Parameters:
          - `connection_id`: The address (host/port pair) of the connection.
         """
+        if self.__queue is not None:
+            self.__queue.put((
+                ServerHeartbeatStartedEvent,
+                self.__server_heartbeat_listeners, 'started',
+                (connection_id,)))
+            return
         event = ServerHeartbeatStartedEvent(connection_id)
         for subscriber in self.__server_heartbeat_listeners:
             try:
@@ -800,6 +1012,12 @@ class _EventListeners(object):
             resolution for the platform.
          - `reply`: The command reply.
          """
+        if self.__queue is not None:
+            self.__queue.put((
+                ServerHeartbeatSucceededEvent,
+                self.__server_heartbeat_listeners, 'succeeded',
+                (duration, reply, connection_id)))
+            return
         event = ServerHeartbeatSucceededEvent(duration, reply, connection_id)
         for subscriber in self.__server_heartbeat_listeners:
             try:
@@ -817,6 +1035,12 @@ class _EventListeners(object):
             resolution for the platform.
          - `reply`: The command reply.
          """
+        if self.__queue is not None:
+            self.__queue.put((
+                ServerHeartbeatFailedEvent,
+                self.__server_heartbeat_listeners, 'failed',
+                (duration, reply, connection_id)))
+            return
         event = ServerHeartbeatFailedEvent(duration, reply, connection_id)
         for subscriber in self.__server_heartbeat_listeners:
             try:
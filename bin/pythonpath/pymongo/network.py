@@ -51,7 +51,7 @@ def command(sock, dbname, spec, slave_ok, is_mongos,
             check_keys=False, listeners=None, max_bson_size=None,
             read_concern=DEFAULT_READ_CONCERN,
             parse_write_concern_error=False,
-            collation=None):
+            collation=None, counters=None):
     """Execute a command over the socket, or raise socket.error.
 
     :Parameters:
@@ -72,6 +72,8 @@ def command(sock, dbname, spec, slave_ok, is_mongos,
       - `parse_write_concern_error`: Whether to parse the ``writeConcernError``
         field in the command response.
       - `collation`: The collation for this command.
+      - `counters`: Optional object with ``bytes_sent`` and
+        ``bytes_received`` attributes to add the message sizes to.
 
     """
     name = next(iter(spec))
@@ -106,6 +108,10 @@ def command(sock, dbname, spec, slave_ok, is_mongos,
     try:
         sock.sendall(msg)
         response = receive_message(sock, 1, request_id)
+        if counters is not None:
+            counters.bytes_sent += len(msg)
+            # Plus the 16 byte header.
+            counters.bytes_received += len(response) + 16
         unpacked = helpers._unpack_response(
             response, codec_options=codec_options)
 
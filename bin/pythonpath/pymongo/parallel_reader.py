@@ -0,0 +1,398 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Read a collection on several threads.
+
+A :class:`ParallelReader` splits a collection into partitions, reads them
+on a pool of threads, and yields the documents as one stream, in no
+particular order::
+
+    from pymongo.parallel_reader import ParallelReader
+
+    with ParallelReader(db.assets, {'type': 'asset'}, workers=8) as reader:
+        for document in reader:
+            check(document)
+
+Partitions come from the ``parallelCollectionScan`` command when it can
+be used, otherwise from ranges of ``_id``: by creation time when the ids
+are ObjectIds, or between ids sampled with ``$sample``. A last partition
+holds documents whose ``_id`` has another BSON type, so each matching
+document is read once as long as the collection isn't modified during the
+read.
+
+Threads overlap network waits, but decoding BSON holds the GIL. To use
+every core, give each process one of
+:meth:`ParallelReader.partition_filters`.
+"""
+
+import threading
+
+from collections import deque
+
+from bson.objectid import ObjectId
+from bson.py3compat import integer_types, string_type
+from pymongo.errors import OperationFailure
+
+SCAN = 'scan'
+"""Split with the parallelCollectionScan command. Not available through
+mongos, or with a filter or projection."""
+
+OBJECT_ID = 'objectid'
+"""Split ObjectId ``_id`` values into ranges of equal creation time."""
+
+SAMPLE = 'sample'
+"""Split ``_id`` values at points sampled with ``$sample``. Requires
+MongoDB 3.2+."""
+
+AUTO = 'auto'
+"""Use :data:`SCAN` if possible, else :data:`OBJECT_ID` if any ``_id`` is an
+ObjectId, else :data:`SAMPLE`."""
+
+_SPLIT_METHODS = frozenset([SCAN, OBJECT_ID, SAMPLE, AUTO])
+
+# Documents sampled per partition when choosing split points.
+_SAMPLES_PER_PARTITION = 20
+
+
+def _id_type(value):
+    """The $type of an _id, for the values partitions can split, or None."""
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, string_type):
+        return 2
+    if isinstance(value, float) or (isinstance(value, integer_types) and
+                                    not isinstance(value, bool)):
+        return 'number'
+    return None
+
+
+def _range_filters(bounds, id_type):
+    """Filters on _id for the ranges between sorted `bounds`, plus one for
+    _ids of other types.
+    """
+    filters = []
+    lower = None
+    for upper in bounds + [None]:
+        condition = {'$type': id_type}
+        if lower is not None:
+            condition['$gte'] = lower
+        if upper is not None:
+            condition['$lt'] = upper
+        filters.append({'_id': condition})
+        lower = upper
+    filters.append({'_id': {'$not': {'$type': id_type}}})
+    return filters
+
+
+def _object_id_bounds(first, last, count):
+    """Split points between two ObjectIds, by creation time."""
+    start = first.generation_time
+    span = last.generation_time - start
+    bounds = []
+    for i in range(1, count):
+        point = ObjectId.from_datetime(start + span * i // count)
+        if point > first and (not bounds or point > bounds[-1]):
+            bounds.append(point)
+    return bounds
+
+
+def _sample_bounds(collection, count):
+    """Split points between sampled _ids, and their $type."""
+    sampled = [doc['_id'] for doc in collection.aggregate([
+        {'$sample': {'size': count * _SAMPLES_PER_PARTITION}},
+        {'$project': {'_id': 1}}])]
+    types = set(_id_type(value) for value in sampled)
+    if len(types) != 1 or None in types:
+        # Mixed or unsortable _ids: read everything as one partition.
+        return [], None
+    sampled.sort()
+    bounds = []
+    for i in range(1, count):
+        point = sampled[i * len(sampled) // count]
+        if not bounds or point > bounds[-1]:
+            bounds.append(point)
+    return bounds, types.pop()
+
+
+def _end_object_id(collection, direction):
+    """The smallest or largest ObjectId _id, or None."""
+    for doc in collection.find({'_id': {'$type': 7}}, {'_id': 1}).sort(
+            '_id', direction).limit(1):
+        return doc['_id']
+    return None
+
+
+class _Batches(object):
+    """Worker threads that read partitions into a bounded buffer.
+
+    Kept apart from ParallelReader so the threads don't keep an abandoned
+    reader alive.
+    """
+    def __init__(self, sources, workers, batch_size, max_buffered):
+        self.sources = deque(sources)
+        self.batch_size = batch_size
+        self.max_buffered = max(1, max_buffered)
+        self.buffer = deque()
+        self.cond = threading.Condition(threading.Lock())
+        self.error = None
+        self.closed = False
+        self.running = min(workers, len(self.sources))
+        for _ in range(self.running):
+            thread = threading.Thread(target=self.run,
+                                      name="pymongo_parallel_reader_thread")
+            thread.daemon = True
+            thread.start()
+
+    def run(self):
+        try:
+            while True:
+                with self.cond:
+                    if self.closed or not self.sources:
+                        return
+                    source = self.sources.popleft()
+                cursor = source()
+                try:
+                    batch = []
+                    for document in cursor:
+                        batch.append(document)
+                        if len(batch) >= self.batch_size:
+                            if not self.put(batch):
+                                return
+                            batch = []
+                    if batch and not self.put(batch):
+                        return
+                finally:
+                    cursor.close()
+        except Exception as exc:
+            with self.cond:
+                if self.error is None:
+                    self.error = exc
+        finally:
+            with self.cond:
+                self.running -= 1
+                self.cond.notify_all()
+
+    def put(self, batch):
+        """Wait for room and buffer a batch. False if closed."""
+        with self.cond:
+            while len(self.buffer) >= self.max_buffered and not self.closed:
+                self.cond.wait()
+            if self.closed:
+                return False
+            self.buffer.append(batch)
+            self.cond.notify_all()
+            return True
+
+    def get(self):
+        """Wait for and return the next batch, or None when all are read.
+
+        Raises the first error from a worker, and stops the others.
+        """
+        with self.cond:
+            while (not self.buffer and self.running and
+                   self.error is None):
+                self.cond.wait()
+            if self.error is not None:
+                self.closed = True
+                self.cond.notify_all()
+                raise self.error
+            if self.buffer:
+                batch = self.buffer.popleft()
+                self.cond.notify_all()
+                return batch
+            return None
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.buffer.clear()
+            self.cond.notify_all()
+
+
+class ParallelReader(object):
+    """Iterate over documents matching `filter`, read by several threads.
+
+    The collection is split on first use. Call :meth:`close`, or use the
+    reader in a ``with`` statement, to stop the threads early.
+
+    :Parameters:
+      - `collection`: The :class:`~pymongo.collection.Collection` to read.
+      - `filter` (optional): A query that documents must match.
+      - `projection` (optional): The fields to return, as for
+        :meth:`~pymongo.collection.Collection.find`.
+      - `workers` (optional): The number of threads. Defaults to 4.
+      - `partitions` (optional): The number of ``_id`` ranges. Defaults to
+        four per worker, so workers that finish early take more. The
+        ``parallelCollectionScan`` command gets one cursor per worker.
+      - `split` (optional): :data:`AUTO` (the default), :data:`SCAN`,
+        :data:`OBJECT_ID` or :data:`SAMPLE`.
+      - `batch_size` (optional): Documents per buffered batch.
+      - `max_buffered_batches` (optional): The most batches read ahead of
+        the application. Defaults to two per worker.
+      - `**kwargs`: Other :meth:`~pymongo.collection.Collection.find`
+        arguments for ``_id`` range partitions, like ``no_cursor_timeout``.
+    """
+    def __init__(self, collection, filter=None, projection=None, workers=4,
+                 partitions=None, split=AUTO, batch_size=1000,
+                 max_buffered_batches=None, **kwargs):
+        self.__batches = None
+        if split not in _SPLIT_METHODS:
+            raise ValueError("split must be one of %s" % (
+                ", ".join(sorted(_SPLIT_METHODS)),))
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.__collection = collection
+        self.__filter = filter or {}
+        self.__projection = projection
+        self.__workers = workers
+        self.__partitions = partitions or 4 * workers
+        self.__split = split
+        self.__batch_size = batch_size
+        if max_buffered_batches is None:
+            max_buffered_batches = 2 * workers
+        self.__max_buffered = max_buffered_batches
+        self.__kwargs = kwargs
+        self.__split_used = None
+        self.__current = deque()
+        self.__done = False
+
+    def __del__(self):
+        if self.__batches is not None:
+            self.__batches.close()
+
+    @property
+    def split_method(self):
+        """The split method used: :data:`SCAN`, :data:`OBJECT_ID` or
+        :data:`SAMPLE`. None until reading starts.
+        """
+        return self.__split_used
+
+    def partition_filters(self):
+        """Split the collection, and return a filter for each ``_id`` range.
+
+        Each filter combines `filter` with one range. Reading every filter,
+        for example in separate processes, reads each matching document
+        once. Never uses :data:`SCAN`.
+        """
+        split = OBJECT_ID if self.__split == AUTO else self.__split
+        if split == SCAN:
+            raise ValueError("parallelCollectionScan cursors can't be "
+                             "described by filters")
+        return self.__range_filters(split)
+
+    def __range_filters(self, split):
+        collection = self.__collection
+        count = self.__partitions
+        bounds, id_type = [], None
+        if split == OBJECT_ID:
+            first = _end_object_id(collection, 1)
+            if first is not None:
+                last = _end_object_id(collection, -1)
+                bounds, id_type = _object_id_bounds(first, last, count), 7
+            elif self.__split == AUTO:
+                split = SAMPLE
+        if split == SAMPLE:
+            bounds, id_type = _sample_bounds(collection, count)
+        self.__split_used = split
+
+        if id_type is None:
+            ranges = [{}]
+        else:
+            ranges = _range_filters(bounds, id_type)
+        if not self.__filter:
+            return ranges
+        return [{'$and': [self.__filter, r]} if r else self.__filter
+                for r in ranges]
+
+    def __sources(self):
+        """Functions that each open a cursor over one partition."""
+        collection = self.__collection
+        if (self.__split in (AUTO, SCAN) and not self.__filter and
+                self.__projection is None):
+            client = collection.database.client
+            try:
+                if not client.is_mongos:
+                    cursors = collection.parallel_scan(self.__workers)
+                    self.__split_used = SCAN
+                    return [lambda cursor=cursor: cursor
+                            for cursor in cursors]
+            except OperationFailure:
+                if self.__split == SCAN:
+                    raise
+        if self.__split == SCAN:
+            raise ValueError(
+                "parallelCollectionScan isn't available through mongos, or "
+                "with a filter or projection")
+
+        split = OBJECT_ID if self.__split == AUTO else self.__split
+        projection = self.__projection
+        kwargs = self.__kwargs
+        return [lambda query=query: collection.find(
+                    query, projection, **kwargs)
+                for query in self.__range_filters(split)]
+
+    def __iter__(self):
+        return self
+
+    def batches(self):
+        """Yield the remaining documents as lists of up to `batch_size`."""
+        if self.__current:
+            batch = list(self.__current)
+            self.__current.clear()
+            yield batch
+        while True:
+            batch = self.__next_batch()
+            if batch is None:
+                return
+            yield batch
+
+    def __next_batch(self):
+        if self.__done:
+            return None
+        if self.__batches is None:
+            self.__batches = _Batches(
+                self.__sources(), self.__workers, self.__batch_size,
+                self.__max_buffered)
+        try:
+            batch = self.__batches.get()
+        except Exception:
+            self.__done = True
+            raise
+        if batch is None:
+            self.__done = True
+        return batch
+
+    def next(self):
+        """Return the next document."""
+        if not self.__current:
+            batch = self.__next_batch()
+            if batch is None:
+                raise StopIteration
+            self.__current = deque(batch)
+        return self.__current.popleft()
+
+    __next__ = next
+
+    def close(self):
+        """Stop the worker threads. Buffered documents are discarded."""
+        self.__done = True
+        self.__current.clear()
+        if self.__batches is not None:
+            self.__batches.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
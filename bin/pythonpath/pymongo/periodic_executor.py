@@ -12,15 +12,41 @@
 # implied.  See the License for the specific language governing
 # permissions and limitations under the License.
 
-"""Run a target function on a background thread."""
+"""Run target functions periodically on a few shared background threads."""
 
 import atexit
+import heapq
+import itertools
+import os
+import sys
 import threading
-import time
+import traceback
 import weakref
 
+from collections import deque
+
 from pymongo.monotonic import time as _time
 
+# The most threads running targets at once, for the whole process. A server
+# check can block for up to connectTimeoutMS, so workers are added while all
+# are busy, until each slow check has its own or this many are running.
+MAX_WORKERS = 64
+
+# Start another worker only when a due target has waited this many seconds
+# for a busy one, so bursts of quick targets share a thread.
+_WORKER_START_DELAY = 0.1
+
+# Stop a worker that stayed idle for this many seconds, keeping one.
+_WORKER_IDLE_TIMEOUT = 60
+
+# Marks the scheduler's worker threads, see on_worker_thread().
+_local = threading.local()
+
+
+def on_worker_thread():
+    """True if called from a target running on a scheduler worker."""
+    return getattr(_local, 'worker', False)
+
 
 class PeriodicExecutor(object):
     def __init__(self, interval, min_interval, target, name=None):
@@ -28,59 +54,40 @@ class PeriodicExecutor(object):
 
         If the target's return value is false, the executor stops.
 
+        Executors share one scheduling thread and a pool of worker threads
+        per process, which grows while all workers are busy, up to
+        `MAX_WORKERS`. Each executor's target runs on one thread at a time.
+
         :Parameters:
           - `interval`: Seconds between calls to `target`.
           - `min_interval`: Minimum seconds between calls if `wake` is
             called very often.
           - `target`: A function.
-          - `name`: A name to give the underlying thread.
+          - `name`: A name for the executor, used in error messages.
         """
-        # threading.Event and its internal condition variable are expensive
-        # in Python 2, see PYTHON-983. Use a boolean to know when to wake.
-        # The executor's design is constrained by several Python issues, see
-        # "periodic_executor.rst" in this repository.
+        # Set only while holding the scheduler's lock, except _event and
+        # _stopped: wake() and close() set those from any thread, or from a
+        # weakref callback where taking a lock could deadlock.
         self._event = False
         self._interval = interval
         self._min_interval = min_interval
         self._target = target
         self._stopped = False
-        self._thread = None
         self._name = name
 
-        self._thread_will_exit = False
-        self._lock = threading.Lock()
+        # The process in which this executor was last opened.
+        self._pid = None
+        # Whether a heap entry for this executor is current.
+        self._scheduled = False
+        self._deadline = None
+        self._generation = 0
+        # Queued for or running on a worker thread.
+        self._running = False
+        self._last_run = None
 
     def open(self):
-        """Start. Multiple calls have no effect.
-
-        Not safe to call from multiple threads at once.
-        """
-        with self._lock:
-            if self._thread_will_exit:
-                # If the background thread has read self._stopped as True
-                # there is a chance that it has not yet exited. The call to
-                # join should not block indefinitely because there is no
-                # other work done outside the while loop in self._run.
-                try:
-                    self._thread.join()
-                except ReferenceError:
-                    # Thread terminated.
-                    pass
-            self._thread_will_exit = False
-            self._stopped = False
-        started = False
-        try:
-            started = self._thread and self._thread.is_alive()
-        except ReferenceError:
-            # Thread terminated.
-            pass
-
-        if not started:
-            thread = threading.Thread(target=self._run, name=self._name)
-            thread.daemon = True
-            self._thread = weakref.proxy(thread)
-            _register_executor(self)
-            thread.start()
+        """Start. Multiple calls have no effect."""
+        _SCHEDULER.open(self)
 
     def close(self, dummy=None):
         """Stop. To restart, call open().
@@ -91,50 +98,263 @@ class PeriodicExecutor(object):
         self._stopped = True
 
     def join(self, timeout=None):
-        if self._thread is not None:
-            try:
-                self._thread.join(timeout)
-            except (ReferenceError, RuntimeError):
-                # Thread already terminated, or not yet started.
-                pass
+        """Wait until a closed executor's target is no longer running."""
+        _SCHEDULER.join(self, timeout)
 
     def wake(self):
         """Execute the target function soon."""
         self._event = True
+        _SCHEDULER.wake(self)
 
-    def __should_stop(self):
-        with self._lock:
-            if self._stopped:
-                self._thread_will_exit = True
-                return True
+    def _run_target(self):
+        """Call the target once. Return False to stop the executor."""
+        try:
+            return self._target()
+        except Exception:
+            # Like an exception that ends a thread.
+            if sys is not None:
+                sys.stderr.write("Exception in %s:\n" % (self._name,))
+                traceback.print_exc()
             return False
 
-    def _run(self):
-        while not self.__should_stop():
-            try:
-                if not self._target():
-                    self._stopped = True
-                    break
-            except:
-                self._stopped = True
-                raise
-
-            deadline = _time() + self._interval
-
-            while not self._stopped and _time() < deadline:
-                time.sleep(self._min_interval)
-                if self._event:
-                    break  # Early wake.
-
-            self._event = False
-
-
-# _EXECUTORS has a weakref to each running PeriodicExecutor. Once started,
-# an executor is kept alive by a strong reference from its thread and perhaps
-# from other objects. When the thread dies and all other referrers are freed,
-# the executor is freed and removed from _EXECUTORS. If any threads are
-# running when the interpreter begins to shut down, we try to halt and join
-# them to avoid spurious errors.
+    def __repr__(self):
+        return "<PeriodicExecutor %s>" % (self._name,)
+
+
+class _Scheduler(object):
+    """Runs each open PeriodicExecutor's target when it is due.
+
+    One thread keeps the executors in a heap ordered by deadline and hands
+    the due ones to up to `max_workers` worker threads. Workers start when
+    due executors wait for a busy worker. Due executors go to the most
+    recently idle worker, and all but one worker stop once they have been
+    idle for `_WORKER_IDLE_TIMEOUT` seconds.
+    Rescheduling an executor pushes a new heap entry and bumps its
+    generation; stale entries are skipped when they are popped.
+    """
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.pid = None
+        self.init_lock = threading.Lock()
+
+    def _check_pid(self):
+        """Create threads and state, again after a fork."""
+        if self.pid == os.getpid():
+            return
+        with self.init_lock:
+            if self.pid == os.getpid():
+                return
+            self.lock = threading.Lock()
+            # Wakes the scheduling thread when the earliest deadline changes.
+            self.changed = threading.Condition(self.lock)
+            # Wakes join() when a target returns.
+            self.finished = threading.Condition(self.lock)
+            self.heap = []
+            # (executor, due time) waiting for a worker.
+            self.ready = deque()
+            self.counter = itertools.count()
+            self.workers = 0
+            # Idle _Workers, the most recently idle last.
+            self.idle = []
+            # Every running _Worker, and whether shutdown() was called.
+            self.running = set()
+            self.stopping = False
+            self.thread = threading.Thread(target=self._schedule,
+                                           name="pymongo_scheduler_thread")
+            self.thread.daemon = True
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def open(self, executor):
+        self._check_pid()
+        with self.lock:
+            executor._stopped = False
+            if executor._pid != self.pid:
+                # New, or opened before a fork: nothing is scheduled here.
+                executor._pid = self.pid
+                executor._scheduled = False
+                executor._running = False
+                executor._last_run = None
+                _register_executor(executor)
+            if not (executor._scheduled or executor._running):
+                self._push(executor, _time())
+
+    def wake(self, executor):
+        if executor._stopped or executor._pid != os.getpid():
+            return
+        with self.lock:
+            if executor._running or not executor._scheduled:
+                # The worker reschedules it soon after the target returns.
+                return
+            deadline = _time()
+            if executor._last_run is not None:
+                deadline = max(
+                    deadline, executor._last_run + executor._min_interval)
+            if deadline < executor._deadline:
+                self._push(executor, deadline)
+
+    def join(self, executor, timeout):
+        if executor._pid != os.getpid():
+            return
+        end = None if timeout is None else _time() + timeout
+        with self.lock:
+            while executor._running or (executor._scheduled and
+                                        not executor._stopped):
+                if end is None:
+                    self.finished.wait()
+                else:
+                    remaining = end - _time()
+                    if remaining <= 0:
+                        break
+                    self.finished.wait(remaining)
+
+    def shutdown(self, timeout):
+        """Stop the scheduling thread and the workers, and wait up to
+        `timeout` seconds for them. Called at interpreter exit, so that
+        they don't run while Python 2 clears module globals.
+        """
+        if self.pid != os.getpid():
+            return
+        with self.lock:
+            self.stopping = True
+            self.changed.notify()
+            while self.idle:
+                self.idle.pop().stop()
+            threads = [self.thread]
+            threads.extend(worker.thread for worker in self.running)
+        deadline = _time() + timeout
+        for thread in threads:
+            thread.join(max(0, deadline - _time()))
+
+    def _push(self, executor, deadline):
+        """Schedule executor at deadline. Hold the lock."""
+        executor._generation += 1
+        executor._scheduled = True
+        executor._deadline = deadline
+        heapq.heappush(self.heap, (deadline, next(self.counter),
+                                   executor._generation, executor))
+        if self.heap[0][3] is executor:
+            self.changed.notify()
+
+    def _schedule(self):
+        with self.lock:
+            while not self.stopping:
+                now = _time()
+                while self.heap and self.heap[0][0] <= now:
+                    _, _, generation, executor = heapq.heappop(self.heap)
+                    if generation != executor._generation:
+                        continue
+                    executor._scheduled = False
+                    if executor._stopped:
+                        continue
+                    executor._running = True
+                    if self.idle:
+                        # The most recently idle worker, so that workers
+                        # not needed stay idle until they are stopped.
+                        self.idle.pop().hand(executor)
+                    else:
+                        self.ready.append((executor, now))
+
+                timeout = None
+                if self.heap:
+                    timeout = self.heap[0][0] - now
+                while self.ready and self.workers < self.max_workers:
+                    waited = now - self.ready[0][1]
+                    if self.workers and waited < _WORKER_START_DELAY:
+                        check = _WORKER_START_DELAY - waited
+                        if timeout is None or check < timeout:
+                            timeout = check
+                        break
+                    self._start_worker(self.ready.popleft()[0])
+
+                while (self.idle and self.workers > 1 and
+                       self.idle[0].since + _WORKER_IDLE_TIMEOUT <= now):
+                    self.idle.pop(0).stop()
+                    self.workers -= 1
+                if self.idle and self.workers > 1:
+                    check = self.idle[0].since + _WORKER_IDLE_TIMEOUT - now
+                    if timeout is None or check < timeout:
+                        timeout = check
+
+                if timeout is None:
+                    self.changed.wait()
+                else:
+                    self.changed.wait(timeout)
+
+    def _start_worker(self, executor):
+        """Start a worker running executor. Hold the lock."""
+        self.workers += 1
+        worker = _Worker(self.lock, executor)
+        worker.thread = threading.Thread(target=self._work, args=(worker,),
+                                         name="pymongo_worker_thread")
+        worker.thread.daemon = True
+        self.running.add(worker)
+        worker.thread.start()
+
+    def _work(self, worker):
+        _local.worker = True
+        while True:
+            executor = worker.executor
+            worker.executor = None
+
+            # Reset first, so a wake() during the call runs it again soon.
+            executor._event = False
+            if not executor._stopped and not executor._run_target():
+                executor._stopped = True
+
+            with self.lock:
+                executor._running = False
+                now = executor._last_run = _time()
+                if not executor._stopped:
+                    if executor._event:
+                        self._push(executor, now + executor._min_interval)
+                    else:
+                        self._push(executor, now + executor._interval)
+                self.finished.notify_all()
+
+                if self.ready and not self.stopping:
+                    worker.executor = self.ready.popleft()[0]
+                    continue
+                if not self.stopping:
+                    worker.since = now
+                    self.idle.append(worker)
+                    while worker.executor is None and not worker.stopped:
+                        worker.wakeup.wait()
+                if worker.executor is None:
+                    # Stopped.
+                    self.running.discard(worker)
+                    return
+
+
+class _Worker(object):
+    """A scheduler worker thread's state, guarded by the scheduler's lock."""
+    def __init__(self, lock, executor):
+        self.wakeup = threading.Condition(lock)
+        # The executor to run next, or None while idle.
+        self.executor = executor
+        self.stopped = False
+        # When the worker last became idle.
+        self.since = None
+        self.thread = None
+
+    def hand(self, executor):
+        self.executor = executor
+        self.wakeup.notify()
+
+    def stop(self):
+        self.stopped = True
+        self.wakeup.notify()
+
+
+_SCHEDULER = _Scheduler(MAX_WORKERS)
+
+
+# _EXECUTORS has a weakref to each opened PeriodicExecutor. Once scheduled,
+# an executor is kept alive by a strong reference from the scheduler and
+# perhaps from other objects. When it is closed, dropped by the scheduler,
+# and all other referrers are freed, the executor is freed and removed from
+# _EXECUTORS. If any are running when the interpreter begins to shut down,
+# we try to halt and join them to avoid spurious errors.
 _EXECUTORS = set()
 
 
@@ -144,14 +364,14 @@ def _register_executor(executor):
 
 
 def _on_executor_deleted(ref):
-    _EXECUTORS.remove(ref)
+    _EXECUTORS.discard(ref)
 
 
 def _shutdown_executors():
     if _EXECUTORS is None:
         return
 
-    # Copy the set. Stopping threads has the side effect of removing executors.
+    # Copy the set. Stopping executors has the side effect of removing them.
     executors = list(_EXECUTORS)
 
     # First signal all executors to close...
@@ -167,5 +387,6 @@ def _shutdown_executors():
             executor.join(1)
 
     executor = None
+    _SCHEDULER.shutdown(1)
 
 atexit.register(_shutdown_executors)
@@ -12,12 +12,17 @@
 # implied.  See the License for the specific language governing
 # permissions and limitations under the License.
 
+import atexit
+import collections
 import contextlib
+import errno
 import os
 import platform
+import select
 import socket
 import sys
 import threading
+import weakref
 
 try:
     import ssl
@@ -32,15 +37,17 @@ except ImportError:
 from bson import DEFAULT_CODEC_OPTIONS
 from bson.py3compat import imap, itervalues, _unicode
 from bson.son import SON
-from pymongo import auth, helpers, thread_util, __version__
+from pymongo import auth, helpers, __version__
 from pymongo.common import MAX_MESSAGE_SIZE
 from pymongo.errors import (AutoReconnect,
                             ConnectionFailure,
                             ConfigurationError,
                             DocumentTooLarge,
+                            ExceededMaxWaiters,
                             NetworkTimeout,
                             NotMasterError,
                             OperationFailure)
+from pymongo.histogram import Histogram
 from pymongo.ismaster import IsMaster
 from pymongo.monotonic import time as _time
 from pymongo.network import (command,
@@ -98,11 +105,19 @@ except ImportError:
                 return False
 
 try:
-    from fcntl import fcntl, F_GETFD, F_SETFD, FD_CLOEXEC
+    from fcntl import (fcntl, F_GETFD, F_SETFD, F_GETFL, F_SETFL,
+                       FD_CLOEXEC)
     def _set_non_inheritable_non_atomic(fd):
         """Set the close-on-exec flag on the given file descriptor."""
         flags = fcntl(fd, F_GETFD)
         fcntl(fd, F_SETFD, flags | FD_CLOEXEC)
+
+    def _set_non_blocking(fd):
+        """Make reads from the given file descriptor return at once."""
+        fcntl(fd, F_SETFL, fcntl(fd, F_GETFL) | os.O_NONBLOCK)
+
+    # Sockets can be handed to child processes, see _Handoff.
+    _HAVE_FORK_HANDOFF = hasattr(os, 'fork')
 except ImportError:
     # Windows, various platforms we don't claim to support
     # (Jython, IronPython, ...), systems that don't provide
@@ -111,6 +126,8 @@ except ImportError:
         """Dummy function for platforms that don't provide fcntl."""
         pass
 
+    _HAVE_FORK_HANDOFF = False
+
 
 _METADATA = SON([
     ('driver', SON([('name', 'PyMongo'), ('version', __version__)])),
@@ -188,6 +205,49 @@ else:
 # main thread, to avoid the deadlock. See PYTHON-607.
 u'foo'.encode('idna')
 
+# The most connections a pool opens in parallel while warming up.
+_MAX_WARM_UP_THREADS = 8
+
+# Threads that open sockets in the background, mapped to their pools, and
+# an event set once the interpreter starts to exit.
+_BACKGROUND_THREADS = weakref.WeakKeyDictionary()
+_EXITING = threading.Event()
+
+
+def _start_background_thread(pool, target, name, args=()):
+    """Start a daemon thread that opens sockets for `pool`."""
+    thread = threading.Thread(target=target, args=args, name=name)
+    thread.daemon = True
+    _BACKGROUND_THREADS[thread] = pool
+    thread.start()
+
+
+def _stop_background_threads():
+    """Shut down sockets being opened in the background, and wait up to a
+    second for the threads to return.
+
+    Otherwise, a thread whose server replies while Python 2 clears module
+    globals at exit fails with a spurious traceback.
+    """
+    _EXITING.set()
+    threads = list(_BACKGROUND_THREADS.items())
+    for _, pool in threads:
+        pool._abort_opening()
+    deadline = _time() + 1
+    for thread, _ in threads:
+        thread.join(max(0, deadline - _time()))
+
+atexit.register(_stop_background_threads)
+
+
+def _shutdown_socket(sock):
+    """Make calls blocked on `sock` in other threads return."""
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except Exception:
+        # Already closed or shut down.
+        pass
+
 
 def _raise_connection_failure(address, error):
     """Convert a socket.error to ConnectionFailure and raise it."""
@@ -217,14 +277,15 @@ class PoolOptions(object):
                  '__connect_timeout', '__socket_timeout',
                  '__wait_queue_timeout', '__wait_queue_multiple',
                  '__ssl_context', '__ssl_match_hostname', '__socket_keepalive',
-                 '__event_listeners', '__appname', '__metadata')
+                 '__event_listeners', '__appname', '__metadata',
+                 '__fork_handoff_size')
 
     def __init__(self, max_pool_size=100, min_pool_size=0,
                  max_idle_time_ms=None, connect_timeout=None,
                  socket_timeout=None, wait_queue_timeout=None,
                  wait_queue_multiple=None, ssl_context=None,
                  ssl_match_hostname=True, socket_keepalive=False,
-                 event_listeners=None, appname=None):
+                 event_listeners=None, appname=None, fork_handoff_size=0):
 
         self.__max_pool_size = max_pool_size
         self.__min_pool_size = min_pool_size
@@ -241,6 +302,7 @@ class PoolOptions(object):
         self.__metadata = _METADATA.copy()
         if appname:
             self.__metadata['application'] = {'name': appname}
+        self.__fork_handoff_size = fork_handoff_size
 
     @property
     def max_pool_size(self):
@@ -335,6 +397,13 @@ class PoolOptions(object):
         """
         return self.__metadata.copy()
 
+    @property
+    def fork_handoff_size(self):
+        """The number of connected sockets set aside for the next child
+        process forked from the process that created the pool, or 0.
+        """
+        return self.__fork_handoff_size
+
 
 class SocketInfo(object):
     """Store a socket with some metadata.
@@ -359,6 +428,10 @@ class SocketInfo(object):
         self.max_write_batch_size = (
             ismaster.max_write_batch_size if ismaster else None)
 
+        # Bytes moved since this socket was last returned to the pool.
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
         self.listeners = pool.opts.event_listeners
 
         if ismaster:
@@ -416,7 +489,7 @@ class SocketInfo(object):
                            check_keys, self.listeners, self.max_bson_size,
                            read_concern,
                            parse_write_concern_error=parse_write_concern_error,
-                           collation=collation)
+                           collation=collation, counters=self)
         except OperationFailure:
             raise
         # Catch socket.error, KeyboardInterrupt, etc. and close ourselves.
@@ -439,6 +512,7 @@ class SocketInfo(object):
             self.sock.sendall(message)
         except BaseException as error:
             self._raise_connection_failure(error)
+        self.bytes_sent += len(message)
 
     def receive_message(self, operation, request_id):
         """Receive a raw BSON message or raise ConnectionFailure.
@@ -446,10 +520,13 @@ class SocketInfo(object):
         If any exception is raised, the socket is closed.
         """
         try:
-            return receive_message(
+            data = receive_message(
                 self.sock, operation, request_id, self.max_message_size)
         except BaseException as error:
             self._raise_connection_failure(error)
+        # Plus the 16 byte header.
+        self.bytes_received += len(data) + 16
+        return data
 
     def legacy_write(self, request_id, msg, max_doc_size, with_last_error):
         """Send OP_INSERT, etc., optionally returning response as a dict.
@@ -668,6 +745,98 @@ def _configured_socket(address, options):
     return sock
 
 
+class PoolStats(object):
+    """Checkout statistics for one :class:`Pool`.
+
+    Updated while holding the pool's lock; read them with :attr:`Pool.stats`.
+    Only checkouts that found the pool exhausted are recorded in `wait_time`.
+    """
+    def __init__(self):
+        self.wait_time = Histogram()
+        self.checkout_duration = Histogram()
+        self.checkouts = 0
+        self.sockets_created = 0
+        self.sockets_closed = 0
+        self.wait_queue_depth = 0
+        self.max_wait_queue_depth = 0
+        self.wait_queue_timeouts = 0
+        self.warm_up_time = Histogram()
+        self.sockets_warmed = 0
+        self.sockets_inherited = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def add_bytes(self, sock_info):
+        """Move the byte counts of a socket being returned or discarded."""
+        self.bytes_sent += sock_info.bytes_sent
+        self.bytes_received += sock_info.bytes_received
+        sock_info.bytes_sent = sock_info.bytes_received = 0
+
+    def snapshot(self, idle_sockets, active_sockets):
+        return {
+            'checkouts': self.checkouts,
+            'sockets_created': self.sockets_created,
+            'sockets_closed': self.sockets_closed,
+            'idle_sockets': idle_sockets,
+            'active_sockets': active_sockets,
+            'wait_queue_depth': self.wait_queue_depth,
+            'max_wait_queue_depth': self.max_wait_queue_depth,
+            'wait_queue_timeouts': self.wait_queue_timeouts,
+            'wait_time': self.wait_time.as_dict(),
+            'checkout_duration': self.checkout_duration.as_dict(),
+            'sockets_warmed': self.sockets_warmed,
+            'warm_up_time': self.warm_up_time.as_dict(),
+            'sockets_inherited': self.sockets_inherited,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+        }
+
+
+class _Handoff(object):
+    """Connected sockets set aside for the next child process.
+
+    A pipe holds one byte. The first child to use the pool after a fork
+    reads it and takes the sockets over. Other children find the pipe
+    empty and connect as usual. The parent never uses these sockets; once
+    it sees the byte is gone, it closes its copies and sets aside new ones.
+    """
+    def __init__(self, sockets):
+        self.sockets = sockets
+        self.read_fd, self.write_fd = os.pipe()
+        _set_non_inheritable_non_atomic(self.read_fd)
+        _set_non_inheritable_non_atomic(self.write_fd)
+        _set_non_blocking(self.read_fd)
+        os.write(self.write_fd, b'x')
+
+    def claim(self):
+        """Take the byte. False if another process took it first."""
+        try:
+            return os.read(self.read_fd, 1) == b'x'
+        except OSError as exc:
+            if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return False
+            raise
+
+    def claimed(self):
+        """Whether a child has taken the sockets. Call in the parent."""
+        if not self.claim():
+            return True
+        # Put the byte back. A child that forked just now and looks for
+        # it meanwhile will connect as usual.
+        os.write(self.write_fd, b'x')
+        return False
+
+    def close(self):
+        """Close this process's copies of the sockets and the pipe.
+
+        Sockets that a child took over stay open in the child.
+        """
+        for sock_info in self.sockets:
+            sock_info.close()
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
 # Do *not* explicitly inherit from object or Jython won't call __del__
 # http://bugs.jython.org/issue1057
 class Pool:
@@ -682,8 +851,12 @@ class Pool:
         # Can override for testing: 0 to always check, None to never check.
         self._check_interval_seconds = 1
 
-        self.sockets = set()
+        # Idle sockets, most recently returned on the right. Checkouts pop
+        # from the right so warm sockets are reused first.
+        self.sockets = collections.deque()
         self.lock = threading.Lock()
+        # Threads waiting for a socket when max_pool_size are checked out.
+        self._socket_returned = threading.Condition(self.lock)
         self.active_sockets = 0
 
         # Keep track of resets, so we notice sockets created before the most
@@ -696,47 +869,244 @@ class Pool:
 
         if (self.opts.wait_queue_multiple is None or
                 self.opts.max_pool_size is None):
-            max_waiters = None
+            self._max_waiters = None
         else:
-            max_waiters = (
+            self._max_waiters = (
                 self.opts.max_pool_size * self.opts.wait_queue_multiple)
 
-        self._socket_semaphore = thread_util.create_semaphore(
-            self.opts.max_pool_size, max_waiters)
+        # Background warm-up state, see warm_up().
+        self._warm_up_credentials = {}
+        self._warm_up_threads = 0
+        self._warm_up_pending = 0
+        self._warm_up_start = None
+
+        # Sockets set aside for a child process, see _Handoff. Only the
+        # process that created the pool sets them aside in the background.
+        self._handoff = None
+        self._handoff_opening = False
+        self._owner_pid = self.pid
+
+        # Sockets that background threads are handshaking or authenticating
+        # on, see _abort_opening.
+        self._opening = set()
+
+        self._stats = PoolStats()
         self.socket_checker = SocketChecker()
 
+    @property
+    def stats(self):
+        """A snapshot of this pool's checkout statistics, as a dict."""
+        with self.lock:
+            return self._stats.snapshot(len(self.sockets), self.active_sockets)
+
     def reset(self):
         with self.lock:
             self.pool_id += 1
-            self.pid = os.getpid()
-            sockets, self.sockets = self.sockets, set()
-            self.active_sockets = 0
+            handoff, self._handoff = self._handoff, None
+            inherited = []
+            if self.pid != os.getpid():
+                # Threads that checked out sockets before the fork don't
+                # exist in this process and will never return them.
+                self.pid = os.getpid()
+                self.active_sockets = 0
+                self._warm_up_threads = 0
+                self._warm_up_pending = 0
+                self._handoff_opening = False
+                if handoff is not None and handoff.claim():
+                    inherited, handoff.sockets = handoff.sockets, []
+            sockets, self.sockets = self.sockets, collections.deque()
+            self._stats.sockets_closed += len(sockets)
+            for sock_info in inherited:
+                sock_info.pool_id = self.pool_id
+                self.sockets.append(sock_info)
+            self._stats.sockets_inherited += len(inherited)
+            self._socket_returned.notify_all()
 
         for sock_info in sockets:
             sock_info.close()
+        if handoff is not None:
+            handoff.close()
+
+    def remove_stale_sockets(self, all_credentials=None):
+        """Close idle sockets, then replace any below min_pool_size.
 
-    def remove_stale_sockets(self):
+        New sockets are opened in the background, see :meth:`warm_up`.
+        """
         with self.lock:
             if self.opts.max_idle_time_ms is not None:
-                for sock_info in self.sockets.copy():
+                for sock_info in list(self.sockets):
                     age = _time() - sock_info.last_checkout
                     if age > self.opts.max_idle_time_ms:
                         self.sockets.remove(sock_info)
                         sock_info.close()
+                        self._stats.sockets_closed += 1
+
+        self.warm_up(all_credentials)
+        self._maintain_handoff(all_credentials)
+
+    def warm_up(self, all_credentials=None):
+        """Open sockets on background threads until min_pool_size exist.
 
-        while len(
-                self.sockets) + self.active_sockets < self.opts.min_pool_size:
-            sock_info = self.connect()
+        Opens up to ``_MAX_WARM_UP_THREADS`` connections in parallel, and
+        authenticates each with `all_credentials` before adding it to the
+        pool, so the next checkouts skip the connect, handshake and auth.
+        Returns immediately; no effect while a warm-up is already running.
+        The time each warm-up takes is recorded in :attr:`stats`.
+
+        :Parameters:
+          - `all_credentials` (optional): dict, maps auth source to
+            MongoCredential. If omitted, use the credentials from the previous
+            warm-up.
+        """
+        if all_credentials is not None:
+            self._warm_up_credentials = all_credentials.copy()
+
+        with self.lock:
+            if self._warm_up_threads:
+                return
+            n_threads = min(self._warm_up_deficit(), _MAX_WARM_UP_THREADS)
+            if n_threads <= 0:
+                return
+            self._warm_up_threads = n_threads
+            self._warm_up_start = _time()
+
+        for _ in range(n_threads):
+            _start_background_thread(self, self._warm_up_worker,
+                                     "pymongo_pool_warm_up_thread")
+
+    def prepare_handoff(self, all_credentials):
+        """Set sockets aside for the next child process, unless they're
+        already set aside and no child has taken them.
+
+        Opens and authenticates ``fork_handoff_size`` sockets, blocking
+        until they're ready. No effect if ``fork_handoff_size`` is 0.
+
+        :Parameters:
+          - `all_credentials`: dict, maps auth source to MongoCredential.
+        """
+        if not self.opts.fork_handoff_size or not _HAVE_FORK_HANDOFF:
+            return
+        if self.pid != os.getpid():
+            self.reset()
+        with self.lock:
+            handoff = self._handoff
+            if handoff is not None and not handoff.claimed():
+                return
+            self._handoff = None
+        if handoff is not None:
+            handoff.close()
+        self._open_handoff(all_credentials)
+
+    def _maintain_handoff(self, all_credentials):
+        """Once a child takes the sockets set aside, set aside new ones on
+        a background thread.
+        """
+        if not self.opts.fork_handoff_size or not _HAVE_FORK_HANDOFF:
+            return
+        with self.lock:
+            handoff = self._handoff
+            if (self._handoff_opening or self.pid != self._owner_pid or
+                    (handoff is not None and not handoff.claimed())):
+                return
+            self._handoff = None
+            self._handoff_opening = True
+        if handoff is not None:
+            handoff.close()
+        _start_background_thread(self, self._handoff_worker,
+                                 "pymongo_pool_handoff_thread",
+                                 (all_credentials,))
+
+    def _handoff_worker(self, all_credentials):
+        try:
+            self._open_handoff(all_credentials)
+        except Exception:
+            # The server is unreachable or rejected us. The next
+            # maintenance pass tries again.
+            pass
+        finally:
+            with self.lock:
+                self._handoff_opening = False
+
+    def _open_handoff(self, all_credentials):
+        """Open and authenticate the sockets for a _Handoff."""
+        pool_id = self.pool_id
+        sockets = []
+        try:
+            for _ in range(self.opts.fork_handoff_size):
+                sock_info = self.connect(abortable=True)
+                sockets.append(sock_info)
+                with self._opening_socket(sock_info.sock):
+                    sock_info.check_auth(all_credentials)
+            handoff = _Handoff(sockets)
+        except Exception:
+            for sock_info in sockets:
+                self._discard(sock_info)
+            raise
+
+        with self.lock:
+            # Not if another thread set sockets aside first, or the pool
+            # was reset meanwhile.
+            if self._handoff is None and self.pool_id == pool_id:
+                self._handoff, handoff = handoff, None
+        if handoff is not None:
+            handoff.close()
+
+    def _warm_up_deficit(self):
+        """How many sockets short of min_pool_size. Hold the lock."""
+        return self.opts.min_pool_size - (
+            len(self.sockets) + self.active_sockets + self._warm_up_pending)
+
+    def _warm_up_worker(self):
+        credentials = self._warm_up_credentials
+        try:
+            while True:
+                with self.lock:
+                    if _EXITING.is_set() or self._warm_up_deficit() <= 0:
+                        return
+                    self._warm_up_pending += 1
+
+                sock_info = None
+                try:
+                    sock_info = self.connect(abortable=True)
+                    with self._opening_socket(sock_info.sock):
+                        sock_info.check_auth(credentials)
+                except Exception:
+                    # The server is unreachable or rejected us. Leave it to
+                    # the monitor; the next maintenance pass tries again.
+                    if sock_info is not None:
+                        self._discard(sock_info)
+                    with self.lock:
+                        self._warm_up_pending -= 1
+                    return
+
+                with self.lock:
+                    self._warm_up_pending -= 1
+                    # Don't add a socket created before a reset.
+                    if sock_info.pool_id == self.pool_id:
+                        self.sockets.appendleft(sock_info)
+                        self._stats.sockets_warmed += 1
+                        self._socket_returned.notify()
+                        sock_info = None
+                if sock_info is not None:
+                    self._discard(sock_info)
+        finally:
             with self.lock:
-                self.sockets.add(sock_info)
+                self._warm_up_threads -= 1
+                if self._warm_up_threads == 0:
+                    self._stats.warm_up_time.record(
+                        _time() - self._warm_up_start)
 
-    def connect(self):
+    def connect(self, abortable=False):
         """Connect to Mongo and return a new SocketInfo.
 
         Can raise ConnectionFailure or CertificateError.
 
         Note that the pool does not keep a reference to the socket -- you
         must call return_socket() when you're done with it.
+
+        :Parameters:
+          - `abortable` (optional): If True, shut the socket down if the
+            interpreter exits during the handshake. For background threads.
         """
         sock = None
         try:
@@ -746,22 +1116,28 @@ class Pool:
                     ('ismaster', 1),
                     ('client', self.opts.metadata)
                 ])
-                ismaster = IsMaster(
-                    command(sock,
-                            'admin',
-                            cmd,
-                            False,
-                            False,
-                            ReadPreference.PRIMARY,
-                            DEFAULT_CODEC_OPTIONS))
+                with self._opening_socket(sock if abortable else None):
+                    ismaster = IsMaster(
+                        command(sock,
+                                'admin',
+                                cmd,
+                                False,
+                                False,
+                                ReadPreference.PRIMARY,
+                                DEFAULT_CODEC_OPTIONS))
             else:
                 ismaster = None
-            return SocketInfo(sock, self, ismaster, self.address)
+            sock_info = SocketInfo(sock, self, ismaster, self.address)
         except socket.error as error:
             if sock is not None:
                 sock.close()
             _raise_connection_failure(self.address, error)
 
+        # Not the common path: a new connection costs far more than the lock.
+        with self.lock:
+            self._stats.sockets_created += 1
+        return sock_info
+
     @contextlib.contextmanager
     def get_socket(self, all_credentials, checkout=False):
         """Get a socket from the pool. Use with a "with" statement.
@@ -786,49 +1162,71 @@ class Pool:
           - `checkout` (optional): keep socket checked out.
         """
         # First get a socket, then attempt authentication. Simplifies
-        # semaphore management in the face of network errors during auth.
+        # pool accounting in the face of network errors during auth.
         sock_info = self._get_socket_no_auth()
         try:
             sock_info.check_auth(all_credentials)
             yield sock_info
         except:
-            # Exception in caller. Decrement semaphore.
+            # Exception in caller. Release the checkout.
             self.return_socket(sock_info)
             raise
         else:
             if not checkout:
                 self.return_socket(sock_info)
 
-    def _get_socket_no_auth(self):
-        """Get or create a SocketInfo. Can raise ConnectionFailure."""
+    @contextlib.contextmanager
+    def get_socket_nowait(self, all_credentials):
+        """Like :meth:`get_socket`, but yield None instead of waiting when
+        ``max_pool_size`` sockets are checked out.
+        """
+        sock_info = self._get_socket_no_auth(wait=False)
+        if sock_info is None:
+            yield None
+            return
+        try:
+            sock_info.check_auth(all_credentials)
+            yield sock_info
+        finally:
+            self.return_socket(sock_info)
+
+    def _get_socket_no_auth(self, wait=True):
+        """Get or create a SocketInfo. Can raise ConnectionFailure.
+
+        Without `wait`, returns None if ``max_pool_size`` sockets are
+        checked out.
+        """
         # We use the pid here to avoid issues with fork / multiprocessing.
         # See test.test_client:TestClient.test_fork for an example of
         # what could go wrong otherwise
         if self.pid != os.getpid():
             self.reset()
 
-        # Get a free socket or create one.
-        if not self._socket_semaphore.acquire(
-                True, self.opts.wait_queue_timeout):
-            self._raise_wait_queue_timeout()
+        # Reserve a slot and take the warmest idle socket, if any, in a
+        # single critical section.
         with self.lock:
+            max_pool_size = self.opts.max_pool_size
+            if (max_pool_size is not None and
+                    self.active_sockets >= max_pool_size):
+                if not wait:
+                    return None
+                self._wait_for_socket()
             self.active_sockets += 1
+            self._stats.checkouts += 1
+            sock_info = self.sockets.pop() if self.sockets else None
 
-        # We've now acquired the semaphore and must release it on error.
+        # We've now reserved a slot and must release it on error.
         try:
-            try:
-                # set.pop() isn't atomic in Jython less than 2.7, see
-                # http://bugs.jython.org/issue1854
-                with self.lock:
-                    sock_info, from_pool = self.sockets.pop(), True
-            except KeyError:
+            if sock_info is None:
                 # Can raise ConnectionFailure or CertificateError.
                 sock_info, from_pool = self.connect(), False
+            else:
+                from_pool = True
             # If socket is idle, open a new one.
             if self.opts.max_idle_time_ms is not None:
                 age = _time() - sock_info.last_checkout
                 if age > self.opts.max_idle_time_ms:
-                    sock_info.close()
+                    self._discard(sock_info)
                     sock_info, from_pool = self.connect(), False
 
             if from_pool:
@@ -836,28 +1234,96 @@ class Pool:
                 sock_info = self._check(sock_info)
 
         except:
-            self._socket_semaphore.release()
             with self.lock:
                 self.active_sockets -= 1
+                self._socket_returned.notify()
             raise
 
         sock_info.last_checkout = _time()
         return sock_info
 
+    def _wait_for_socket(self):
+        """Block until fewer than max_pool_size sockets are checked out.
+
+        Hold the lock when calling this. Can raise ExceededMaxWaiters or
+        ConnectionFailure.
+        """
+        start = _time()
+        stats = self._stats
+        if (self._max_waiters is not None and
+                stats.wait_queue_depth >= self._max_waiters):
+            raise ExceededMaxWaiters()
+
+        timeout = self.opts.wait_queue_timeout
+        stats.wait_queue_depth += 1
+        stats.max_wait_queue_depth = max(stats.max_wait_queue_depth,
+                                         stats.wait_queue_depth)
+        try:
+            while self.active_sockets >= self.opts.max_pool_size:
+                if timeout is None:
+                    self._socket_returned.wait()
+                else:
+                    remaining = start + timeout - _time()
+                    if remaining <= 0:
+                        stats.wait_queue_timeouts += 1
+                        self._raise_wait_queue_timeout()
+                    self._socket_returned.wait(remaining)
+        finally:
+            stats.wait_queue_depth -= 1
+            stats.wait_time.record(_time() - start)
+
     def return_socket(self, sock_info):
         """Return the socket to the pool, or if it's closed discard it."""
         if self.pid != os.getpid():
             self.reset()
-        else:
-            if sock_info.pool_id != self.pool_id:
-                sock_info.close()
-            elif not sock_info.closed:
-                with self.lock:
-                    self.sockets.add(sock_info)
+        if sock_info.pool_id != self.pool_id:
+            sock_info.close()
+
+        now = _time()
+        with self.lock:
+            if sock_info.closed:
+                self._stats.sockets_closed += 1
+            else:
+                self.sockets.append(sock_info)
+            self._stats.checkout_duration.record(now - sock_info.last_checkout)
+            self._stats.add_bytes(sock_info)
+            if self.active_sockets > 0:
+                self.active_sockets -= 1
+            self._socket_returned.notify()
+
+    @contextlib.contextmanager
+    def _opening_socket(self, sock):
+        """Let _abort_opening shut `sock` down meanwhile. No effect if
+        `sock` is None.
+        """
+        if sock is None:
+            yield
+            return
+        with self.lock:
+            self._opening.add(sock)
+        try:
+            if _EXITING.is_set():
+                _shutdown_socket(sock)
+            yield
+        finally:
+            with self.lock:
+                self._opening.discard(sock)
+
+    def _abort_opening(self):
+        """Shut down the sockets background threads are opening, so the
+        threads return at once. Called at interpreter exit.
+        """
+        with self.lock:
+            socks = list(self._opening)
+        for sock in socks:
+            _shutdown_socket(sock)
 
-        self._socket_semaphore.release()
+    def _discard(self, sock_info):
+        """Close a socket that was checked out and will not be returned."""
+        sock_info.close()
         with self.lock:
-            self.active_sockets -= 1
+            self._stats.sockets_closed += 1
+            self._stats.add_bytes(sock_info)
 
     def _check(self, sock_info):
         """This side-effecty function checks if this pool has been reset since
@@ -881,7 +1347,7 @@ class Pool:
                     0 == self._check_interval_seconds
                     or age > self._check_interval_seconds)):
             if self.socket_checker.socket_closed(sock_info.sock):
-                sock_info.close()
+                self._discard(sock_info)
                 error = True
 
         if not error:
@@ -899,3 +1365,5 @@ class Pool:
         # Avoid ResourceWarnings in Python 3
         for sock_info in self.sockets:
             sock_info.close()
+        if self._handoff is not None:
+            self._handoff.close()
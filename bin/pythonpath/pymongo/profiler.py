@@ -0,0 +1,347 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Find slow queries, and explain them.
+
+Enabled with the `slowQueryThresholdMS` option, or the
+``PYMONGO_SLOW_QUERY_MS`` environment variable, the profiler times the
+first batch of each find and each count, distinct and aggregate command.
+When one takes longer than the threshold, the profiler records the
+query's shape (its filter with values replaced by ``"?"``) and the
+application code that ran it. The first time a shape is slow, the query
+is explained on a background thread to record its plan, and how many
+documents the server examined to return how many.
+
+Slow queries are summarized by :meth:`MongoClient.slow_queries`, and
+written as JSON lines to the file named by `slowQueryLog` or
+``PYMONGO_SLOW_QUERY_LOG``, once per shape.
+"""
+
+import datetime
+import json
+import os
+import sys
+import threading
+import weakref
+
+from collections import Mapping, deque
+
+from bson.py3compat import iteritems
+from bson.son import SON
+from pymongo import periodic_executor
+
+# Environment variables used when the options aren't passed.
+THRESHOLD_ENV = "PYMONGO_SLOW_QUERY_MS"
+LOG_ENV = "PYMONGO_SLOW_QUERY_LOG"
+
+# The log file is renamed to "<name>.1" when it reaches this size.
+LOG_MAX_BYTES = 10 * 1024 * 1024
+
+# Explains waiting to run. More are dropped.
+_MAX_QUEUED_EXPLAINS = 100
+
+_EXPLAIN_INTERVAL = 1
+_EXPLAIN_MIN_INTERVAL = 0.01
+
+_PACKAGE_DIRS = tuple(
+    os.path.dirname(os.path.abspath(path)) + os.sep
+    for path in (__file__, sys.modules["bson"].__file__))
+
+
+def _shape(value):
+    """Replace the values in a query with "?", keeping its operators."""
+    if isinstance(value, Mapping):
+        return SON(sorted((key, _shape(item))
+                          for key, item in iteritems(value)))
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], Mapping):
+            # $and, $or and pipelines: keep each clause's shape.
+            return [_shape(item) for item in value]
+        return ["?"]
+    return "?"
+
+
+def _call_site():
+    """The innermost caller outside pymongo and bson, as "file:line func".
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not os.path.abspath(filename).startswith(_PACKAGE_DIRS):
+            return "%s:%d %s" % (
+                filename, frame.f_lineno, frame.f_code.co_name)
+        frame = frame.f_back
+    return None
+
+
+def _plan_summary(stage):
+    """Describe a winning plan, leaf stage first: "IXSCAN {name: 1}, FETCH".
+    """
+    stages = []
+    while stage:
+        description = stage.get("stage", "?")
+        if "keyPattern" in stage:
+            description += " " + json.dumps(stage["keyPattern"], default=str)
+        stages.append(description)
+        if "inputStage" in stage:
+            stage = stage["inputStage"]
+        else:
+            inputs = stage.get("inputStages") or ()
+            if len(inputs) > 1:
+                stages.append("%d inputs" % (len(inputs),))
+            stage = inputs[0] if inputs else None
+    return ", ".join(reversed(stages))
+
+
+def _find_key(document, key):
+    """Depth-first search for `key` in an explain result."""
+    if isinstance(document, Mapping):
+        if key in document:
+            return document[key]
+        items = document.values()
+    elif isinstance(document, list):
+        items = document
+    else:
+        return None
+    for item in items:
+        found = _find_key(item, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _summarize_explain(explain):
+    """Pick the plan and counters out of an explain result."""
+    summary = {}
+    planner = _find_key(explain, "queryPlanner")
+    if planner is not None:
+        summary["plan"] = _plan_summary(planner.get("winningPlan"))
+    elif "cursor" in explain:
+        # MongoDB 2.6 and older.
+        summary["plan"] = explain["cursor"]
+    stats = _find_key(explain, "executionStats")
+    if stats is not None:
+        summary["docs_examined"] = stats.get("totalDocsExamined")
+        summary["keys_examined"] = stats.get("totalKeysExamined")
+        summary["returned"] = stats.get("nReturned")
+    elif "nscannedObjects" in explain:
+        summary["docs_examined"] = explain.get("nscannedObjects")
+        summary["keys_examined"] = explain.get("nscanned")
+        summary["returned"] = explain.get("n")
+    return summary
+
+
+class _Shape(object):
+    """Everything recorded for one query shape."""
+
+    def __init__(self, namespace, operation, shape):
+        self.namespace = namespace
+        self.operation = operation
+        self.shape = shape
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.call_site = None
+        self.explain = None
+
+    def as_dict(self):
+        result = {
+            "namespace": self.namespace,
+            "operation": self.operation,
+            "shape": self.shape,
+            "count": self.count,
+            "total_ms": round(self.total_time * 1000, 3),
+            "max_ms": round(self.max_time * 1000, 3),
+            "call_site": self.call_site,
+        }
+        if self.explain is not None:
+            result.update(self.explain)
+        return result
+
+
+def _run_explains(profiler_ref):
+    profiler = profiler_ref()
+    if profiler is None:
+        return False  # Cancel PeriodicExecutor.
+    profiler._run_explains()
+    return True
+
+
+class SlowQueryProfiler(object):
+    """Record queries slower than `threshold` seconds.
+
+    Created by :class:`~pymongo.mongo_client.MongoClient` when
+    `slowQueryThresholdMS` is set.
+
+    :Parameters:
+      - `threshold`: Seconds a query may take before it's recorded.
+      - `path` (optional): A file to append a JSON line to for each new
+        slow query shape.
+    """
+    def __init__(self, threshold, path=None):
+        self.threshold = threshold
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__shapes = {}
+        self.__explains = deque()
+        self.__executor = None
+
+    def record(self, namespace, operation, query, duration):
+        """Record a query slower than the threshold.
+
+        Returns a key to pass to :meth:`explain` if this is the first time
+        the query's shape was slow, else None.
+        """
+        shape = _shape(query)
+        key = (namespace, operation,
+               json.dumps(shape, sort_keys=True, default=str))
+        call_site = _call_site()
+        with self.__lock:
+            entry = self.__shapes.get(key)
+            new = entry is None
+            if new:
+                entry = self.__shapes[key] = _Shape(
+                    namespace, operation, shape)
+            entry.count += 1
+            entry.total_time += duration
+            entry.max_time = max(entry.max_time, duration)
+            entry.call_site = call_site
+        if new:
+            return key
+        return None
+
+    def explain(self, key, explain):
+        """Run `explain`, a function returning an explain result, on a
+        background thread, and log the shape `key` with its plan.
+        """
+        with self.__lock:
+            if len(self.__explains) >= _MAX_QUEUED_EXPLAINS:
+                return
+            self.__explains.append((key, explain))
+            if self.__executor is None:
+                self_ref = weakref.ref(self)
+
+                def target():
+                    return _run_explains(self_ref)
+
+                self.__executor = periodic_executor.PeriodicExecutor(
+                    interval=_EXPLAIN_INTERVAL,
+                    min_interval=_EXPLAIN_MIN_INTERVAL,
+                    target=target,
+                    name="pymongo_slow_query_thread")
+                self.__executor.open()
+            executor = self.__executor
+        executor.wake()
+
+    def _run_explains(self):
+        while True:
+            with self.__lock:
+                if not self.__explains:
+                    return
+                key, explain = self.__explains.popleft()
+                entry = self.__shapes[key]
+            try:
+                summary = _summarize_explain(explain())
+            except Exception as exc:
+                summary = {"explain_error": str(exc)}
+            with self.__lock:
+                entry.explain = summary
+                record = entry.as_dict()
+            record["time"] = datetime.datetime.utcnow().isoformat()
+            self._log(record)
+
+    def _log(self, record):
+        """Append a record to the log file, rolling it over when full."""
+        if self.__path is None:
+            return
+        line = json.dumps(record, sort_keys=True, default=str) + "\n"
+        with self.__lock:
+            try:
+                if (os.path.exists(self.__path) and
+                        os.path.getsize(self.__path) + len(line) >
+                        LOG_MAX_BYTES):
+                    backup = self.__path + ".1"
+                    if os.path.exists(backup):
+                        os.remove(backup)
+                    os.rename(self.__path, backup)
+                with open(self.__path, "a") as log:
+                    log.write(line)
+            except (IOError, OSError):
+                # Profiling mustn't break the application.
+                pass
+
+    def slow_queries(self):
+        """A list of dicts describing each slow query shape, slowest in
+        total first.
+        """
+        with self.__lock:
+            entries = [entry.as_dict() for entry in self.__shapes.values()]
+        entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return entries
+
+    def reset(self):
+        """Forget the slow queries recorded so far."""
+        with self.__lock:
+            self.__shapes.clear()
+            self.__explains.clear()
+
+    def close(self):
+        """Stop the background thread. Pending explains are dropped."""
+        with self.__lock:
+            self.__explains.clear()
+            executor, self.__executor = self.__executor, None
+        if executor is not None:
+            executor.close()
+
+
+def _explain_command(database, command, read_preference):
+    """A function that explains a count, distinct or aggregate command."""
+    name = next(iter(command))
+    if name == "aggregate":
+        cmd = SON((key, value) for key, value in iteritems(command)
+                  if key not in ("cursor", "writeConcern"))
+        cmd["explain"] = True
+    else:
+        cmd = SON([("explain", command), ("verbosity", "executionStats")])
+
+    def explain():
+        return database.command(cmd, read_preference=read_preference)
+    return explain
+
+
+def _query_of(command):
+    """The part of a count, distinct or aggregate command to profile."""
+    name = next(iter(command))
+    if name == "aggregate":
+        return command.get("pipeline") or []
+    if name == "distinct":
+        return SON([("key", command.get("key")),
+                    ("query", command.get("query") or {})])
+    return command.get("query") or {}
+
+
+def _threshold_from_environment():
+    """The threshold in PYMONGO_SLOW_QUERY_MS, in seconds, or None."""
+    value = os.environ.get(THRESHOLD_ENV)
+    if not value:
+        return None
+    try:
+        return float(value) / 1000.0
+    except ValueError:
+        raise ValueError("%s must be a number of milliseconds, not %r"
+                         % (THRESHOLD_ENV, value))
+
+
+def _log_from_environment():
+    return os.environ.get(LOG_ENV) or None
@@ -181,6 +181,12 @@ class Server(object):
     def pool(self):
         return self._pool
 
+    @property
+    def in_flight(self):
+        """The number of operations with a socket checked out to this server.
+        """
+        return self._pool.active_sockets
+
     def _split_message(self, message):
         """Return request_id, data, max_doc_size.
 
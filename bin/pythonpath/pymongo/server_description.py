@@ -38,6 +38,8 @@ class ServerDescription(object):
       - `ismaster`: Optional IsMaster instance
       - `round_trip_time`: Optional float
       - `error`: Optional, the last error attempting to connect to the server
+      - `round_trip_times`: Optional
+        :class:`~pymongo.histogram.Histogram` of recent round trip times
     """
 
     __slots__ = (
@@ -45,14 +47,16 @@ class ServerDescription(object):
         '_primary', '_max_bson_size', '_max_message_size',
         '_max_write_batch_size', '_min_wire_version', '_max_wire_version',
         '_round_trip_time', '_me', '_is_writable', '_is_readable', '_error',
-        '_set_version', '_election_id', '_last_write_date', '_last_update_time')
+        '_set_version', '_election_id', '_last_write_date', '_last_update_time',
+        '_round_trip_times')
 
     def __init__(
             self,
             address,
             ismaster=None,
             round_trip_time=None,
-            error=None):
+            error=None,
+            round_trip_times=None):
         self._address = address
         if not ismaster:
             ismaster = IsMaster({})
@@ -72,6 +76,7 @@ class ServerDescription(object):
         self._is_writable = ismaster.is_writable
         self._is_readable = ismaster.is_readable
         self._round_trip_time = round_trip_time
+        self._round_trip_times = round_trip_times
         self._me = ismaster.me
         self._last_update_time = _time()
         self._error = error
@@ -173,6 +178,21 @@ class ServerDescription(object):
 
         return self._round_trip_time
 
+    @property
+    def round_trip_times(self):
+        """Histogram of recent round trip times, or None."""
+        return self._round_trip_times
+
+    def round_trip_time_percentile(self, percentile):
+        """Estimate a percentile of recent round trip times.
+
+        Falls back to :attr:`round_trip_time` when there is no histogram.
+        """
+        if (self._round_trip_times is None or
+                self._address in self._host_to_round_trip_time):
+            return self.round_trip_time
+        return self._round_trip_times.percentile(percentile)
+
     @property
     def error(self):
         """The last error attempting to connect to the server, or None."""
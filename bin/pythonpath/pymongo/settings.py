@@ -18,7 +18,9 @@ import threading
 
 from bson.objectid import ObjectId
 from pymongo import common, monitor, pool
-from pymongo.common import LOCAL_THRESHOLD_MS, SERVER_SELECTION_TIMEOUT
+from pymongo.common import (LOCAL_THRESHOLD_MS,
+                            LOCAL_THRESHOLD_PERCENTILE,
+                            SERVER_SELECTION_TIMEOUT)
 from pymongo.errors import ConfigurationError
 from pymongo.topology_description import TOPOLOGY_TYPE
 from pymongo.pool import PoolOptions
@@ -35,7 +37,8 @@ class TopologySettings(object):
                  condition_class=None,
                  local_threshold_ms=LOCAL_THRESHOLD_MS,
                  server_selection_timeout=SERVER_SELECTION_TIMEOUT,
-                 heartbeat_frequency=common.HEARTBEAT_FREQUENCY):
+                 heartbeat_frequency=common.HEARTBEAT_FREQUENCY,
+                 local_threshold_percentile=LOCAL_THRESHOLD_PERCENTILE):
         """Represent MongoClient's configuration.
 
         Take a list of (host, port) pairs and optional replica set name.
@@ -52,6 +55,7 @@ class TopologySettings(object):
         self._monitor_class = monitor_class or monitor.Monitor
         self._condition_class = condition_class or threading.Condition
         self._local_threshold_ms = local_threshold_ms
+        self._local_threshold_percentile = local_threshold_percentile
         self._server_selection_timeout = server_selection_timeout
         self._heartbeat_frequency = heartbeat_frequency
         self._direct = (len(self._seeds) == 1 and not replica_set_name)
@@ -86,6 +90,10 @@ class TopologySettings(object):
     def local_threshold_ms(self):
         return self._local_threshold_ms
 
+    @property
+    def local_threshold_percentile(self):
+        return self._local_threshold_percentile
+
     @property
     def server_selection_timeout(self):
         return self._server_selection_timeout
@@ -15,6 +15,9 @@
 """Utilities for multi-threading support."""
 
 import threading
+
+from collections import deque
+
 try:
     from time import monotonic as _time
 except ImportError:
@@ -129,3 +132,91 @@ def create_semaphore(max_size, max_waiters):
             return BoundedSemaphore(max_size)
         else:
             return MaxWaitersBoundedSemaphoreThread(max_size, max_waiters)
+
+
+class Prefetcher(object):
+    """Call a function repeatedly on a background thread, buffering results.
+
+    `fetch` takes no arguments and returns a pair (item, more). The thread
+    stops after `more` is false, after `fetch` raises, or after
+    :meth:`close`. It waits while `max_buffered` items are unread.
+
+    :Parameters:
+      - `fetch`: the function to call.
+      - `max_buffered`: the most unread items to hold, at least 1.
+      - `name` (optional): a name to give the underlying thread.
+    """
+    def __init__(self, fetch, max_buffered, name=None):
+        self._fetch = fetch
+        self._max_buffered = max(1, max_buffered)
+        self._buffer = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._error = None
+        self._done = False
+        self._closed = False
+
+        self._thread = thread = threading.Thread(target=self._run, name=name)
+        thread.daemon = True
+        thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    while (len(self._buffer) >= self._max_buffered
+                           and not self._closed):
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                try:
+                    item, more = self._fetch()
+                except Exception as exc:
+                    with self._cond:
+                        self._error = exc
+                    return
+                with self._cond:
+                    self._buffer.append(item)
+                    self._cond.notify_all()
+                if not more:
+                    return
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def get(self):
+        """Wait for and return the next item.
+
+        Returns None once the thread has stopped and every item was read.
+        Raises the exception from `fetch`, if any, after the items fetched
+        before it.
+        """
+        with self._cond:
+            while not self._buffer and not self._done:
+                self._cond.wait()
+            if self._buffer:
+                item = self._buffer.popleft()
+                self._cond.notify_all()
+                return item
+            if self._error is not None:
+                raise self._error
+            return None
+
+    @property
+    def exhausted(self):
+        """True if :meth:`get` will not return any more items."""
+        with self._cond:
+            return self._done and not self._buffer
+
+    def close(self, wait=True):
+        """Stop calling `fetch`. Items already fetched can still be read.
+
+        :Parameters:
+          - `wait` (optional): If True, also wait for a call to `fetch` that
+            is in progress to return.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait and threading.current_thread() is not self._thread:
+            self._thread.join()
@@ -42,6 +42,11 @@ from pymongo.server_selectors import (any_server_selector,
                                       Selection)
 
 
+# Limit on cached server selections, for applications that create a new
+# read preference for each operation.
+_SELECTION_CACHE_SIZE = 256
+
+
 def process_events_queue(queue_ref):
     q = queue_ref()
     if not q:
@@ -103,11 +108,17 @@ class Topology(object):
         # Store the seed list to help diagnose errors in _error_message().
         self._seed_addresses = list(topology_description.server_descriptions())
         self._opened = False
+        self._monitoring = False
         self._lock = threading.Lock()
         self._condition = self._settings.condition_class(self._lock)
         self._servers = {}
         self._pid = None
 
+        # Maps (id(selector), address) to (selector, version, servers).
+        # Read without the lock: a hit for the current description's version
+        # is still valid.
+        self._selection_cache = {}
+
         if self._publish_server or self._publish_tp:
             def target():
                 return process_events_queue(weak)
@@ -140,12 +151,16 @@ class Topology(object):
         if self._pid is None:
             self._pid = os.getpid()
         else:
-            if os.getpid() != self._pid:
+            if (os.getpid() != self._pid and
+                    not self._settings.pool_options.fork_handoff_size):
                 warnings.warn(
                     "MongoClient opened before fork. Create MongoClient "
                     "with connect=False, or create client after forking. "
                     "See PyMongo's documentation for details: http://api."
                     "mongodb.org/python/current/faq.html#pymongo-fork-safe>")
+            elif self._monitoring:
+                # Already open in this process and not closed since.
+                return
 
         with self._lock:
             self._ensure_opened()
@@ -169,6 +184,16 @@ class Topology(object):
         Raises exc:`ServerSelectionTimeoutError` after
         `server_selection_timeout` if no matching servers are found.
         """
+        # The description is replaced, never modified, when the topology
+        # changes. Selection results for its version are still valid.
+        key = (id(selector), address)
+        cached = self._selection_cache.get(key)
+        if cached is not None:
+            cached_selector, version, servers = cached
+            if (cached_selector is selector and
+                    version == self._description.version):
+                return list(servers)
+
         if server_selection_timeout is None:
             server_timeout = self._settings.server_selection_timeout
         else:
@@ -201,17 +226,34 @@ class Topology(object):
                 server_descriptions = self._description.apply_selector(
                     selector, address)
 
-            return [self.get_server_by_address(sd.address)
-                    for sd in server_descriptions]
+            servers = [self.get_server_by_address(sd.address)
+                       for sd in server_descriptions]
+            if len(self._selection_cache) >= _SELECTION_CACHE_SIZE:
+                self._selection_cache.clear()
+            self._selection_cache[key] = (
+                selector, self._description.version, servers)
+            return list(servers)
 
     def select_server(self,
                       selector,
                       server_selection_timeout=None,
                       address=None):
-        """Like select_servers, but choose a random server if several match."""
-        return random.choice(self.select_servers(selector,
-                                                 server_selection_timeout,
-                                                 address))
+        """Like select_servers, but choose the server with the fewest
+        operations in progress if several match, at random among equals."""
+        servers = self.select_servers(selector,
+                                      server_selection_timeout,
+                                      address)
+        if len(servers) == 1:
+            return servers[0]
+        least = None
+        for server in servers:
+            in_flight = server.in_flight
+            if least is None or in_flight < least:
+                least = in_flight
+                candidates = [server]
+            elif in_flight == least:
+                candidates.append(server)
+        return random.choice(candidates)
 
     def select_server_by_address(self, address,
                                  server_selection_timeout=None):
@@ -335,11 +377,31 @@ class Topology(object):
             self._reset_server(address)
             self._request_check(address)
 
-    def update_pool(self):
+    def update_pool(self, all_credentials=None):
         # Remove any stale sockets and add new sockets if pool is too small.
+        # New sockets are opened and authenticated on background threads.
         with self._lock:
             for server in self._servers.values():
-                server._pool.remove_stale_sockets()
+                server._pool.remove_stale_sockets(all_credentials)
+
+    def prepare_handoff(self, all_credentials):
+        """Set sockets aside in each known server's pool for the next child
+        process. Blocks while they connect.
+        """
+        with self._lock:
+            pools = [server.pool for server in self._servers.values()
+                     if server.description.is_server_type_known]
+        # Connecting takes a while, don't hold our lock.
+        for pool in pools:
+            pool.prepare_handoff(all_credentials)
+
+    def pool_stats(self):
+        """Map each server's address to its pool's checkout statistics."""
+        with self._lock:
+            servers = list(self._servers.items())
+        # Pool.stats takes the pool's lock, don't hold ours too.
+        return dict((address, server.pool.stats)
+                    for address, server in servers)
 
     def close(self):
         """Clear pools and terminate monitors. Topology reopens on demand."""
@@ -350,6 +412,7 @@ class Topology(object):
             # Mark all servers Unknown.
             self._description = self._description.reset()
             self._update_servers()
+            self._monitoring = False
         # Publish only after releasing the lock.
         if self._publish_tp:
             self._events.put((self._listeners.publish_topology_closed,
@@ -384,6 +447,7 @@ class Topology(object):
             # Restart monitors if we forked since previous call.
             for server in itervalues(self._servers):
                 server.open()
+        self._monitoring = True
 
     def _reset_server(self, address):
         """Clear our pool for a server and mark it Unknown.
@@ -14,6 +14,8 @@
 
 """Represent a deployment of MongoDB servers."""
 
+import itertools
+
 from collections import namedtuple
 
 from pymongo import common
@@ -28,6 +30,10 @@ TOPOLOGY_TYPE = namedtuple('TopologyType', ['Single', 'ReplicaSetNoPrimary',
                                             'ReplicaSetWithPrimary', 'Sharded',
                                             'Unknown'])(*range(5))
 
+# Each TopologyDescription takes the next number: descriptions are immutable,
+# so equal versions mean the same topology.
+_VERSIONS = itertools.count(1)
+
 
 class TopologyDescription(object):
     def __init__(self,
@@ -53,6 +59,7 @@ class TopologyDescription(object):
         self._server_descriptions = server_descriptions
         self._max_set_version = max_set_version
         self._max_election_id = max_election_id
+        self._version = next(_VERSIONS)
 
         # The heartbeat_frequency is used in staleness estimates.
         self._topology_settings = topology_settings
@@ -125,6 +132,12 @@ class TopologyDescription(object):
         :class:`~pymongo.server_description.ServerDescription`)."""
         return self._server_descriptions.copy()
 
+    @property
+    def version(self):
+        """A number unique to this description, increasing with each change.
+        """
+        return self._version
+
     @property
     def topology_type(self):
         """The type of this topology."""
@@ -179,13 +192,19 @@ class TopologyDescription(object):
                 return []
 
             settings = self._topology_settings
+            percentile = settings.local_threshold_percentile
 
             # Round trip time in seconds.
-            fastest = min(
-                s.round_trip_time for s in selection.server_descriptions)
+            if percentile is None:
+                latencies = [(s.round_trip_time, s)
+                             for s in selection.server_descriptions]
+            else:
+                latencies = [(s.round_trip_time_percentile(percentile), s)
+                             for s in selection.server_descriptions]
+            fastest = min(latency for latency, _ in latencies)
             threshold = settings.local_threshold_ms / 1000.0
-            return [s for s in selection.server_descriptions
-                    if (s.round_trip_time - fastest) <= threshold]
+            return [s for latency, s in latencies
+                    if (latency - fastest) <= threshold]
 
         if getattr(selector, 'min_wire_version', 0):
             common_wv = self.common_wire_version
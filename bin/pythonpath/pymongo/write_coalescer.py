@@ -0,0 +1,398 @@
+# Copyright 2016 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you
+# may not use this file except in compliance with the License.  You
+# may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""Combine small writes from many threads into unordered bulk writes.
+
+Each write sent on its own costs a round trip. A :class:`WriteCoalescer`
+collects writes for up to `max_delay_ms`, or until it has
+`max_batch_size` of them, and sends them together::
+
+    from pymongo.write_coalescer import WriteCoalescer
+
+    with WriteCoalescer(db.events, max_delay_ms=5) as coalescer:
+        future = coalescer.insert_one({'type': 'publish', 'asset': name})
+        ...
+        future.result()  # Raises if this insert failed.
+
+Writes are sent unordered, so writes sent together may be applied in any
+order. Don't coalesce writes that depend on each other.
+"""
+
+import threading
+
+from pymongo.bulk import _Bulk
+from pymongo.errors import (BulkWriteError,
+                            DuplicateKeyError,
+                            InvalidOperation,
+                            WriteConcernError,
+                            WriteError,
+                            WriteFutureTimeout,
+                            WTimeoutError)
+from pymongo.monotonic import time as _time
+from pymongo.operations import (DeleteMany,
+                                DeleteOne,
+                                InsertOne,
+                                ReplaceOne,
+                                UpdateMany,
+                                UpdateOne,
+                                _WriteOp)
+from pymongo.results import BulkWriteResult, _WriteResult
+
+
+class CoalescedWriteResult(_WriteResult):
+    """The result of one write sent by a :class:`WriteCoalescer`."""
+
+    __slots__ = ("__inserted_id", "__upserted_id", "__bulk_result")
+
+    def __init__(self, inserted_id, upserted_id, bulk_result, acknowledged):
+        self.__inserted_id = inserted_id
+        self.__upserted_id = upserted_id
+        self.__bulk_result = bulk_result
+        super(CoalescedWriteResult, self).__init__(acknowledged)
+
+    @property
+    def inserted_id(self):
+        """The inserted document's _id, or None if this wasn't an insert."""
+        return self.__inserted_id
+
+    @property
+    def upserted_id(self):
+        """The _id of the document inserted by an upsert, or None."""
+        self._raise_if_unacknowledged("upserted_id")
+        return self.__upserted_id
+
+    @property
+    def bulk_result(self):
+        """The :class:`~pymongo.results.BulkWriteResult` of all the writes
+        sent with this one.
+
+        The server counts matched, modified and deleted documents per bulk
+        write, not per operation.
+        """
+        self._raise_if_unacknowledged("bulk_result")
+        return self.__bulk_result
+
+
+class WriteFuture(object):
+    """The eventual result of a write queued by a :class:`WriteCoalescer`.
+    """
+    def __init__(self):
+        self.__event = threading.Event()
+        self.__result = None
+        self.__exception = None
+
+    def _set(self, result=None, exception=None):
+        self.__result = result
+        self.__exception = exception
+        self.__event.set()
+
+    def done(self):
+        """True if the write has been sent and its result is known."""
+        return self.__event.is_set()
+
+    def exception(self, timeout=None):
+        """Wait for the write, and return its error or None.
+
+        Raises :exc:`~pymongo.errors.WriteFutureTimeout` if the write isn't
+        done within `timeout` seconds.
+        """
+        if not self.__event.wait(timeout):
+            raise WriteFutureTimeout(
+                "write not done within %r seconds" % (timeout,))
+        return self.__exception
+
+    def result(self, timeout=None):
+        """Wait for the write, and return a :class:`CoalescedWriteResult`.
+
+        Raises the write's error if it failed, for example
+        :exc:`~pymongo.errors.WriteError` or
+        :exc:`~pymongo.errors.DuplicateKeyError`. Raises
+        :exc:`~pymongo.errors.WriteFutureTimeout` if the write isn't done
+        within `timeout` seconds.
+        """
+        exception = self.exception(timeout)
+        if exception is not None:
+            raise exception
+        return self.__result
+
+
+def _write_error(error):
+    """The exception for one write error from a bulk write result."""
+    error = dict(error, index=0)
+    if error.get("code") == 11000:
+        return DuplicateKeyError(error.get("errmsg"), 11000, error)
+    return WriteError(error.get("errmsg"), error.get("code"), error)
+
+
+def _write_concern_error(error):
+    if "errInfo" in error and error["errInfo"].get('wtimeout'):
+        return WTimeoutError(error.get("errmsg"), error.get("code"), error)
+    return WriteConcernError(error.get("errmsg"), error.get("code"), error)
+
+
+class _Queue(object):
+    """The queued writes and the thread that sends them.
+
+    Kept apart from WriteCoalescer so the thread doesn't keep an abandoned
+    coalescer alive.
+    """
+    def __init__(self, collection, max_batch_size, max_delay, max_pending,
+                 bypass_document_validation):
+        self.collection = collection
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.bypass_document_validation = bypass_document_validation
+        self.cond = threading.Condition(threading.Lock())
+        # Pairs of (request, future), oldest first.
+        self.pending = []
+        # When the oldest pending write was queued.
+        self.first_queued = None
+        # Futures of the batch being sent.
+        self.sending = []
+        self.flush_requested = False
+        self.closed = False
+        self.thread = threading.Thread(target=self.run,
+                                       name="pymongo_write_coalescer_thread")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, request):
+        future = WriteFuture()
+        with self.cond:
+            while len(self.pending) >= self.max_pending and not self.closed:
+                self.cond.wait()
+            if self.closed:
+                raise InvalidOperation("WriteCoalescer is closed")
+            if not self.pending:
+                self.first_queued = _time()
+            self.pending.append((request, future))
+            self.cond.notify_all()
+        return future
+
+    def flush(self):
+        """Send the queued writes now, and return their futures and those
+        of the batch being sent.
+        """
+        with self.cond:
+            if self.pending:
+                self.flush_requested = True
+                self.cond.notify_all()
+            return self.sending + [future for _, future in self.pending]
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def take_batch(self):
+        """Wait for a batch to be due, and take it. None when closed."""
+        with self.cond:
+            while not self.pending:
+                if self.closed:
+                    return None
+                self.cond.wait()
+            while (len(self.pending) < self.max_batch_size and
+                   not self.flush_requested and not self.closed):
+                remaining = self.first_queued + self.max_delay - _time()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            batch = self.pending[:self.max_batch_size]
+            del self.pending[:self.max_batch_size]
+            if self.pending:
+                self.first_queued = _time()
+            else:
+                self.flush_requested = False
+            self.sending = [future for _, future in batch]
+            # Wake callers blocked on max_pending.
+            self.cond.notify_all()
+            return batch
+
+    def run(self):
+        while True:
+            batch = self.take_batch()
+            if batch is None:
+                return
+            self.send(batch)
+            with self.cond:
+                self.sending = []
+
+    def send(self, batch):
+        """Send a batch as one unordered bulk write, and set its futures."""
+        blk = _Bulk(self.collection, False, self.bypass_document_validation)
+        # The futures of the writes added to blk, in order.
+        sent = []
+        for request, future in batch:
+            try:
+                request._add_to_bulk(blk)
+            except Exception as exc:
+                # An invalid write fails alone.
+                future._set(exception=exc)
+                continue
+            inserted_id = None
+            if isinstance(request, InsertOne):
+                inserted_id = request._doc.get("_id")
+            sent.append((future, inserted_id))
+        if not sent:
+            return
+
+        try:
+            result = blk.execute(self.collection.write_concern.document)
+        except BulkWriteError as exc:
+            result = exc.details
+        except Exception as exc:
+            for future, _ in sent:
+                future._set(exception=exc)
+            return
+
+        if result is None:
+            # Unacknowledged.
+            bulk_result = BulkWriteResult({}, False)
+            for future, inserted_id in sent:
+                future._set(CoalescedWriteResult(
+                    inserted_id, None, bulk_result, False))
+            return
+
+        bulk_result = BulkWriteResult(result, True)
+        errors = dict((error["index"], error)
+                      for error in result.get("writeErrors", ()))
+        upserted = dict((upsert["index"], upsert["_id"])
+                        for upsert in result.get("upserted", ()))
+        wc_errors = result.get("writeConcernErrors")
+        for index, (future, inserted_id) in enumerate(sent):
+            if index in errors:
+                future._set(exception=_write_error(errors[index]))
+            elif wc_errors:
+                future._set(exception=_write_concern_error(wc_errors[-1]))
+            else:
+                future._set(CoalescedWriteResult(
+                    inserted_id, upserted.get(index), bulk_result, True))
+
+
+class WriteCoalescer(object):
+    """Queue writes to `collection` and send them in unordered batches.
+
+    Each write method returns a :class:`WriteFuture` at once. A background
+    thread sends the queued writes as one bulk write when the oldest has
+    waited `max_delay_ms`, or when `max_batch_size` writes are queued. The
+    collection's write concern applies.
+
+    :Parameters:
+      - `collection`: The :class:`~pymongo.collection.Collection` to write
+        to.
+      - `max_batch_size` (optional): The most writes to send at once.
+        Defaults to 1000.
+      - `max_delay_ms` (optional): The longest a write waits for others,
+        in milliseconds. Defaults to 5.
+      - `max_pending` (optional): The most writes queued. Write methods
+        block while the queue is full. Defaults to four batches.
+      - `bypass_document_validation` (optional): If ``True``, allows the
+        writes to opt-out of document level validation.
+    """
+    def __init__(self, collection, max_batch_size=1000, max_delay_ms=5,
+                 max_pending=None, bypass_document_validation=False):
+        self.__queue = None
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_delay_ms < 0:
+            raise ValueError("max_delay_ms must be >= 0")
+        if max_pending is None:
+            max_pending = 4 * max_batch_size
+        self.__queue = _Queue(collection, max_batch_size,
+                              max_delay_ms / 1000.0, max(1, max_pending),
+                              bypass_document_validation)
+
+    def __del__(self):
+        if self.__queue is not None:
+            self.__queue.close()
+
+    def submit(self, request):
+        """Queue a write, like one passed to
+        :meth:`~pymongo.collection.Collection.bulk_write`.
+
+        :Parameters:
+          - `request`: An :class:`~pymongo.operations.InsertOne`,
+            :class:`~pymongo.operations.UpdateOne`,
+            :class:`~pymongo.operations.UpdateMany`,
+            :class:`~pymongo.operations.ReplaceOne`,
+            :class:`~pymongo.operations.DeleteOne`, or
+            :class:`~pymongo.operations.DeleteMany`.
+
+        :Returns:
+          A :class:`WriteFuture`.
+        """
+        if not isinstance(request, _WriteOp):
+            raise TypeError("%r is not a valid request" % (request,))
+        return self.__queue.put(request)
+
+    def insert_one(self, document):
+        """Queue an insert. Adds an ``_id`` to `document` if it has none
+        when the write is sent.
+        """
+        return self.submit(InsertOne(document))
+
+    def update_one(self, filter, update, upsert=False):
+        """Queue an update of a single document."""
+        return self.submit(UpdateOne(filter, update, upsert))
+
+    def update_many(self, filter, update, upsert=False):
+        """Queue an update of all documents matching `filter`."""
+        return self.submit(UpdateMany(filter, update, upsert))
+
+    def replace_one(self, filter, replacement, upsert=False):
+        """Queue a replacement of a single document."""
+        return self.submit(ReplaceOne(filter, replacement, upsert))
+
+    def delete_one(self, filter):
+        """Queue a delete of a single document."""
+        return self.submit(DeleteOne(filter))
+
+    def delete_many(self, filter):
+        """Queue a delete of all documents matching `filter`."""
+        return self.submit(DeleteMany(filter))
+
+    def flush(self, timeout=None):
+        """Send the queued writes now, and wait for them.
+
+        Returns after the writes queued before the call are done, or after
+        `timeout` seconds. Doesn't raise the writes' errors.
+        """
+        deadline = None if timeout is None else _time() + timeout
+        for future in self.__queue.flush():
+            if deadline is None:
+                future.exception()
+            elif not future.done():
+                remaining = deadline - _time()
+                if remaining <= 0:
+                    return
+                try:
+                    future.exception(remaining)
+                except WriteFutureTimeout:
+                    return
+
+    def close(self):
+        """Send the queued writes, and stop the background thread.
+
+        Writes queued after close raise
+        :exc:`~pymongo.errors.InvalidOperation`.
+        """
+        self.__queue.close()
+        self.__queue.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()